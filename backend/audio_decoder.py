@@ -0,0 +1,179 @@
+"""
+Audio Decoder - Format detection and pooled decoding to 16 kHz mono PCM
+WAV is decoded in-process; everything else goes through a pool of
+pre-spawned ffmpeg processes fed over pipes, so no request pays for process
+start-up or touches a temp file. Imports NumPy, so load it lazily.
+"""
+
+import asyncio
+import logging
+import struct
+import wave
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+SUPPORTED_FORMATS = ("wav", "webm", "ogg", "flac", "mp3", "mp4")
+
+
+def detect_format(data: bytes) -> str:
+    """Identify an audio container from its magic bytes"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"  # EBML header (webm/matroska)
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[4:8] == b"ftyp":
+        return "mp4"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return "unknown"
+
+
+def _resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    if source_rate == target_rate:
+        return samples
+    if source_rate % target_rate == 0:
+        # Integer ratio (48k/32k -> 16k): block averaging doubles as a low-pass filter
+        factor = source_rate // target_rate
+        usable = len(samples) - len(samples) % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1)
+    n_out = int(len(samples) * target_rate / source_rate)
+    positions = np.arange(n_out) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _read_chunks(data: bytes) -> Tuple[bytes, bytes]:
+    """The fmt chunk and the sample bytes of a WAV file
+
+    Streaming writers (MediaRecorder shims, ffmpeg to a pipe) can't seek back to fill in
+    the RIFF and data lengths. The RIFF length is ignored, and a data chunk that claims
+    0xFFFFFFFF or more bytes than are left runs to the end of the file. The wave module
+    trusts those lengths, so the chunks are walked here. A data length of 0 is taken at
+    its word: a real empty chunk may be followed by others, such as LIST.
+    """
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        size = int.from_bytes(data[offset + 4:offset + 8], "little")
+        start = offset + 8
+        chunk_id = data[offset:offset + 4]
+        if chunk_id == b"fmt ":
+            fmt = data[start:start + size]
+        elif chunk_id == b"data":
+            if fmt is None:
+                break
+            remaining = len(data) - start
+            return fmt, data[start:start + (size if size <= remaining else remaining)]
+        offset = start + size + (size & 1)  # Chunks are padded to an even length
+    raise wave.Error("fmt or data chunk not found")
+
+
+def decode_wav(data: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode integer PCM WAV in-process; raises wave.Error for formats it can't read"""
+    fmt, frames = _read_chunks(data)
+    if len(fmt) < 16:
+        raise wave.Error("truncated fmt chunk")
+    format_tag, channels, source_rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack("<H", fmt[24:26])[0]  # First two bytes of the sub-format GUID
+    if format_tag != WAVE_FORMAT_PCM or channels == 0:
+        raise wave.Error(f"unsupported format: {format_tag}")
+    width = (bits + 7) // 8
+    if width not in (1, 2, 4):
+        raise wave.Error(f"unsupported sample width: {width}")
+    frames = frames[:len(frames) - len(frames) % (width * channels)]
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    else:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+
+    return _resample(samples, source_rate, sample_rate).astype(np.float32)
+
+
+class AudioDecoder:
+    def __init__(self, ffmpeg: str = "ffmpeg", pool_size: int = 2, sample_rate: int = SAMPLE_RATE):
+        self.ffmpeg = ffmpeg
+        self.pool_size = pool_size
+        self.sample_rate = sample_rate
+        self._pool: List[asyncio.subprocess.Process] = []
+        self._refill_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Pre-spawn the ffmpeg pool"""
+        await self._refill()
+
+    async def stop(self):
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+        for process in self._pool:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        self._pool.clear()
+
+    async def decode(self, data: bytes) -> np.ndarray:
+        """Decode any supported container to mono float32 samples at the target rate"""
+        audio_format = detect_format(data)
+        if audio_format == "unknown":
+            raise ValueError("Unrecognized audio format")
+
+        if audio_format == "wav":
+            try:
+                return decode_wav(data, self.sample_rate)
+            except (wave.Error, EOFError) as e:
+                # Float or compressed WAV: let ffmpeg handle it
+                logger.debug(f"In-process WAV decode failed ({e}), using ffmpeg")
+
+        return await self._decode_ffmpeg(data)
+
+    async def _decode_ffmpeg(self, data: bytes) -> np.ndarray:
+        process = self._take_process() or await self._spawn()
+        self._schedule_refill()
+
+        stdout, stderr = await process.communicate(data)
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg decode failed: {stderr.decode(errors='replace').strip()}")
+
+        return np.frombuffer(stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def _take_process(self) -> Optional[asyncio.subprocess.Process]:
+        while self._pool:
+            process = self._pool.pop()
+            if process.returncode is None:
+                return process
+        return None
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        # ffmpeg loads its codecs and then blocks on stdin until a request arrives
+        return await asyncio.create_subprocess_exec(
+            self.ffmpeg, "-nostdin", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    async def _refill(self):
+        while len(self._pool) < self.pool_size:
+            self._pool.append(await self._spawn())
+
+    def _schedule_refill(self):
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
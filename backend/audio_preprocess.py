@@ -0,0 +1,92 @@
+"""
+Audio Preprocess - Trim decoded recordings before transcription
+Leading/trailing silence is cut from 16 kHz mono PCM (see audio_decoder)
+with a vectorized energy VAD, and recordings without speech never reach Whisper.
+Imports NumPy, so load it through lazy_imports rather than at startup.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+class EnergyVAD:
+    """Frame-energy voice activity detector
+
+    A frame is voiced when its level clears both an absolute floor and the
+    recording's own noise floor by a margin, so quiet rooms and noisy ones
+    are both handled without per-device tuning. A recording with no quiet
+    stretch (speech from start to end) has no noise floor to measure, so
+    it falls back to the absolute floor; and the adaptive gate never rises
+    above max_floor_db, which any real speech clears.
+    """
+
+    def __init__(self, frame_ms: int = 30, threshold_db: float = -45.0, noise_margin_db: float = 10.0,
+                 padding_ms: int = 200, min_speech_ms: int = 120, max_floor_db: float = -30.0):
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.max_floor_db = max_floor_db
+        self.padding_ms = padding_ms
+        self.min_speech_ms = min_speech_ms
+
+    def speech_bounds(self, samples: np.ndarray, sample_rate: int) -> Optional[Tuple[int, int]]:
+        """Return (start, end) sample indices spanning detected speech, or None if there is none"""
+        frame_len = sample_rate * self.frame_ms // 1000
+        n_frames = len(samples) // frame_len
+        if n_frames == 0:
+            return None
+
+        frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+        level_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+        noise_floor, loud = np.percentile(level_db, [10, 90])
+        if loud - noise_floor < self.noise_margin_db:
+            # Level barely varies: all speech or all noise, and the absolute floor tells which
+            gate = self.threshold_db
+        else:
+            gate = max(self.threshold_db, min(noise_floor + self.noise_margin_db, self.max_floor_db))
+        voiced = level_db > gate
+
+        if voiced.sum() * self.frame_ms < self.min_speech_ms:
+            return None
+
+        voiced_idx = np.flatnonzero(voiced)
+        pad = self.padding_ms // self.frame_ms
+        start = max(0, voiced_idx[0] - pad) * frame_len
+        end = min(n_frames, voiced_idx[-1] + 1 + pad) * frame_len
+        return int(start), int(end)
+
+
+# Anything with speech_bounds(samples, sample_rate) can be registered here
+VAD_BACKENDS = {
+    "energy": EnergyVAD,
+}
+
+
+def create_vad(name: str = "energy", **options):
+    if name not in VAD_BACKENDS:
+        raise ValueError(f"Unknown VAD backend: {name}")
+    return VAD_BACKENDS[name](**options)
+
+
+def trim_silence(samples: np.ndarray, vad, sample_rate: int = SAMPLE_RATE) -> Tuple[Optional[np.ndarray], Dict]:
+    """Trim leading/trailing silence; returns (samples or None if no speech, stats)"""
+    bounds = vad.speech_bounds(samples, sample_rate)
+    original_s = len(samples) / sample_rate
+
+    if bounds is None:
+        return None, {"original_s": original_s, "trimmed_s": original_s, "speech_detected": False}
+
+    start, end = bounds
+    trimmed = samples[start:end]
+    return trimmed, {
+        "original_s": original_s,
+        "trimmed_s": original_s - len(trimmed) / sample_rate,
+        "speech_detected": True,
+    }
@@ -0,0 +1,110 @@
+"""
+Audio Stitch - Join per-sentence TTS audio into one continuous PCM stream
+Each sentence's audio is decoded to mono float32 PCM, its leading/trailing
+silence trimmed with the energy VAD, and adjacent sentences are joined with
+an equal-power cross-fade, so every reply plays as one gapless track with
+the same short pause between sentences. Imports NumPy, so load it lazily.
+"""
+
+import logging
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from backend.audio_preprocess import EnergyVAD
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 24000  # Kokoro and F5-TTS both synthesize at 24 kHz
+
+
+@lru_cache(maxsize=8)
+def _fade_curves(length: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Equal power: fade_out² + fade_in² == 1, so overlapping noise floors don't dip or bump
+    phase = np.linspace(0.0, np.pi / 2, length, dtype=np.float32)
+    return np.cos(phase), np.sin(phase)
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    """Little-endian 16-bit PCM, as the browser's stream player expects"""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class AudioStitcher:
+    """Incremental cross-fading joiner for the sentences of one reply
+
+    push() returns the samples that are final. The last crossfade_ms of
+    the stream is held back until the next sentence (or finish()) decides
+    what it overlaps with.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, gap_ms: int = 120, crossfade_ms: int = 30):
+        self.sample_rate = sample_rate
+        self.crossfade = sample_rate * crossfade_ms // 1000
+        # Each side keeps half the pause plus half the overlap, so speech-to-speech silence is gap_ms
+        self.padding = sample_rate * (gap_ms + crossfade_ms) // 2000
+        # Synthesized audio has no room noise to adapt to, and clips can be almost all speech,
+        # which would put the adaptive noise floor inside the speech; use the fixed threshold alone
+        self.vad = EnergyVAD(frame_ms=10, threshold_db=-50.0, noise_margin_db=float("-inf"),
+                             padding_ms=0, min_speech_ms=50)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._trailing = None  # (silence the previous sentence ended with, silence kept of it)
+
+    def push(self, samples: np.ndarray) -> Tuple[np.ndarray, Dict]:
+        """Add one sentence; returns (samples ready to play, stats)"""
+        samples = samples.astype(np.float32, copy=False)
+        # Audio the VAD finds no speech in is kept whole rather than dropped
+        speech_start, speech_end = self.vad.speech_bounds(samples, self.sample_rate) or (0, len(samples))
+        start = max(0, speech_start - self.padding)
+        end = min(len(samples), speech_end + self.padding)
+        chunk = samples[start:end]
+        overlap = min(self.crossfade, len(self._tail), len(chunk))
+
+        ms = 1000 / self.sample_rate
+        stats = {"trimmed_ms": (len(samples) - len(chunk)) * ms}
+        if self._trailing is not None:
+            # Silence between the two sentences' speech, as separate clips and as stitched
+            trailing_silence, trailing_kept = self._trailing
+            stats["joint_silence_before_ms"] = (trailing_silence + speech_start) * ms
+            stats["joint_silence_after_ms"] = (trailing_kept + speech_start - start - overlap) * ms
+        self._trailing = (len(samples) - speech_end, end - speech_end)
+
+        if overlap:
+            fade_out, fade_in = _fade_curves(overlap)
+            joint = self._tail[len(self._tail) - overlap:] * fade_out + chunk[:overlap] * fade_in
+            stream = np.concatenate([self._tail[:len(self._tail) - overlap], joint, chunk[overlap:]])
+        else:
+            stream = np.concatenate([self._tail, chunk])
+
+        hold = min(self.crossfade, len(stream))
+        ready, self._tail = stream[:len(stream) - hold], stream[len(stream) - hold:]
+        return ready, stats
+
+    def finish(self) -> np.ndarray:
+        """Release the held-back tail; the stitcher is ready for a new reply afterwards"""
+        tail, self._tail = self._tail, np.zeros(0, dtype=np.float32)
+        self._trailing = None
+        return tail
+
+
+class StreamClock:
+    """Playback position of a stream whose client starts each chunk as soon as it arrives
+
+    A chunk arriving after the audio already sent has run out is an
+    underrun: the listener hears a gap of that length.
+    """
+
+    def __init__(self):
+        self._played_until: Optional[float] = None
+
+    def sent(self, seconds: float, now: float = None) -> float:
+        """Account for a chunk of the given duration; returns the gap in seconds before it plays"""
+        now = time.monotonic() if now is None else now
+        if self._played_until is None:
+            gap, self._played_until = 0.0, now
+        else:
+            gap = max(0.0, now - self._played_until)
+        self._played_until = max(self._played_until, now) + seconds
+        return gap
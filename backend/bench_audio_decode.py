@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pooled audio decoder against the old temp-file round trip
+Old path: write upload to a temp file, spawn ffmpeg on it (as Whisper does
+internally), delete the file. New path: AudioDecoder.decode() on the bytes.
+"""
+
+import asyncio
+import io
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.audio_decoder import AudioDecoder, SAMPLE_RATE
+
+ITERATIONS = 30
+CLIP_SECONDS = 5
+
+
+def make_wav(seconds: int, rate: int = 48000) -> bytes:
+    t = np.arange(seconds * rate) / rate
+    samples = (np.sin(2 * np.pi * 220 * t) * 12000).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def make_webm(wav_data: bytes) -> bytes:
+    result = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", "pipe:0", "-c:a", "libopus", "-f", "webm", "pipe:1"],
+        input=wav_data, capture_output=True, check=True
+    )
+    return result.stdout
+
+
+def temp_file_round_trip(data: bytes, suffix: str) -> np.ndarray:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_file.write(data)
+        temp_path = temp_file.name
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", temp_path,
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            capture_output=True, check=True
+        )
+        return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+    finally:
+        os.unlink(temp_path)
+
+
+def report(label: str, timings_ms):
+    timings_ms = sorted(timings_ms)
+    p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+    print(f"   {label:<28} mean {statistics.mean(timings_ms):7.2f}ms   p95 {p95:7.2f}ms")
+
+
+async def bench_decoder(decoder: AudioDecoder, data: bytes):
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        await decoder.decode(data)
+        timings.append((time.perf_counter() - start) * 1000)
+        # Give the pool its background refill, as idle time between requests would
+        await asyncio.sleep(0.05)
+    return timings
+
+
+def bench_temp_file(data: bytes, suffix: str):
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        temp_file_round_trip(data, suffix)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main():
+    print(f"🎧 Decoding a {CLIP_SECONDS}s clip, {ITERATIONS} iterations each\n")
+    wav_data = make_wav(CLIP_SECONDS)
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+
+    decoder = AudioDecoder(pool_size=2)
+    if has_ffmpeg:
+        await decoder.start()
+
+    print("📊 WAV (48 kHz mono):")
+    report("pooled decoder (in-process)", await bench_decoder(decoder, wav_data))
+    if has_ffmpeg:
+        report("temp file + ffmpeg", bench_temp_file(wav_data, ".wav"))
+
+    if has_ffmpeg:
+        webm_data = make_webm(wav_data)
+        print("\n📊 WebM/Opus:")
+        report("pooled decoder (ffmpeg pool)", await bench_decoder(decoder, webm_data))
+        report("temp file + ffmpeg", bench_temp_file(webm_data, ".webm"))
+        await decoder.stop()
+    else:
+        print("\n⚠️  ffmpeg not found, skipping ffmpeg-backed comparisons")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
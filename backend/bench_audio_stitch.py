@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark server-side stitching of per-sentence TTS audio
+Builds a 12-sentence reply of synthetic speech-like WAV clips with the
+leading/trailing silence a TTS engine pads each clip with, then reports
+the silence a listener hears between sentences as separate clips and as
+one stitched stream, and what decoding + stitching costs per sentence.
+Clip-to-clip decode and start-up latency in the browser comes on top of
+the clip figures and is reported by the client as playback_gap_ms.
+"""
+
+import asyncio
+import io
+import os
+import statistics
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.audio_decoder import AudioDecoder
+from backend.audio_stitch import SAMPLE_RATE, AudioStitcher, to_pcm16
+
+SENTENCES = 12
+REPLIES = 20
+
+
+def make_clip(rng, speech_s: float, lead_s: float, trail_s: float) -> bytes:
+    """Harmonic 'voice' with a syllable-rate envelope, padded with near-silence, as 16-bit WAV"""
+    t = np.arange(int(speech_s * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = rng.uniform(110, 220)
+    voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    envelope = 0.3 + 0.7 * np.abs(np.sin(2 * np.pi * rng.uniform(3, 5) * t))
+    speech = 0.2 * voice * envelope
+    samples = np.concatenate([
+        rng.normal(0, 1e-4, int(lead_s * SAMPLE_RATE)), speech, rng.normal(0, 1e-4, int(trail_s * SAMPLE_RATE))
+    ])
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(to_pcm16(samples))
+    return buffer.getvalue()
+
+
+async def main():
+    rng = np.random.default_rng(0)
+    decoder = AudioDecoder(sample_rate=SAMPLE_RATE)
+    stitcher = AudioStitcher()
+    before, after, cost_ms = [], [], []
+    clip_s = stitched_s = 0.0
+
+    for _ in range(REPLIES):
+        clips = [make_clip(rng, rng.uniform(1.0, 4.0), rng.uniform(0.05, 0.2), rng.uniform(0.2, 0.5))
+                 for _ in range(SENTENCES)]
+        for clip in clips:
+            start = time.perf_counter()
+            samples = await decoder.decode(clip)
+            ready, stats = stitcher.push(samples)
+            to_pcm16(ready)
+            cost_ms.append((time.perf_counter() - start) * 1000)
+            clip_s += len(samples) / SAMPLE_RATE
+            stitched_s += len(ready) / SAMPLE_RATE
+            if "joint_silence_before_ms" in stats:
+                before.append(stats["joint_silence_before_ms"])
+                after.append(stats["joint_silence_after_ms"])
+        stitched_s += len(stitcher.finish()) / SAMPLE_RATE
+
+    print(f"🧵 {REPLIES} replies x {SENTENCES} sentences, {SAMPLE_RATE} Hz\n")
+    print(f"   Silence between sentences, clips:    mean {statistics.mean(before):6.1f}ms  max {max(before):6.1f}ms")
+    print(f"   Silence between sentences, stitched: mean {statistics.mean(after):6.1f}ms  max {max(after):6.1f}ms")
+    print(f"   Reply audio: {clip_s / REPLIES:.1f}s as clips -> {stitched_s / REPLIES:.1f}s stitched")
+    print(f"   Decode + stitch per sentence: median {statistics.median(cost_ms):.2f}ms  "
+          f"p95 {sorted(cost_ms)[int(len(cost_ms) * 0.95)]:.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
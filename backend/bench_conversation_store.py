@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the conversation store at thousands of turns
+Measures how long each write blocks the event loop (it should only enqueue),
+how fast the writer thread commits, and session lookup latency.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.conversation_store import ConversationStore
+
+TURNS = 5000
+SESSIONS = 200
+LOOKUPS = 500
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ConversationStore(os.path.join(tmp_dir, "bench.db"))
+        store.start()
+
+        print(f"💾 Writing {TURNS} turns across {SESSIONS} sessions...")
+        enqueue_us = []
+        start = time.perf_counter()
+        for turn in range(TURNS):
+            session_id = f"session-{turn % SESSIONS}"
+            turn_id = f"turn-{turn}"
+            t0 = time.perf_counter()
+            store.add_message(session_id, "user", f"Question number {turn}?", turn_id)
+            store.add_message(session_id, "assistant", "An answer of a typical length. " * 6, turn_id)
+            store.add_turn_metrics(session_id, turn_id, "captaineris-nebula:latest", "kokoro", 350.0, 4200.0, 6)
+            enqueue_us.append((time.perf_counter() - t0) * 1e6)
+            if turn % 50 == 0:
+                # Yield like a real server would between turns
+                await asyncio.sleep(0)
+        enqueue_s = time.perf_counter() - start
+
+        await store.flush()
+        commit_s = time.perf_counter() - start
+
+        enqueue_us.sort()
+        print(f"   Loop time per turn (3 writes): p50 {enqueue_us[len(enqueue_us) // 2]:.1f}µs, "
+              f"p99 {enqueue_us[int(len(enqueue_us) * 0.99)]:.1f}µs")
+        print(f"   Enqueued in {enqueue_s * 1000:.0f}ms, committed in {commit_s * 1000:.0f}ms "
+              f"({TURNS * 3 / commit_s:,.0f} rows/s)")
+
+        print(f"\n🔎 {LOOKUPS} lookups (cached and from SQLite)...")
+        cached_ms, db_ms = [], []
+        for i in range(LOOKUPS):
+            # Sessions that fit in the cache: the first read seeds it, the rest are served from memory
+            session_id = f"session-{i % store.cache_sessions}"
+            t0 = time.perf_counter()
+            await store.get_messages(session_id, limit=20)
+            cached_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            await store.get_messages(session_id, limit=20, since=0)
+            db_ms.append((time.perf_counter() - t0) * 1000)
+
+        print(f"   Cached session: mean {statistics.mean(cached_ms):.3f}ms")
+        print(f"   Indexed SQLite: mean {statistics.mean(db_ms):.3f}ms")
+
+        await store.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark F5-TTS sentence time with and without the reference transcript
+With an empty ref_text the TTS server transcribes the reference clip again
+for every sentence; with the stored transcript it skips that step. Needs
+the F5 server running and a reference recording:
+
+    python backend/bench_f5_ref_text.py path/to/reference.wav "Words spoken in it"
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.f5_tts_client import call_f5_tts
+
+SENTENCES = [
+    "Sure, I can help with that.",
+    "The meeting moved to Thursday afternoon.",
+    "Let me know if you want the longer version.",
+    "That should take about ten minutes.",
+]
+ROUNDS = 3
+
+
+async def time_sentences(ref_audio_path: str, ref_text: str):
+    timings = []
+    for _ in range(ROUNDS):
+        for text in SENTENCES:
+            start = time.perf_counter()
+            audio = await call_f5_tts(text, ref_audio_path, ref_text)
+            if not audio:
+                raise RuntimeError("F5-TTS returned no audio")
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    ref_audio_path, ref_text = sys.argv[1], sys.argv[2]
+
+    # One untimed call so model loading doesn't land in either column
+    await call_f5_tts("Ready.", ref_audio_path, ref_text)
+
+    with_asr = await time_sentences(ref_audio_path, "")
+    with_text = await time_sentences(ref_audio_path, ref_text)
+
+    print(f"🎙️  {len(with_asr)} sentences each\n")
+    print(f"   empty ref_text (server ASR): median {statistics.median(with_asr):7.0f}ms")
+    print(f"   stored ref_text:             median {statistics.median(with_text):7.0f}ms")
+    print(f"   saved per sentence:          {statistics.median(with_asr) - statistics.median(with_text):7.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
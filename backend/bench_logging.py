@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark logging overhead per turn on the calling (event loop) thread
+Replays the log calls of a 12-sentence F5-TTS turn, as the code made them
+before (an INFO line per step, per sentence) and as it makes them now
+(debug details, rate-limited per-sentence lines), through a synchronous
+file handler and through the queue handler.
+"""
+
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.structured_logging import (RateLimitedLogger, TextFormatter, TEXT_FORMAT, bind_log_context,
+                                        configure_logging, stop_logging)
+
+SENTENCES = 12
+TURNS = 200
+
+logger = logging.getLogger("bench")
+
+
+def old_turn():
+    logger.info("Processing chat message with LLM: captaineris-nebula:latest, TTS: f5-tts")
+    for i in range(SENTENCES):
+        text = f"Sentence number {i} of the reply, long enough to look real."
+        logger.info("Using F5-TTS for voice generation")
+        logger.info("F5-TTS: Attempting generation with multiple methods")
+        logger.info(f"F5-TTS: Text: '{text[:50]}...'")
+        logger.info("F5-TTS: Reference audio: backend/reference_audio/default_reference.wav")
+        logger.info("F5-TTS: Reference text: 'The quick brown fox jumps over the lazy dog...'")
+        logger.info("F5-TTS: Warming up model...")
+        logger.info("F5-TTS: Calling /wrapper after warmup...")
+        logger.info(f"F5-TTS: Extracting audio from result type: {tuple}")
+        logger.info("F5-TTS: Audio file path: /tmp/gradio/abc/audio.wav")
+        logger.info(f"F5-TTS: Reading audio file: {48000 + i} bytes")
+        logger.info("F5-TTS: Success with Gradio wrapper (warmup)")
+
+
+def new_turn(sentence_log, turn):
+    bind_log_context(session_id="bench-session", turn_id=f"turn-{turn}")
+    logger.info("Processing chat message with LLM: captaineris-nebula:latest, TTS: f5-tts")
+    for i in range(SENTENCES):
+        text = f"Sentence number {i} of the reply, long enough to look real."
+        bind_log_context(sentence_id=i, engine="f5-tts")
+        logger.debug("Using F5-TTS for voice generation")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"F5-TTS: Generating {len(text)} chars, reference default_reference.wav")
+        logger.debug("F5-TTS: Warming up model...")
+        logger.debug("F5-TTS: Calling /wrapper after warmup...")
+        logger.debug(f"F5-TTS: Extracting audio from result type: {tuple}")
+        logger.debug("F5-TTS: Success with Gradio wrapper (warmup)")
+        sentence_log.info("tts_sentence", f"Synthesized {len(text)} chars", profile="quality", synthesis_ms=850)
+
+
+def measure(turn_fn):
+    per_turn_us = []
+    for turn in range(TURNS):
+        start = time.perf_counter()
+        turn_fn(turn)
+        per_turn_us.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(per_turn_us)
+
+
+def sync_file_logging(path):
+    stop_logging()
+    handler = logging.FileHandler(path)
+    handler.setFormatter(TextFormatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    return handler
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+
+        handler = sync_file_logging(os.path.join(tmp_dir, "sync.log"))
+        results["before: INFO per step, sync file handler"] = measure(lambda turn: old_turn())
+        handler.close()
+
+        log_file = open(os.path.join(tmp_dir, "queued.log"), "w")
+        configure_logging("INFO", "text", log_file)
+        results["before: INFO per step, queue handler"] = measure(lambda turn: old_turn())
+
+        sentence_log = RateLimitedLogger(logger, limit=5, interval=10.0)
+        results["now: debug + rate-limited, queue handler"] = measure(lambda turn: new_turn(sentence_log, turn))
+
+        configure_logging("INFO", "json", log_file)
+        results["now: same, JSON lines"] = measure(lambda turn: new_turn(sentence_log, turn))
+        stop_logging()
+        log_file.close()
+
+        print(f"🪵 Logging time on the calling thread per {SENTENCES}-sentence turn (median of {TURNS}):\n")
+        for name, us in results.items():
+            print(f"   {name:<45} {us:8.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vector index at 100k+ chunks
+Appends random unit vectors in batches, then measures single and batched
+cosine top-k query latency, how often the sketch pass still ranks the
+source chunk first, and the cost of an incremental append.
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.retrieval import VectorIndex
+
+CHUNKS = 100_000
+DIM = int(os.environ.get("BENCH_DIM", "384"))  # all-MiniLM size; nomic-embed-text is 768
+BATCH = 10_000
+QUERIES = 200
+TOP_K = 5
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def main():
+    rng = np.random.default_rng(42)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = VectorIndex(tmp_dir)
+
+        print(f"📚 Appending {CHUNKS:,} chunks ({DIM} dims) in batches of {BATCH:,}...")
+        start = time.perf_counter()
+        for offset in range(0, CHUNKS, BATCH):
+            vectors = rng.standard_normal((BATCH, DIM), dtype=np.float32)
+            index.append(vectors, [{"text": f"chunk {offset + i}"} for i in range(BATCH)])
+        elapsed = time.perf_counter() - start
+        print(f"   {CHUNKS / elapsed:,.0f} chunks/s, index file {os.path.getsize(index.vectors_path) / 1e6:.0f}MB")
+
+        # Queries are noisy copies of stored chunks, like a paraphrased question
+        targets = rng.integers(0, CHUNKS, QUERIES)
+        queries = index._matrix[targets] + rng.standard_normal((QUERIES, DIM), dtype=np.float32) * 0.05
+
+        # First query pages the matrix in; don't count it
+        index.search(queries[0], TOP_K)
+
+        single_ms = []
+        for query in queries:
+            t0 = time.perf_counter()
+            index.search(query, TOP_K)
+            single_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        index.search(queries[:16], TOP_K)
+        batched_ms = (time.perf_counter() - t0) * 1000
+
+        # Random vectors have no meaningful 2nd..kth neighbours, so score whether the
+        # paraphrased chunk itself comes back first (exact search always finds it)
+        found = index.search(queries, TOP_K)
+        hit_rate = statistics.mean(hits[0]["text"] == f"chunk {t}" for hits, t in zip(found, targets))
+
+        append_ms = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            index.append(rng.standard_normal((1, DIM), dtype=np.float32), [{"text": "new memory"}])
+            append_ms.append((time.perf_counter() - t0) * 1000)
+
+        print(f"\n🔎 Top-{TOP_K} over {index.count:,} chunks:")
+        print(f"   Single query: mean {statistics.mean(single_ms):.2f}ms, "
+              f"p50 {percentile(single_ms, 0.5):.2f}ms, p95 {percentile(single_ms, 0.95):.2f}ms")
+        print(f"   Batch of 16:  {batched_ms:.2f}ms ({batched_ms / 16:.2f}ms per query)")
+        print(f"   Source chunk ranked first: {hit_rate:.1%}")
+        print(f"   Incremental append (1 chunk): mean {statistics.mean(append_ms):.2f}ms")
+
+        # Sanity check: a stored vector is its own nearest neighbour
+        probe = np.asarray(index._matrix[1234])
+        assert index.search(probe, 1)[0][0]["text"] == "chunk 1234"
+        print("\n✅ Nearest-neighbour sanity check passed")
+
+
+if __name__ == "__main__":
+    main()
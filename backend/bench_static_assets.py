@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark page-load bytes and server CPU for the frontend files
+Compares serving from disk (FileResponse + StaticFiles, uncompressed) with
+the fingerprinted, precompressed in-memory assets, for a first visit and a
+repeat visit. Requests go straight to the ASGI app, so the CPU measured is
+the server's, not an HTTP client's.
+"""
+
+import asyncio
+import gzip
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+
+from backend import lazy_imports
+from backend.static_assets import StaticAssets
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(REPO_ROOT, "frontend", "static")
+INDEX_PATH = os.path.join(REPO_ROOT, "frontend", "index.html")
+ACCEPT_ENCODING = "gzip, deflate, br"
+PAGE_LOADS = 300
+
+
+def disk_app():
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+    @app.get("/")
+    async def index():
+        return FileResponse(INDEX_PATH)
+
+    return app
+
+
+def asset_app():
+    app = FastAPI()
+    assets = StaticAssets(STATIC_DIR, INDEX_PATH)
+    assets.build()
+
+    @app.get("/static/{name:path}")
+    async def static(name: str, request: Request):
+        asset = assets.get(name)
+        if asset is None:
+            raise HTTPException(status_code=404)
+        return assets.response(request, asset)
+
+    @app.get("/")
+    async def index(request: Request):
+        return assets.response(request, assets.index)
+
+    return app, assets
+
+
+async def get(app, path, headers):
+    """One GET through the ASGI app; returns (status, headers, body)"""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+             "client": ("127.0.0.1", 1), "server": ("testserver", 80)}
+    response = {"body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], response["body"]
+
+
+def decode(headers, body):
+    encoding = headers.get("content-encoding")
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        return lazy_imports.load("brotli").decompress(body)
+    return body
+
+
+async def fetch(app, path, cache):
+    """A GET as a browser with this HTTP cache would send it; 200s are stored in the cache"""
+    headers = {"accept-encoding": ACCEPT_ENCODING}
+    if path in cache:
+        cached_headers = cache[path][0]
+        if "etag" in cached_headers:
+            headers["if-none-match"] = cached_headers["etag"]
+        if "last-modified" in cached_headers:
+            headers["if-modified-since"] = cached_headers["last-modified"]
+    status, response_headers, body = await get(app, path, headers)
+    if status == 200:
+        # Only the page is read back (for the files it names), so only it is decoded
+        cache[path] = (response_headers, decode(response_headers, body) if path == "/" else body)
+    return status, body
+
+
+async def page_load(app, cache):
+    """Fetch the page and the files it names; returns (requests, bytes transferred)"""
+    status, body = await fetch(app, "/", cache)
+    requests, transferred = 1, len(body)
+    for path in re.findall(rb'(?:href|src)="(/static/[^"]+)"', cache["/"][1]):
+        path = path.decode()
+        if path in cache and "immutable" in cache[path][0].get("cache-control", ""):
+            continue  # Fresh in the browser cache: no request at all
+        status, body = await fetch(app, path, cache)
+        requests += 1
+        transferred += len(body)
+    return requests, transferred
+
+
+async def measure(app):
+    cache = {}
+    first = await page_load(app, cache)
+    repeat = await page_load(app, cache)
+
+    start = time.process_time()
+    for _ in range(PAGE_LOADS):
+        await page_load(app, {})
+    cold_cpu_ms = (time.process_time() - start) * 1000 / PAGE_LOADS
+
+    start = time.process_time()
+    for _ in range(PAGE_LOADS):
+        await page_load(app, dict(cache))
+    warm_cpu_ms = (time.process_time() - start) * 1000 / PAGE_LOADS
+    return first, repeat, cold_cpu_ms, warm_cpu_ms
+
+
+async def main():
+    new_app, assets = asset_app()
+    print(f"📦 Built {assets.stats()['files']} assets in {assets.build_ms}ms: {assets.stats()['bytes']}\n")
+    print(f"{'serving':>10} {'first visit':>22} {'repeat visit':>22} {'CPU/load':>10} {'CPU/repeat':>11}")
+    results = {}
+    for name, app in (("disk", disk_app()), ("assets", new_app)):
+        first, repeat, cold_cpu_ms, warm_cpu_ms = await measure(app)
+        results[name] = (first, repeat, cold_cpu_ms)
+        print(f"{name:>10} {first[0]:>4} req {first[1]:>10} B {repeat[0]:>6} req {repeat[1]:>8} B "
+              f"{cold_cpu_ms:>8.2f}ms {warm_cpu_ms:>9.2f}ms")
+
+    assert results["assets"][0][1] < results["disk"][0][1] / 2
+    print(f"\n✅ First visit transfers {results['disk'][0][1] / results['assets'][0][1]:.1f}x fewer bytes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
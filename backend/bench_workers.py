@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark throughput scaling of the CPU-bound request path across worker processes
+Each worker repeatedly does what one spoken sentence costs the server
+outside the model services: VAD-trim an utterance, JSON-encode a turn's
+token frames, base64 the synthesized audio and look it up and store it in
+the shared SQLite cache. Reports aggregate requests/s for 1..N workers.
+"""
+
+import base64
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DURATION_S = 3.0
+WORKER_COUNTS = sorted({1, 2, 4, os.cpu_count() or 1})
+
+
+def worker(db_path, start_at, counter):
+    import numpy as np
+    from backend.audio_preprocess import create_vad, trim_silence
+    from backend.response_cache import SharedCache
+    from backend.shared_state import SQLiteStore
+
+    rng = np.random.default_rng(os.getpid())
+    utterance = np.concatenate([
+        rng.normal(0, 0.001, 8000), rng.normal(0, 0.2, 48000), rng.normal(0, 0.001, 8000)
+    ]).astype(np.float32)
+    audio = rng.integers(0, 256, 48000, dtype=np.uint8).tobytes()
+    vad = create_vad("energy")
+    cache = SharedCache(SQLiteStore(db_path), "tts", max_entries=512)
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    done = 0
+    deadline = start_at + DURATION_S
+    while time.time() < deadline:
+        trim_silence(utterance, vad)
+        for i in range(60):
+            json.dumps({"type": "token", "content": f" token{i}"}, separators=(",", ":"))
+        key = f"{os.getpid()}-{done % 64}"
+        if cache.get(key) is None:
+            cache.set(key, audio)
+        base64.b64encode(audio)
+        done += 1
+
+    with counter.get_lock():
+        counter.value += done
+
+
+def run(workers, db_path):
+    counter = multiprocessing.Value("i", 0)
+    start_at = time.time() + 1.0  # Let every process finish importing first
+    processes = [multiprocessing.Process(target=worker, args=(db_path, start_at, counter)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return counter.value / DURATION_S
+
+
+def main():
+    print(f"⚙️  {os.cpu_count()} CPU(s); {DURATION_S:.0f}s per run\n")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "shared.db")
+        run(1, db_path)  # Warm-up: creates the database and fills the page cache
+        baseline = None
+        for workers in WORKER_COUNTS:
+            rate = run(workers, db_path)
+            baseline = baseline or rate
+            # Scaling can't exceed the cores available, so efficiency is measured against those
+            usable = min(workers, os.cpu_count() or 1)
+            print(f"   {workers} worker(s): {rate:8.1f} req/s  "
+                  f"(speedup {rate / baseline:.2f}x, efficiency {rate / baseline / usable:.0%} of {usable} core(s))")
+
+
+if __name__ == "__main__":
+    main()
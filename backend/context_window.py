@@ -0,0 +1,230 @@
+"""
+Context Window - Conversation history sized to each model's optimal context
+Recent messages go into the prompt verbatim. Once the unsummarized tail
+outgrows its share of the budget, a background job folds the oldest part
+into a rolling per-session summary with a cheap model. It only runs while
+no turn is streaming, so prefill stays roughly flat over long sessions
+without ever competing with a reply.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# optimal_context from context_engineering_plan.md, in tokens
+OPTIMAL_CONTEXT = {
+    "captaineris-nebula": 2048,
+    "qwen2.5-coder-32b": 4096,
+    "deepseek-r1": 2048,
+    "llama3-8b": 6144,
+    "phi3-mini": 3072,
+}
+
+SUMMARY_PROMPT = """Summarize the conversation below so it can replace the original messages in your memory.
+Keep names, facts, preferences, decisions and open questions. Drop greetings and filler.
+Write at most {max_words} words of plain prose.
+
+{previous}Conversation:
+{transcript}
+
+Summary:"""
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def optimal_context(model: str, default: int = 2048) -> int:
+    """Token budget for a model, matched on its name without the tag"""
+    return OPTIMAL_CONTEXT.get(model.split(":")[0], default)
+
+
+def format_messages(messages: List[Dict[str, Any]]) -> str:
+    return "".join(f"{message['role'].capitalize()}: {message['content']}\n" for message in messages)
+
+
+def trend_slope(values: List[float]) -> Optional[float]:
+    """Least-squares slope per step, e.g. prefill ms added per turn"""
+    n = len(values)
+    if n < 2:
+        return None
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    variance = sum((x - mean_x) ** 2 for x in range(n))
+    return covariance / variance
+
+
+class SessionContext:
+    def __init__(self, summary: str = "", summarized_until: float = 0.0, trend_turns: int = 50):
+        self.summary = summary
+        self.summarized_until = summarized_until  # created_at of the last message folded into the summary
+        self.prefill: Deque[Dict[str, float]] = deque(maxlen=trend_turns)
+
+
+class ContextCompactor:
+    def __init__(self, store, summarize: Callable[[str, str], Awaitable[str]], reply_reserve: int = 512,
+                 compact_at: float = 0.75, keep_recent: float = 0.4, summary_max_words: int = 150,
+                 idle_delay: float = 1.0, max_sessions: int = 256):
+        self.store = store
+        self.summarize = summarize  # (model, prompt) -> summary text
+        self.reply_reserve = reply_reserve
+        self.compact_at = compact_at  # Fraction of the history budget that triggers compaction
+        self.keep_recent = keep_recent  # Fraction of the history budget left verbatim after compaction
+        self.summary_max_words = summary_max_words
+        self.idle_delay = idle_delay
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._active_turns = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def _session(self, session_id: str) -> SessionContext:
+        state = self._sessions.get(session_id)
+        if state is None:
+            saved = await self.store.get_summary(session_id)
+            state = SessionContext(**saved) if saved else SessionContext()
+            self._sessions[session_id] = state
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return state
+
+    def history_budget(self, model: str, message: str, knowledge: str = "") -> int:
+        used = estimate_tokens(message) + estimate_tokens(knowledge) + self.reply_reserve
+        return max(0, optimal_context(model) - used)
+
+    async def _unsummarized(self, session_id: str, state: SessionContext) -> List[Dict[str, Any]]:
+        messages = await self.store.get_messages(session_id, limit=self.store.cache_messages)
+        return [message for message in messages if message["created_at"] > state.summarized_until]
+
+    async def build(self, session_id: str, model: str, message: str, knowledge: str = "") -> str:
+        """Prompt prefix: summary, then as many recent messages as fit the model's budget"""
+        state = await self._session(session_id)
+        budget = self.history_budget(model, message, knowledge)
+        summary_block = f"Summary of the earlier conversation:\n{state.summary}\n\n" if state.summary else ""
+        remaining = budget - estimate_tokens(summary_block)
+
+        recent = await self._unsummarized(session_id, state)
+        kept = []
+        for past in reversed(recent):
+            cost = estimate_tokens(f"{past['role']}: {past['content']}\n")
+            if cost > remaining:
+                break
+            kept.append(past)
+            remaining -= cost
+        kept.reverse()
+
+        if len(kept) < len(recent):
+            # Compaction hasn't caught up; the oldest messages are cut rather than blowing the budget
+            metrics.incr("context_messages_truncated", len(recent) - len(kept))
+
+        history = f"Conversation so far:\n{format_messages(kept)}\n" if kept else ""
+        return f"{summary_block}{history}{knowledge}"
+
+    # Turn bracketing: compaction only runs while nothing is streaming
+
+    def begin_turn(self):
+        self._active_turns += 1
+        self._idle.clear()
+        # Summaries in flight give the GPU back; their jobs retry once idle again
+        for call in self._calls.values():
+            call.cancel()
+
+    def end_turn(self, session_id: str, model: str):
+        self._active_turns = max(0, self._active_turns - 1)
+        if self._active_turns == 0:
+            self._idle.set()
+        if session_id not in self._jobs:
+            self._jobs[session_id] = asyncio.create_task(self._compact(session_id, model))
+
+    async def _wait_for_idle(self):
+        while True:
+            await self._idle.wait()
+            await asyncio.sleep(self.idle_delay)
+            if self._idle.is_set():
+                return
+
+    async def _compact(self, session_id: str, model: str):
+        try:
+            state = await self._session(session_id)
+            recent = await self._unsummarized(session_id, state)
+            budget = self.history_budget(model, "")
+            costs = [estimate_tokens(f"{m['role']}: {m['content']}\n") for m in recent]
+            if sum(costs) <= budget * self.compact_at:
+                return
+
+            # Fold the oldest messages until the verbatim tail fits keep_recent of the budget
+            tail = sum(costs)
+            split = 0
+            while split < len(recent) and tail > budget * self.keep_recent:
+                tail -= costs[split]
+                split += 1
+            older = recent[:split]
+
+            previous = f"Earlier summary:\n{state.summary}\n\n" if state.summary else ""
+            prompt = SUMMARY_PROMPT.format(
+                max_words=self.summary_max_words, previous=previous, transcript=format_messages(older)
+            )
+            summary = await self._summarize_when_idle(session_id, model, prompt)
+            if not summary:
+                return
+
+            state.summary = summary
+            state.summarized_until = older[-1]["created_at"]
+            self.store.set_summary(session_id, summary, state.summarized_until)
+            metrics.incr("context_compactions", result="done")
+            logger.info(f"Compacted {len(older)} messages of session {session_id} into a summary")
+        except Exception as e:
+            metrics.incr("context_compactions", result="failed")
+            logger.warning(f"Context compaction failed for session {session_id}: {e}")
+        finally:
+            self._jobs.pop(session_id, None)
+
+    async def _summarize_when_idle(self, session_id: str, model: str, prompt: str) -> str:
+        while True:
+            await self._wait_for_idle()
+            call = asyncio.create_task(self.summarize(model, prompt))
+            self._calls[session_id] = call
+            try:
+                # wait() rather than await, so begin_turn can cancel the call without cancelling this job
+                await asyncio.wait([call])
+            finally:
+                self._calls.pop(session_id, None)
+                call.cancel()
+            if not call.cancelled():
+                return call.result().strip()
+            metrics.incr("context_compactions", result="preempted")
+
+    async def stop(self):
+        for job in list(self._jobs.values()):
+            job.cancel()
+        await asyncio.gather(*self._jobs.values(), return_exceptions=True)
+
+    # Prefill trend
+
+    async def record_prefill(self, session_id: str, prompt_tokens: Optional[int], prefill_ms: float):
+        state = await self._session(session_id)
+        state.prefill.append({"prompt_tokens": prompt_tokens, "prefill_ms": round(prefill_ms, 1)})
+        metrics.observe("llm_prefill_ms", prefill_ms)
+
+    async def status(self, session_id: str) -> Dict[str, Any]:
+        state = await self._session(session_id)
+        prefill_ms = [sample["prefill_ms"] for sample in state.prefill]
+        slope = trend_slope(prefill_ms)
+        return {
+            "session_id": session_id,
+            "summary": state.summary,
+            "summarized_until": state.summarized_until,
+            "compacting": session_id in self._jobs,
+            "prefill": list(state.prefill),
+            "prefill_ms_per_turn": round(slope, 2) if slope is not None else None,
+        }
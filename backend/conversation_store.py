@@ -0,0 +1,291 @@
+"""
+Conversation Store - Persistent chat history with write-behind batching
+Messages and per-turn metrics go into SQLite (WAL mode) from a dedicated
+writer thread that batches inserts, so persisting never adds latency to
+the token stream. Recent messages of active sessions are served from a
+bounded in-memory cache. Reads never wait for the writer either: rows still
+queued are merged into what SQLite returns.
+"""
+
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    turn_id TEXT,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session_time ON messages(session_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_time ON messages(created_at);
+
+CREATE TABLE IF NOT EXISTS turn_metrics (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    turn_id TEXT NOT NULL,
+    model TEXT,
+    tts_model TEXT,
+    first_token_ms REAL,
+    total_ms REAL,
+    sentences INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_turn_metrics_session_time ON turn_metrics(session_id, created_at);
+
+CREATE TABLE IF NOT EXISTS summaries (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    summarized_until REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+INSERT_MESSAGE = (
+    "INSERT INTO messages (session_id, turn_id, role, content, created_at) VALUES (?, ?, ?, ?, ?)"
+)
+INSERT_TURN = (
+    "INSERT INTO turn_metrics (session_id, turn_id, model, tts_model, first_token_ms, total_ms, sentences, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+UPSERT_SUMMARY = (
+    "INSERT OR REPLACE INTO summaries (session_id, summary, summarized_until, updated_at) VALUES (?, ?, ?, ?)"
+)
+
+_STOP = object()
+
+
+def _merge(rows: List[Dict[str, Any]], pending: List[Dict[str, Any]], identity: Tuple[str, ...],
+           limit: int) -> List[Dict[str, Any]]:
+    """Committed rows plus queued ones not among them, oldest first, at most limit"""
+    committed = {tuple(row[key] for key in identity) for row in rows}
+    merged = rows + [row for row in pending if tuple(row[key] for key in identity) not in committed]
+    merged.sort(key=lambda row: row["created_at"])
+    return merged[-limit:]
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(db_path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    # Several worker processes may share the file
+    connection.execute("PRAGMA busy_timeout=5000")
+    return connection
+
+
+class ConversationStore:
+    def __init__(self, db_path: str, batch_size: int = 256, flush_interval: float = 0.05,
+                 cache_sessions: int = 64, cache_messages: int = 100):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cache_sessions = cache_sessions
+        self.cache_messages = cache_messages
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._reader_lock = threading.Lock()
+        self._cache: "OrderedDict[str, deque]" = OrderedDict()
+        # Rows queued but not committed yet, by (kind, session_id); every row starts with the session id
+        self._pending: Dict[Tuple[str, str], List[tuple]] = {}
+        self._pending_lock = threading.Lock()
+        self._complete: set = set()  # Sessions whose cache entry started from their first message
+
+    def start(self):
+        """Create the schema and start the writer thread"""
+        connection = _connect(self.db_path)
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self._reader = _connect(self.db_path)
+        self._writer = threading.Thread(target=self._write_loop, name="conversation-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"Conversation store ready: {self.db_path}")
+
+    async def stop(self):
+        """Flush pending writes and stop the writer thread"""
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            await asyncio.to_thread(self._writer.join)
+            self._writer = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    # Writes: enqueue only, never touch SQLite on the caller's thread
+
+    def add_message(self, session_id: str, role: str, content: str, turn_id: str = None):
+        created_at = time.time()
+        self._enqueue("message", (session_id, turn_id, role, content, created_at))
+        self._cache_append(session_id, {
+            "session_id": session_id, "turn_id": turn_id, "role": role,
+            "content": content, "created_at": created_at,
+        })
+
+    def add_turn_metrics(self, session_id: str, turn_id: str, model: str = None, tts_model: str = None,
+                         first_token_ms: float = None, total_ms: float = None, sentences: int = None):
+        self._enqueue("turn", (session_id, turn_id, model, tts_model,
+                               first_token_ms, total_ms, sentences, time.time()))
+
+    def set_summary(self, session_id: str, summary: str, summarized_until: float):
+        """Rolling summary of a session's messages up to summarized_until"""
+        self._enqueue("summary", (session_id, summary, summarized_until, time.time()))
+
+    def _enqueue(self, kind: str, row: tuple):
+        with self._pending_lock:
+            self._pending.setdefault((kind, row[0]), []).append(row)
+        self._queue.put((kind, row))
+
+    def _pending_rows(self, kind: str, session_id: str) -> List[tuple]:
+        with self._pending_lock:
+            return list(self._pending.get((kind, session_id), ()))
+
+    @property
+    def pending_writes(self) -> int:
+        return self._queue.qsize()
+
+    async def flush(self):
+        """Wait until everything enqueued so far is committed; reads don't need this"""
+        await asyncio.to_thread(self._queue.join)
+
+    # Reads
+
+    async def get_messages(self, session_id: str, limit: int = 50, since: float = None) -> List[Dict[str, Any]]:
+        """Most recent messages of a session in chronological order"""
+        cached = self._cache.get(session_id)
+        # A read-through that came back short holds the whole session until the deque fills up
+        whole = session_id in self._complete and cached is not None and len(cached) < cached.maxlen
+        if cached is not None and since is None and (limit <= len(cached) or whole):
+            # The cached tail is long enough; no need to touch SQLite
+            self._cache.move_to_end(session_id)
+            return list(cached)[-limit:]
+
+        # Taken before the query: a row committed meanwhile is then in one or the other
+        pending = self._pending_rows("message", session_id)
+        rows = await asyncio.to_thread(self._query_messages, session_id, limit, since)
+        keys = ("session_id", "turn_id", "role", "content", "created_at")
+        pending = [dict(zip(keys, row)) for row in pending if since is None or row[4] > since]
+        messages = _merge(rows, pending, ("created_at", "role", "content"), limit)
+
+        # Read-through: the cache now holds the newest messages, or all of them if there were fewer than asked
+        if since is None and self.cache_sessions > 0:
+            self._cache.pop(session_id, None)
+            self._complete.discard(session_id)
+            for message in messages:
+                self._cache_append(session_id, message)
+            if len(messages) < limit:
+                self._complete.add(session_id)
+        return messages
+
+    async def get_turn_metrics(self, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        pending = self._pending_rows("turn", session_id)
+        rows = await asyncio.to_thread(self._query_turns, session_id, limit)
+        keys = ("turn_id", "model", "tts_model", "first_token_ms", "total_ms", "sentences", "created_at")
+        return _merge(rows, [dict(zip(keys, row[1:])) for row in pending], ("turn_id", "created_at"), limit)
+
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        pending = self._pending_rows("summary", session_id)
+        if pending:
+            # Summaries replace each other, so the newest queued one wins
+            _, summary, summarized_until, _ = pending[-1]
+            return {"summary": summary, "summarized_until": summarized_until}
+        return await asyncio.to_thread(self._query_summary, session_id)
+
+    def _query_messages(self, session_id: str, limit: int, since: Optional[float]) -> List[Dict[str, Any]]:
+        sql = "SELECT session_id, turn_id, role, content, created_at FROM messages WHERE session_id = ?"
+        params: list = [session_id]
+        if since is not None:
+            sql += " AND created_at > ?"
+            params.append(since)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._reader_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+
+        keys = ("session_id", "turn_id", "role", "content", "created_at")
+        return [dict(zip(keys, row)) for row in reversed(rows)]
+
+    def _query_turns(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        sql = ("SELECT turn_id, model, tts_model, first_token_ms, total_ms, sentences, created_at "
+               "FROM turn_metrics WHERE session_id = ? ORDER BY created_at DESC LIMIT ?")
+        with self._reader_lock:
+            rows = self._reader.execute(sql, (session_id, limit)).fetchall()
+
+        keys = ("turn_id", "model", "tts_model", "first_token_ms", "total_ms", "sentences", "created_at")
+        return [dict(zip(keys, row)) for row in reversed(rows)]
+
+    def _query_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        sql = "SELECT summary, summarized_until FROM summaries WHERE session_id = ?"
+        with self._reader_lock:
+            row = self._reader.execute(sql, (session_id,)).fetchone()
+        return {"summary": row[0], "summarized_until": row[1]} if row else None
+
+    def _cache_append(self, session_id: str, message: Dict[str, Any]):
+        if self.cache_sessions <= 0:
+            return
+        if session_id not in self._cache:
+            self._cache[session_id] = deque(maxlen=self.cache_messages)
+            while len(self._cache) > self.cache_sessions:
+                evicted, _ = self._cache.popitem(last=False)
+                self._complete.discard(evicted)
+        self._cache[session_id].append(message)
+        self._cache.move_to_end(session_id)
+
+    # Writer thread
+
+    def _write_loop(self):
+        connection = _connect(self.db_path)
+        stopping = False
+
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item in batch if item is not _STOP]
+            stopping = len(items) < len(batch)
+            messages = [row for kind, row in items if kind == "message"]
+            turns = [row for kind, row in items if kind == "turn"]
+            summaries = [row for kind, row in items if kind == "summary"]
+
+            try:
+                with connection:
+                    if messages:
+                        connection.executemany(INSERT_MESSAGE, messages)
+                    if turns:
+                        connection.executemany(INSERT_TURN, turns)
+                    if summaries:
+                        connection.executemany(UPSERT_SUMMARY, summaries)
+            except sqlite3.Error as e:
+                logger.error(f"Conversation store write failed ({len(batch)} rows dropped): {e}")
+            finally:
+                # Committed, or dropped with the failed batch: either way no longer pending
+                with self._pending_lock:
+                    for kind, row in items:
+                        rows = self._pending.get((kind, row[0]))
+                        if rows:
+                            rows.remove(row)
+                            if not rows:
+                                del self._pending[(kind, row[0])]
+                for _ in batch:
+                    self._queue.task_done()
+
+        connection.close()
@@ -5,69 +5,116 @@ import logging
 import tempfile
 import os
 import json
-from gradio_client import Client, file
+
+from backend import lazy_imports
+from backend.turn_traces import trace_event
 
 logger = logging.getLogger(__name__)
 
-async def call_f5_tts(text: str, ref_audio_path: str, ref_text: str = ""):
+# Defaults until service discovery finds the servers (see configure)
+GRADIO_URL = "http://localhost:7771"
+OPENAI_URLS = ["http://localhost:7778", "http://localhost:8880"]
+
+# gradio_client is slow to import and Client() fetches the app config on
+# construction, so both are deferred and clients are reused across calls.
+# Both, and every predict() (which blocks for the whole generation), run in
+# a worker thread so the event loop keeps serving meanwhile
+_clients = {}
+
+def _gradio():
+    return lazy_imports.load("gradio_client")
+
+def configure(gradio_url: str = None, openai_urls: list = None):
+    """Point the client at discovered servers; None keeps the current setting"""
+    global GRADIO_URL, OPENAI_URLS
+    if gradio_url:
+        GRADIO_URL = gradio_url
+    if openai_urls:
+        OPENAI_URLS = list(openai_urls)
+
+async def _get_client(url: str = None):
+    url = url or GRADIO_URL
+    if url not in _clients:
+        client = await asyncio.to_thread(lambda: _gradio().Client(url))
+        # Two first calls may race; keep whichever finished first
+        _clients.setdefault(url, client)
+    return _clients[url]
+
+def file(path: str):
+    return _gradio().file(path)
+
+async def call_f5_tts(text: str, ref_audio_path: str, ref_text: str = "",
+                      nfe_steps: int = 32, speed: float = 1.0, cross_fade: float = 0.15):
     """
     Multi-approach F5-TTS client with fallbacks
     Tries: Gradio API -> OpenAI API -> Direct model loading
+    nfe_steps/speed/cross_fade come from the selected synthesis profile
     """
+    params = {"nfe_steps": nfe_steps, "speed": speed, "cross_fade": cross_fade}
     
-    logger.info(f"F5-TTS: Attempting generation with multiple methods")
-    logger.info(f"F5-TTS: Text: '{text[:50]}...'")
-    logger.info(f"F5-TTS: Reference audio: {ref_audio_path}")
-    logger.info(f"F5-TTS: Reference text: '{ref_text[:50]}...'")
+    # Runs once per sentence; details stay at debug so the hot path doesn't flood the log
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"F5-TTS: Generating {len(text)} chars ({params}), reference {ref_audio_path}: '{ref_text[:50]}'")
     
     # Method 1: Try Gradio wrapper endpoint with model warming
     try:
-        result = await _try_gradio_with_warmup(text, ref_audio_path, ref_text)
+        result = await _try_gradio_with_warmup(text, ref_audio_path, ref_text, params)
         if result:
-            logger.info("F5-TTS: Success with Gradio wrapper (warmup)")
+            logger.debug("F5-TTS: Success with Gradio wrapper (warmup)")
             return result
+        trace_event("f5_fallback", method="gradio_wrapper", error="no audio")
     except Exception as e:
         logger.warning(f"F5-TTS: Gradio wrapper failed: {e}")
+        trace_event("f5_fallback", method="gradio_wrapper", error=str(e))
     
     # Method 2: Try different Gradio endpoints
     try:
-        result = await _try_multiple_gradio_endpoints(text, ref_audio_path, ref_text)
+        result = await _try_multiple_gradio_endpoints(text, ref_audio_path, ref_text, params)
         if result:
             logger.info("F5-TTS: Success with alternative Gradio endpoint")
             return result
+        trace_event("f5_fallback", method="gradio_endpoints", error="no audio")
     except Exception as e:
         logger.warning(f"F5-TTS: Alternative Gradio endpoints failed: {e}")
+        trace_event("f5_fallback", method="gradio_endpoints", error=str(e))
     
     # Method 3: Try OpenAI API (might work for some TTS-WebUI setups)
     try:
-        result = await _try_openai_api(text, ref_audio_path, ref_text)
+        result = await _try_openai_api(text, ref_audio_path, ref_text, params)
         if result:
             logger.info("F5-TTS: Success with OpenAI API")
             return result
+        trace_event("f5_fallback", method="openai_api", error="no audio")
     except Exception as e:
         logger.warning(f"F5-TTS: OpenAI API failed: {e}")
+        trace_event("f5_fallback", method="openai_api", error=str(e))
     
     # Method 4: Try direct model warming then retry
     try:
-        result = await _try_model_warmup_retry(text, ref_audio_path, ref_text)
+        result = await _try_model_warmup_retry(text, ref_audio_path, ref_text, params)
         if result:
             logger.info("F5-TTS: Success with model warmup retry")
             return result
+        trace_event("f5_fallback", method="warmup_retry", error="no audio")
     except Exception as e:
         logger.warning(f"F5-TTS: Model warmup retry failed: {e}")
+        trace_event("f5_fallback", method="warmup_retry", error=str(e))
     
     logger.error("F5-TTS: All methods failed")
+    # The server may have restarted; reconnect on the next call
+    _clients.clear()
     return None
 
-async def _try_gradio_with_warmup(text: str, ref_audio_path: str, ref_text: str):
+async def _try_gradio_with_warmup(text: str, ref_audio_path: str, ref_text: str, params: dict):
     """Try Gradio wrapper with model warming"""
     
-    client = Client("http://localhost:7771")
+    client = await _get_client()
     
     # First, try to "warm up" the model by checking its config
     try:
-        logger.info("F5-TTS: Warming up model...")
-        client.predict(
+        logger.debug("F5-TTS: Warming up model...")
+        await asyncio.to_thread(
+            client.predict,
             "F5-TTS_v1",  # model_type
             "",           # path
             "",           # vocab_path
@@ -82,25 +129,26 @@ async def _try_gradio_with_warmup(text: str, ref_audio_path: str, ref_text: str)
         logger.debug(f"F5-TTS: Model warmup info: {e}")
     
     # Now try the main generation
-    logger.info("F5-TTS: Calling /wrapper after warmup...")
-    result = client.predict(
+    logger.debug("F5-TTS: Calling /wrapper after warmup...")
+    result = await asyncio.to_thread(
+        client.predict,
         file(ref_audio_path),  # Use file() helper for proper upload
         ref_text or "",  # Reference text
         text,            # Text to generate
         False,           # Remove silence
-        0.15,            # Cross fade duration
-        32,              # NFE steps
-        1.0,             # Speed
+        params["cross_fade"],  # Cross fade duration
+        params["nfe_steps"],   # NFE steps
+        params["speed"],       # Speed
         "-1",            # Seed (string)
         api_name="/wrapper"
     )
     
     return _extract_audio_from_result(result)
 
-async def _try_multiple_gradio_endpoints(text: str, ref_audio_path: str, ref_text: str):
+async def _try_multiple_gradio_endpoints(text: str, ref_audio_path: str, ref_text: str, params: dict):
     """Try different possible F5-TTS Gradio endpoints"""
     
-    client = Client("http://localhost:7771")
+    client = await _get_client()
     
     # Try different endpoint patterns that might exist
     endpoints_to_try = [
@@ -114,14 +162,15 @@ async def _try_multiple_gradio_endpoints(text: str, ref_audio_path: str, ref_tex
         try:
             logger.info(f"F5-TTS: Trying endpoint {endpoint}")
             
-            result = client.predict(
+            result = await asyncio.to_thread(
+                client.predict,
                 file(ref_audio_path),  # Use file() helper
                 ref_text or "",
                 text,
                 False,
-                0.15,
-                32,
-                1.0,
+                params["cross_fade"],
+                params["nfe_steps"],
+                params["speed"],
                 "-1",
                 api_name=endpoint
             )
@@ -137,27 +186,25 @@ async def _try_multiple_gradio_endpoints(text: str, ref_audio_path: str, ref_tex
     
     return None
 
-async def _try_openai_api(text: str, ref_audio_path: str, ref_text: str):
+async def _try_openai_api(text: str, ref_audio_path: str, ref_text: str, params: dict):
     """Try OpenAI-compatible API (might work in some TTS-WebUI configs)"""
     
     # Read reference audio
     with open(ref_audio_path, 'rb') as f:
         audio_b64 = base64.b64encode(f.read()).decode()
     
-    # Try both possible OpenAI API ports
-    ports = [7778, 8880]
-    
-    for port in ports:
+    for base_url in OPENAI_URLS:
         try:
-            logger.info(f"F5-TTS: Trying OpenAI API on port {port}")
+            logger.info(f"F5-TTS: Trying OpenAI API at {base_url}")
             
-            url = f"http://localhost:{port}/v1/audio/speech"
+            url = f"{base_url}/v1/audio/speech"
             payload = {
                 "model": "f5-tts",
                 "input": text,
                 "voice": "custom",
                 "reference_audio": audio_b64,
                 "reference_text": ref_text,
+                "speed": params["speed"],
                 "response_format": "wav"
             }
             
@@ -165,28 +212,29 @@ async def _try_openai_api(text: str, ref_audio_path: str, ref_text: str):
                 response = await client.post(url, json=payload)
                 
                 if response.status_code == 200:
-                    logger.info(f"F5-TTS: OpenAI API success on port {port}")
+                    logger.info(f"F5-TTS: OpenAI API success at {base_url}")
                     return response.content
                 else:
-                    logger.debug(f"F5-TTS: Port {port} returned {response.status_code}")
+                    logger.debug(f"F5-TTS: {base_url} returned {response.status_code}")
                     
         except Exception as e:
-            logger.debug(f"F5-TTS: Port {port} failed: {e}")
+            logger.debug(f"F5-TTS: {base_url} failed: {e}")
             continue
     
     return None
 
-async def _try_model_warmup_retry(text: str, ref_audio_path: str, ref_text: str):
+async def _try_model_warmup_retry(text: str, ref_audio_path: str, ref_text: str, params: dict):
     """Try to warm up the model with a simple generation first"""
     
-    client = Client("http://localhost:7771")
+    client = await _get_client()
     
     try:
         # Create a minimal test case first
         logger.info("F5-TTS: Model warmup with minimal test...")
         
         # Try a very short generation first to warm up the model
-        warmup_result = client.predict(
+        warmup_result = await asyncio.to_thread(
+            client.predict,
             file(ref_audio_path),  # Use file() helper
             ref_text or "test",
             "test",  # Very short text
@@ -205,14 +253,15 @@ async def _try_model_warmup_retry(text: str, ref_audio_path: str, ref_text: str)
         
         # Now try the real generation
         logger.info("F5-TTS: Attempting real generation after warmup...")
-        result = client.predict(
+        result = await asyncio.to_thread(
+            client.predict,
             file(ref_audio_path),  # Use file() helper
             ref_text or "",
             text,
             False,
-            0.15,
-            32,
-            1.0,
+            params["cross_fade"],
+            params["nfe_steps"],
+            params["speed"],
             "-1",
             api_name="/wrapper"
         )
@@ -223,23 +272,29 @@ async def _try_model_warmup_retry(text: str, ref_audio_path: str, ref_text: str)
         logger.debug(f"F5-TTS: Warmup retry failed: {e}")
         return None
 
+async def unload_f5_model():
+    """Free F5-TTS VRAM on the TTS-WebUI server; it reloads on the next generation"""
+    client = await _get_client()
+    await asyncio.to_thread(client.predict, api_name="/f5_tts_model_unload_model")
+    logger.info("F5-TTS: Model unloaded")
+
 def _extract_audio_from_result(result):
     """Extract audio data from Gradio result"""
     
     if not result:
         return None
         
-    logger.info(f"F5-TTS: Extracting audio from result type: {type(result)}")
+    logger.debug(f"F5-TTS: Extracting audio from result type: {type(result)}")
     
     # Handle tuple results
     if isinstance(result, tuple) and len(result) > 0:
         audio_file_path = result[0]
         
         if isinstance(audio_file_path, str):
-            logger.info(f"F5-TTS: Audio file path: {audio_file_path}")
+            logger.debug(f"F5-TTS: Audio file path: {audio_file_path}")
             
             if os.path.exists(audio_file_path):
-                logger.info(f"F5-TTS: Reading audio file: {os.path.getsize(audio_file_path)} bytes")
+                logger.debug(f"F5-TTS: Reading audio file: {os.path.getsize(audio_file_path)} bytes")
                 with open(audio_file_path, 'rb') as f:
                     return f.read()
             else:
@@ -254,11 +309,11 @@ async def test_f5_connection():
     """Test F5-TTS connection and model status"""
     
     try:
-        client = Client("http://localhost:7771")
+        client = await _get_client()
         logger.info("F5-TTS: Testing connection...")
         
         # Test basic connectivity
-        app_info = client.view_api()
+        app_info = await asyncio.to_thread(client.view_api)
         endpoints = app_info.get('named_endpoints', {})
         
         f5_endpoints = [name for name in endpoints.keys() if 'f5' in name.lower() or 'wrapper' in name.lower()]
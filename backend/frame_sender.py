@@ -0,0 +1,345 @@
+"""
+Frame Sender - Coalesced, accounted WebSocket frames for one connection
+Token frames are merged over a short window (about one display refresh)
+so fast models don't produce hundreds of tiny frames per second. The
+first token after a quiet period goes out immediately; tokens arriving
+within the window after it are sent together. Every other message flushes
+pending tokens first, so frame order is preserved. Frames and payload
+bytes are counted per session (payload bytes are measured before
+permessage-deflate, which the server negotiates at the transport level).
+
+Frames go through a bounded per-connection queue drained by a writer task,
+so a slow client can't stall the LLM stream and buffered audio has a limit.
+When the queue is over its byte or frame limit the overflow policy decides:
+  coalesce - tokens are merged into the last queued token frame
+  drop     - tokens are dropped, and queued token frames are dropped when
+             their sentence's text frame arrives (it carries the whole sentence)
+  pause    - the sender waits for the writer, pausing generation
+Frames that can't be merged or dropped (text, audio, done) wait under every
+policy. A frame larger than the byte limit is still sent once the queue is empty.
+
+With a replay buffer, reply frames carry a per-session sequence number. If
+the connection drops mid-reply the turn keeps generating into the buffer,
+and a client that reconnects and resumes is moved onto this sender.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from fastapi import WebSocket
+
+from backend.metrics import metrics
+from backend.replay_buffer import REPLAY_TYPES, ReplayBuffer
+
+OVERFLOW_POLICIES = ("coalesce", "drop", "pause")
+
+
+class FrameSender:
+    def __init__(self, websocket: WebSocket, session_id: str, window_ms: float = 25.0, rate_window: float = 5.0,
+                 max_queue_bytes: int = 2_000_000, max_queue_frames: int = 256, overflow: str = "coalesce",
+                 replay: Optional[ReplayBuffer] = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.websocket = websocket
+        self.session_id = session_id
+        self.window = window_ms / 1000
+        # Browsers offer the extension in the handshake; uvicorn's websockets backend accepts it
+        self.deflate_offered = "permessage-deflate" in websocket.headers.get("sec-websocket-extensions", "")
+        self.frames = 0
+        self.bytes = 0
+        self.tokens = 0
+        self.token_frames = 0
+        self.started_at = time.monotonic()
+        self.rate_window = rate_window
+        self._recent: deque = deque()  # (sent_at, size) within the last rate_window seconds
+        self._pending: List[str] = []
+        self._last_flush = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.max_queue_bytes = max_queue_bytes
+        self.max_queue_frames = max_queue_frames
+        self.overflow = overflow
+        self._queue: deque = deque()  # [type, message, encoded text, size] waiting for the writer
+        self.queued_bytes = 0  # Including the frame being written
+        self.peak_queued_bytes = 0
+        self._writing = False
+        self.overflows = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.send_wait_ms = 0.0
+        self._writer: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._error: Optional[Exception] = None
+        self.replay = replay
+        self.resumes = 0
+
+    async def send_token(self, text: str):
+        """Queue a token; it is sent now or with the next flush, at most one frame per window"""
+        self._pending.append(text)
+        self.tokens += 1
+        if self._flush_task is not None:
+            return
+        delay = self._last_flush + self.window - time.monotonic()
+        if delay <= 0:
+            await self.flush()
+        else:
+            self._flush_task = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            await self._flush_pending()
+
+    async def _flush_pending(self):
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+            self._flush_task = None
+        if not self._pending:
+            return
+        content = "".join(self._pending)
+        self._pending = []
+        self._last_flush = time.monotonic()
+        await self._send({"type": "token", "content": content})
+
+    async def send_json(self, message: Dict[str, Any]):
+        """Send a message after any tokens queued before it"""
+        async with self._lock:
+            await self._flush_pending()
+            await self._send(message)
+
+    async def _send(self, message: Dict[str, Any]):
+        """Queue a frame for the writer, applying the overflow policy when the queue is full"""
+        message_type = message.get("type", "unknown")
+        # Same encoding as WebSocket.send_json
+        text = json.dumps(message, separators=(",", ":"))
+        size = len(text.encode("utf-8"))
+        if self._error is not None:
+            self._disconnected()
+            # The frame waits in the replay buffer for the client to come back
+            self._number(message_type, message, text, size)
+            return
+        if self._over_limit(size):
+            self.overflows += 1
+            metrics.incr("ws_send_overflow", policy=self.overflow, type=message_type)
+            if message_type == "token" and self.overflow == "coalesce":
+                if self._queue and self._queue[-1][0] == "token":
+                    self._merge_token(message["content"])
+                    return
+                # One token frame may follow each waiting frame; later tokens merge into it
+                self._enqueue(self._number(message_type, message, text, size))
+                return
+            if message_type == "token" and self.overflow == "drop":
+                self._drop("token", 1)
+                return
+            if message_type == "text" and self.overflow == "drop":
+                # The sentence supersedes its partial token frames still waiting
+                stale = [entry for entry in self._queue if entry[0] == "token"]
+                for entry in stale:
+                    self._queue.remove(entry)
+                    self.queued_bytes -= entry[3]
+                self._drop("token", len(stale))
+            if not await self._wait_for_space(size):
+                self._number(message_type, message, text, size)
+                return
+        self._enqueue(self._number(message_type, message, text, size))
+
+    def _number(self, message_type: str, message: Dict[str, Any], text: str, size: int) -> List[Any]:
+        """A queue entry for the frame, numbered and kept for replay if it is part of a reply"""
+        if self.replay is None or message_type not in REPLAY_TYPES:
+            return [message_type, message, text, size]
+        seq = self.replay.next_seq()
+        field = f',"seq":{seq}'
+        entry = [message_type, {**message, "seq": seq}, f"{text[:-1]}{field}}}", size + len(field)]
+        self.replay.record(seq, entry)
+        return entry
+
+    def _disconnected(self):
+        if self.replay is None:
+            raise self._error
+
+    def _over_limit(self, size: int) -> bool:
+        frames = len(self._queue) + self._writing
+        if not frames:
+            return False
+        return self.queued_bytes + size > self.max_queue_bytes or frames >= self.max_queue_frames
+
+    def _merge_token(self, content: str):
+        entry = self._queue[-1]
+        # In place, so the replay buffer's copy of the frame gets the tokens too
+        entry[1]["content"] += content
+        entry[2] = json.dumps(entry[1], separators=(",", ":"))
+        size = len(entry[2].encode("utf-8"))
+        self.queued_bytes += size - entry[3]
+        if "seq" in entry[1]:
+            self.replay.grow(size - entry[3])
+        entry[3] = size
+        self.coalesced += 1
+        metrics.incr("ws_frames_coalesced")
+        self._report_queue()
+
+    def _drop(self, message_type: str, count: int):
+        if count:
+            self.dropped += count
+            metrics.incr("ws_frames_dropped", count, type=message_type)
+            self._report_queue()
+
+    async def _wait_for_space(self, size: int) -> bool:
+        """False if the connection dropped while waiting"""
+        start = time.monotonic()
+        while self._over_limit(size) and self._error is None:
+            self._space.clear()
+            await self._space.wait()
+        waited_ms = (time.monotonic() - start) * 1000
+        self.send_wait_ms += waited_ms
+        metrics.observe("ws_send_wait_ms", waited_ms, policy=self.overflow)
+        if self._error is not None:
+            self._disconnected()
+            return False
+        return True
+
+    def _enqueue(self, entry: List[Any]):
+        self._queue.append(entry)
+        self.queued_bytes += entry[3]
+        self.peak_queued_bytes = max(self.peak_queued_bytes, self.queued_bytes)
+        self._report_queue()
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+        self._wake.set()
+
+    async def _write_loop(self):
+        try:
+            while True:
+                while not self._queue:
+                    self._wake.clear()
+                    await self._wake.wait()
+                message_type, message, text, size = self._queue.popleft()
+                self._writing = True
+                await self.websocket.send_text(text)
+                self._writing = False
+                self.queued_bytes -= size
+                self._record(message_type, size)
+                self._report_queue()
+                self._space.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The connection is gone; senders waiting for space find out from _error
+            self._error = e
+            self._writing = False
+            self._queue.clear()
+            self.queued_bytes = 0
+            self._report_queue()
+            self._space.set()
+
+    def _record(self, message_type: str, size: int):
+        self._recent.append((time.monotonic(), size))
+        self._prune()
+        self.frames += 1
+        self.bytes += size
+        if message_type == "token":
+            self.token_frames += 1
+        metrics.incr("ws_frames", type=message_type)
+        metrics.incr("ws_payload_bytes", size)
+
+    def _report_queue(self):
+        metrics.set_gauge("ws_buffered_bytes", self.queued_bytes, session=self.session_id)
+
+    async def resume(self, last_seq: Optional[int], websocket: WebSocket = None, epoch: str = None):
+        """Send the reply frames after last_seq of the given replay epoch, first moving onto websocket if given
+
+        Doesn't take the send lock: the turn may hold it while waiting for room behind a
+        half-open socket that never drains. Nothing here awaits, so the missed frames are
+        queued ahead of whatever the turn sends next, and the turn is woken to go on over
+        the new socket. The replayed frames may overshoot the queue limits; the replay
+        buffer bounds them, and senders wait for them to drain.
+        """
+        if websocket is not None:
+            self._attach(websocket)
+        missed, complete = self.replay.since(last_seq, epoch) if self.replay is not None else ([], False)
+        for entry in missed:
+            self._enqueue(entry)
+        self.resumes += 1
+        metrics.incr("ws_resumes", live=str(websocket is not None).lower(), complete=str(complete).lower())
+        metrics.observe("ws_replayed_frames", len(missed))
+        message = {"type": "resumed", "replayed": len(missed), "complete": complete,
+                   "last_seq": self.replay.seq if self.replay is not None else None,
+                   "epoch": self.replay.epoch if self.replay is not None else None}
+        text = json.dumps(message, separators=(",", ":"))
+        self._enqueue(self._number("resumed", message, text, len(text.encode("utf-8"))))
+        # Senders waiting on the old socket's backlog check again against the new queue
+        self._space.set()
+
+    def _attach(self, websocket: WebSocket):
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        self.websocket = websocket
+        self.deflate_offered = "permessage-deflate" in websocket.headers.get("sec-websocket-extensions", "")
+        self._error = None
+        self._writing = False
+        self._queue.clear()
+        self.queued_bytes = 0
+
+    async def drain(self):
+        """Wait until every queued frame has been written"""
+        while (self._queue or self._writing) and self._error is None:
+            self._space.clear()
+            await self._space.wait()
+
+    async def close(self):
+        """Drop anything still pending or queued and record the connection's rates"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        self._queue.clear()
+        self.queued_bytes = 0
+        metrics.clear_gauge("ws_buffered_bytes", session=self.session_id)
+        stats = self.stats()
+        metrics.observe("ws_frames_per_s", stats["avg_frames_per_s"])
+        metrics.observe("ws_bytes_per_s", stats["avg_bytes_per_s"])
+        metrics.observe("ws_peak_buffered_bytes", self.peak_queued_bytes)
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.rate_window
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals, connection-lifetime averages and rates over the last rate_window seconds"""
+        self._prune()
+        elapsed = max(time.monotonic() - self.started_at, 1e-3)
+        return {
+            "session_id": self.session_id,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "tokens": self.tokens,
+            "token_frames": self.token_frames,
+            "tokens_per_frame": round(self.tokens / self.token_frames, 2) if self.token_frames else 0,
+            "frames_per_s": round(len(self._recent) / self.rate_window, 2),
+            "bytes_per_s": round(sum(size for _, size in self._recent) / self.rate_window, 1),
+            "avg_frames_per_s": round(self.frames / elapsed, 2),
+            "avg_bytes_per_s": round(self.bytes / elapsed, 1),
+            "deflate_offered": self.deflate_offered,
+            "overflow_policy": self.overflow,
+            "queued_frames": len(self._queue) + self._writing,
+            "queued_bytes": self.queued_bytes,
+            "peak_queued_bytes": self.peak_queued_bytes,
+            "overflows": self.overflows,
+            "coalesced_tokens": self.coalesced,
+            "dropped_frames": self.dropped,
+            "send_wait_ms": round(self.send_wait_ms, 1),
+            "connected": self._error is None,
+            "resumes": self.resumes,
+            "replay": self.replay.stats() if self.replay is not None else None,
+        }
@@ -0,0 +1,286 @@
+"""
+GPU Arbiter - Sequences model residency on a single shared GPU
+The LLM, Kokoro/F5 and Whisper all compete for the same VRAM. The arbiter
+tracks each component's footprint, serializes loads and unloads, and evicts
+least-recently-used components that are neither in use nor on the current
+turn's critical path.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class GPUBackend:
+    """A model that can be loaded onto and unloaded from the GPU
+
+    Subclasses override load/unload; memory_used_mb reports actual usage when
+    the backend can measure it, so footprints self-correct over time.
+    """
+
+    pinned = False  # Pinned backends (e.g. a Docker service we don't control) are never evicted
+    model: Optional[str] = None  # For backends that serve several models, the one load() loads
+
+    async def load(self):
+        pass
+
+    async def unload(self):
+        pass
+
+    async def memory_used_mb(self) -> Optional[float]:
+        return None
+
+
+class OllamaBackend(GPUBackend):
+    def __init__(self, http_client: httpx.AsyncClient, base_url: str, model: str,
+                 options: Callable[[str], Dict[str, Any]] = None):
+        self.http_client = http_client
+        self.base_url = base_url
+        self.model = model
+        self.options = options  # A model's chat request options; loading with others makes the first turn reload
+
+    async def load(self):
+        # An empty prompt loads the model without generating
+        payload = {"model": self.model, "prompt": "", "stream": False}
+        options = dict(self.options(self.model)) if self.options else {}
+        if "keep_alive" in options:
+            payload["keep_alive"] = options.pop("keep_alive")
+        if options:
+            payload["options"] = options
+        response = await self.http_client.post(f"{self.base_url}/api/generate", json=payload)
+        response.raise_for_status()
+
+    async def unload(self):
+        response = await self.http_client.post(
+            f"{self.base_url}/api/generate", json={"model": self.model, "keep_alive": 0}
+        )
+        response.raise_for_status()
+
+    async def memory_used_mb(self) -> Optional[float]:
+        response = await self.http_client.get(f"{self.base_url}/api/ps")
+        response.raise_for_status()
+        for running in response.json().get("models", []):
+            if running.get("name") == self.model:
+                return running.get("size_vram", 0) / (1024 * 1024)
+        return 0.0
+
+
+class CallbackBackend(GPUBackend):
+    """Adapts plain load/unload coroutines (e.g. a worker's start/stop)"""
+
+    def __init__(self, load: Callable[[], Awaitable] = None, unload: Callable[[], Awaitable] = None):
+        self._load = load
+        self._unload = unload
+
+    async def load(self):
+        if self._load:
+            await self._load()
+
+    async def unload(self):
+        if self._unload:
+            await self._unload()
+
+
+class PinnedBackend(GPUBackend):
+    """Always resident; counted against capacity but never loaded or evicted"""
+    pinned = True
+
+
+class Component:
+    def __init__(self, name: str, backend: GPUBackend, vram_mb: float):
+        self.name = name
+        self.backend = backend
+        self.vram_mb = vram_mb
+        self.resident = backend.pinned
+        self.unloading = False  # Evicted but still holding its memory until unload() returns
+        self.holders: List[asyncio.Task] = []  # Tasks inside a use() block, once per block
+        self.last_used = 0.0
+        self.measured_mb: Dict[str, float] = {}  # By model, for backends that switch between models
+
+    @property
+    def in_use(self) -> int:
+        return len(self.holders)
+
+    def to_dict(self) -> Dict:
+        return {
+            "resident": self.resident,
+            "unloading": self.unloading,
+            "in_use": self.in_use,
+            "model": self.backend.model,
+            "vram_mb": round(self.vram_mb, 1),
+            "pinned": self.backend.pinned,
+        }
+
+
+class GPUArbiter:
+    def __init__(self, capacity_mb: float, wait_timeout: float = 30.0):
+        self.capacity_mb = capacity_mb
+        self.wait_timeout = wait_timeout
+        self.components: Dict[str, Component] = {}
+        self.critical_path = set()
+        self._lock = asyncio.Lock()
+        self._released = asyncio.Condition()
+        self._releases = 0  # Bumped on every release, so a waiter can't miss one
+
+    def register(self, name: str, backend: GPUBackend, vram_mb: float):
+        self.components[name] = Component(name, backend, vram_mb)
+
+    @property
+    def used_mb(self) -> float:
+        return sum(c.vram_mb for c in self.components.values() if c.resident or c.unloading)
+
+    def set_critical_path(self, names: Iterable[str]):
+        """Components the current turn depends on; these are evicted last"""
+        self.critical_path = set(names)
+
+    @asynccontextmanager
+    async def use(self, name: str, model: str = None):
+        """Hold a component resident for the duration of the block, with model loaded if given"""
+        component = self.components.get(name)
+        if component is None:
+            # Not GPU-managed (e.g. a remote engine)
+            yield
+            return
+
+        await self.ensure_resident(name, model)
+        task = asyncio.current_task()
+        component.holders.append(task)
+        try:
+            yield
+        finally:
+            component.holders.remove(task)
+            component.last_used = time.monotonic()
+            self._releases += 1
+            async with self._released:
+                self._released.notify_all()
+
+    async def ensure_resident(self, name: str, model: str = None):
+        """Load a component, evicting others first if it wouldn't fit
+
+        For a backend that serves several models, model is the one to have loaded; another
+        one that is resident is unloaded first, once no other task is using it.
+        """
+        component = self.components[name]
+        if component.resident and not self._switching(component, model):
+            component.last_used = time.monotonic()
+            return
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            async with self._lock:
+                if component.resident and not self._switching(component, model):
+                    return
+                seen = self._releases
+                remaining = deadline - time.monotonic()
+                if component.resident:
+                    # Resident with another model: unload it first, unless another turn is still
+                    # generating with it and we can wait
+                    in_use = any(task is not asyncio.current_task() for task in component.holders)
+                    if not in_use or remaining <= 0:
+                        if in_use:
+                            logger.warning(f"GPU arbiter: switching {name} to {model} while "
+                                           f"{component.backend.model} is still in use")
+                        await self._evict(component)
+                if not component.resident:
+                    if self._switching(component, model):
+                        component.backend.model = model
+                        component.vram_mb = component.measured_mb.get(model, component.vram_mb)
+                    fits = await self._make_room(component)
+                    remaining = deadline - time.monotonic()
+                    if fits or remaining <= 0 or self._blocked_by_caller(component):
+                        if not fits:
+                            # Over-commit rather than stall the caller; the runtime may spill to CPU
+                            logger.warning(f"GPU arbiter: loading {name} over capacity "
+                                           f"({self.used_mb + component.vram_mb:.0f}/{self.capacity_mb:.0f}MB)")
+                            metrics.incr("gpu_overcommits", component=name)
+                        await self._load(component)
+                        return
+
+            # Something in use is blocking us; wait for it to be released, without keeping
+            # other components from loading or being used meanwhile
+            metrics.incr("gpu_load_waits", component=name)
+            async with self._released:
+                try:
+                    await asyncio.wait_for(self._released.wait_for(lambda: self._releases != seen), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    @staticmethod
+    def _switching(component: Component, model: Optional[str]) -> bool:
+        """Whether a multi-model backend has to change models to serve model"""
+        return model is not None and component.backend.model is not None and component.backend.model != model
+
+    def _blocked_by_caller(self, incoming: Component) -> bool:
+        """Whether only components the calling task itself is using stand in the way; waiting would never end"""
+        task = asyncio.current_task()
+        stuck = sum(c.vram_mb for c in self.components.values()
+                    if (c.resident or c.unloading) and (c.backend.pinned or task in c.holders))
+        return stuck + incoming.vram_mb > self.capacity_mb
+
+    async def _load(self, component: Component):
+        start = time.monotonic()
+        await component.backend.load()
+        component.resident = True
+        component.last_used = time.monotonic()
+        metrics.observe("gpu_load_ms", (time.monotonic() - start) * 1000, component=component.name)
+        await self._measure(component)
+        logger.info(f"GPU arbiter: {component.name} resident ({self.used_mb:.0f}/{self.capacity_mb:.0f}MB)")
+
+    async def _make_room(self, incoming: Component) -> bool:
+        """Evict until incoming fits; returns False if in-use components still block it"""
+        while self.used_mb + incoming.vram_mb > self.capacity_mb:
+            victim = self._pick_victim()
+            if victim is None:
+                return False
+            await self._evict(victim)
+        return True
+
+    def _pick_victim(self) -> Optional[Component]:
+        candidates = [
+            c for c in self.components.values()
+            if c.resident and not c.in_use and not c.backend.pinned
+        ]
+        if not candidates:
+            return None
+        # Off-critical-path first, then least recently used
+        return min(candidates, key=lambda c: (c.name in self.critical_path, c.last_used))
+
+    async def _evict(self, component: Component):
+        logger.info(f"GPU arbiter: evicting {component.name} ({component.vram_mb:.0f}MB)")
+        # Non-resident before the await, so use() can't take the fast path into a model being unloaded
+        component.resident = False
+        component.unloading = True
+        try:
+            await component.backend.unload()
+        except Exception as e:
+            logger.warning(f"GPU arbiter: unloading {component.name} failed: {e}")
+        finally:
+            component.unloading = False
+        metrics.incr("gpu_evictions", component=component.name)
+
+    async def _measure(self, component: Component):
+        try:
+            measured = await component.backend.memory_used_mb()
+        except Exception as e:
+            logger.debug(f"GPU arbiter: could not measure {component.name}: {e}")
+            return
+        if measured:
+            component.vram_mb = measured
+            if component.backend.model is not None:
+                component.measured_mb[component.backend.model] = measured
+
+    def status(self) -> Dict:
+        return {
+            "capacity_mb": self.capacity_mb,
+            "used_mb": round(self.used_mb, 1),
+            "critical_path": sorted(self.critical_path),
+            "components": {name: c.to_dict() for name, c in self.components.items()},
+        }
@@ -0,0 +1,48 @@
+"""
+Lazy Imports - Deferred loading for heavy optional dependencies
+Modules like gradio_client are imported on first use or preloaded in a
+worker thread during warm-up, never inline on the event loop at startup.
+Import times are recorded per module for the /ready report.
+"""
+
+import asyncio
+import importlib
+import logging
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+_import_times: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def load(module_name: str) -> ModuleType:
+    """Import a module, recording how long the first import took"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    with _lock:
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        _import_times[module_name] = elapsed_ms
+        logger.info(f"Imported {module_name} in {elapsed_ms}ms")
+        return module
+
+
+async def preload(*module_names: str):
+    """Import modules in a worker thread so the event loop keeps serving"""
+    for module_name in module_names:
+        await asyncio.to_thread(load, module_name)
+
+
+def import_times() -> Dict[str, float]:
+    return dict(_import_times)
@@ -0,0 +1,198 @@
+"""
+Live Config - Runtime configuration that changes without a restart
+CONFIG keeps its defaults in main.py; overrides live in a JSON file that is
+read at import, watched for edits and written by the admin endpoint. A
+change is validated as a whole, written in one step and then handed to the
+hooks registered for its keys, which rebuild what was built from the old
+values (connection pools, the LLM router, scheduler limits). If a hook
+fails the old values are restored. Caches are left alone: their keys
+already include the model, voice and options they were made with.
+
+A chat turn pins the configuration it started with, so a change never
+lands halfway through a reply; the session sees it from its next turn.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_pinned: ContextVar[Optional[Dict[str, Any]]] = ContextVar("pinned_config", default=None)
+
+
+class LiveConfig(dict):
+    """A dict of settings whose reads inside a pinned turn see that turn's snapshot
+
+    restart_keys are settings only read while the app is built (worker count,
+    database paths, buffer sizes); they are taken from the file at startup but
+    rejected at runtime.
+    """
+
+    def __init__(self, defaults: Dict[str, Any], path: str = None, restart_keys: Iterable[str] = ()):
+        super().__init__(defaults)
+        self.defaults = dict(defaults)
+        self.path = path
+        self.restart_keys = set(restart_keys)
+        self.version = 0
+        self.overrides: Dict[str, Any] = {}
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._hooks: List[tuple] = []
+        self._lock = asyncio.Lock()
+        self._file_mtime = None
+
+    def __getitem__(self, key):
+        pinned = _pinned.get()
+        if pinned is not None:
+            return pinned[key]
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        pinned = _pinned.get()
+        if pinned is not None:
+            return pinned.get(key, default)
+        return dict.get(self, key, default)
+
+    def pin(self):
+        """Freeze the settings seen by this task and the tasks it creates; returns a token for unpin"""
+        return _pinned.set(dict(self))
+
+    def unpin(self, token):
+        _pinned.reset(token)
+
+    def on_change(self, keys: Iterable[str], hook: Callable[[Dict[str, Any]], Any]):
+        """Call hook(changed) (sync or async) whenever any of keys changes"""
+        self._hooks.append((set(keys), hook))
+
+    def validate(self, changes: Dict[str, Any], runtime: bool = True) -> List[str]:
+        """Problems with a change set: unknown keys, wrong types, restart-only keys at runtime"""
+        errors = []
+        for key, value in changes.items():
+            if key not in self.defaults:
+                errors.append(f"{key}: unknown setting")
+                continue
+            if runtime and key in self.restart_keys and value != dict.__getitem__(self, key):
+                errors.append(f"{key}: only read at startup, change it in {self.path} and restart")
+                continue
+            default = self.defaults[key]
+            if default is None or value is None:
+                continue
+            numeric = (int, float)
+            if isinstance(default, numeric) and not isinstance(default, bool):
+                ok = isinstance(value, numeric) and not isinstance(value, bool)
+            else:
+                ok = isinstance(value, type(default))
+            if not ok:
+                errors.append(f"{key}: expected {type(default).__name__}, got {type(value).__name__}")
+        return errors
+
+    def load_file(self) -> Dict[str, Any]:
+        """Apply the file's overrides without hooks; for startup, before anything is built"""
+        overrides = self._read_file()
+        errors = self.validate(overrides, runtime=False)
+        if errors:
+            raise ValueError(f"Invalid settings in {self.path}: {'; '.join(errors)}")
+        self.overrides = overrides
+        self.update(overrides)
+        if overrides:
+            logger.info(f"Loaded {len(overrides)} setting(s) from {self.path}")
+        return overrides
+
+    def _read_file(self) -> Dict[str, Any]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        self._file_mtime = os.path.getmtime(self.path)
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _write_file(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.overrides, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._file_mtime = os.path.getmtime(self.path)
+
+    async def apply(self, changes: Dict[str, Any], persist: bool = True, source: str = "api") -> Dict[str, Any]:
+        """Validate, write and run the hooks for a change set as one step; raises ValueError if invalid"""
+        errors = self.validate(changes)
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        async with self._lock:
+            start = time.monotonic()
+            changed = {key: value for key, value in changes.items() if dict.__getitem__(self, key) != value}
+            previous = {key: dict.__getitem__(self, key) for key in changed}
+            if changed:
+                self.update(changed)
+                try:
+                    await self._run_hooks(changed)
+                except Exception:
+                    self.update(previous)
+                    await self._run_hooks(previous)
+                    raise
+                self.version += 1
+            if persist and self.path:
+                for key, value in changes.items():
+                    if value == self.defaults[key]:
+                        self.overrides.pop(key, None)
+                    else:
+                        self.overrides[key] = value
+                self._write_file()
+
+            apply_ms = round((time.monotonic() - start) * 1000, 2)
+            report = {"version": self.version, "source": source, "changed": sorted(changed),
+                      "apply_ms": apply_ms, "at": round(time.time(), 3)}
+            if changed:
+                metrics.observe("config_apply_ms", apply_ms)
+                self.history.append(report)
+                logger.info(f"Config v{self.version} from {source}: {sorted(changed)} applied in {apply_ms}ms")
+            return report
+
+    async def _run_hooks(self, changed: Dict[str, Any]):
+        for keys, hook in self._hooks:
+            if keys & changed.keys():
+                result = hook(changed)
+                if inspect.isawaitable(result):
+                    await result
+
+    async def watch(self, interval: float = 2.0):
+        """Apply edits to the file (by hand or by another worker's admin call) as they appear"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+                if mtime == self._file_mtime:
+                    continue
+                overrides = self._read_file()
+                self._file_mtime = mtime
+                # Keys dropped from the file go back to their defaults
+                changes = {key: self.defaults[key] for key in self.overrides if key not in overrides}
+                changes.update(overrides)
+                pending = {key for key in changes if key in self.restart_keys
+                           and changes[key] != dict.__getitem__(self, key)}
+                if pending:
+                    logger.warning(f"{sorted(pending)} in {self.path} take effect on restart")
+                await self.apply({k: v for k, v in changes.items() if k not in pending},
+                                 persist=False, source="file")
+                self.overrides = overrides
+            except Exception as e:
+                logger.warning(f"Could not apply {self.path}: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "overrides": self.overrides,
+            "restart_keys": sorted(self.restart_keys),
+            "history": list(self.history),
+            "apply_ms": metrics.summary("config_apply_ms"),
+        }
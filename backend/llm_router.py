@@ -0,0 +1,230 @@
+"""
+LLM Router - Hedged, health-aware streaming across several LLM endpoints
+Endpoints may speak the Ollama or the OpenAI chat-completions protocol.
+If the first token hasn't arrived within the hedge budget, a second
+endpoint is raced against the first and the slower stream is cancelled;
+endpoints that fail before producing a token are failed over. Only a few
+tokens are read ahead of the consumer, so a consumer that stops reading
+(a paused WebSocket) stops reading the HTTP stream, and the endpoint stops
+generating.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from backend.metrics import metrics
+from backend.structured_logging import RateLimitedLogger
+
+logger = logging.getLogger(__name__)
+chunk_log = RateLimitedLogger(logger, limit=1, interval=5.0)
+
+
+class LLMEndpoint:
+    def __init__(self, url: str, kind: str = "ollama", model: str = None, name: str = None):
+        if kind not in ("ollama", "openai"):
+            raise ValueError(f"Unknown LLM endpoint kind: {kind}")
+        self.url = url.rstrip("/")
+        self.kind = kind
+        self.model = model  # Overrides the requested model name on this endpoint
+        self.name = name or self.url
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.first_token_ms = None  # EWMA
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def record_success(self, first_token_ms: float):
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        if self.first_token_ms is None:
+            self.first_token_ms = first_token_ms
+        else:
+            self.first_token_ms = 0.8 * self.first_token_ms + 0.2 * first_token_ms
+
+    def record_failure(self, cooldown: float):
+        self.consecutive_failures += 1
+        # Back off harder the longer an endpoint keeps failing
+        self.unhealthy_until = time.monotonic() + cooldown * min(2 ** (self.consecutive_failures - 1), 8)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "kind": self.kind,
+            "healthy": self.healthy,
+            "consecutive_failures": self.consecutive_failures,
+            "first_token_ms": round(self.first_token_ms, 1) if self.first_token_ms is not None else None,
+        }
+
+
+class LLMRouter:
+    def __init__(self, endpoints: List[LLMEndpoint], http_client: httpx.AsyncClient,
+                 hedge_after_ms: float = 1500.0, max_hedges: int = 1, failure_cooldown: float = 5.0,
+                 read_ahead: int = 32):
+        if not endpoints:
+            raise ValueError("LLMRouter needs at least one endpoint")
+        self.endpoints = endpoints
+        self.http_client = http_client
+        self.hedge_after_ms = hedge_after_ms
+        self.max_hedges = max_hedges
+        self.failure_cooldown = failure_cooldown
+        self.read_ahead = read_ahead
+
+    @classmethod
+    def from_config(cls, endpoint_configs: List[Dict[str, Any]], http_client: httpx.AsyncClient, **options):
+        return cls([LLMEndpoint(**config) for config in endpoint_configs], http_client, **options)
+
+    def _candidates(self) -> List[LLMEndpoint]:
+        # Healthy endpoints in configured priority order, unhealthy ones as a last resort
+        return sorted(self.endpoints, key=lambda e: not e.healthy)
+
+    async def stream(self, model: str, prompt: str, options: Dict[str, Any] = None,
+                     stats: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Yield response tokens from whichever endpoint produces the first token
+
+        stats, if given, receives prompt_tokens and prefill_ms when the endpoint reports them
+        """
+        candidates = self._candidates()
+        events: asyncio.Queue = asyncio.Queue(maxsize=self.read_ahead)
+        attempts: Dict[int, asyncio.Task] = {}
+        started_at: Dict[int, float] = {}
+        hedged = set()
+        winner: Optional[int] = None
+
+        def launch(index: int):
+            endpoint = candidates[index]
+            started_at[index] = time.monotonic()
+            attempts[index] = asyncio.create_task(
+                self._pump(index, endpoint, model, prompt, options, stats, events)
+            )
+
+        launch(0)
+        next_index = 1
+
+        try:
+            while winner is None:
+                can_hedge = len(hedged) < self.max_hedges and next_index < len(candidates)
+                timeout = self.hedge_after_ms / 1000 if can_hedge else None
+                try:
+                    index, kind, payload = await asyncio.wait_for(events.get(), timeout)
+                except asyncio.TimeoutError:
+                    logger.info(f"No first token within {self.hedge_after_ms}ms, "
+                                f"hedging to {candidates[next_index].name}")
+                    metrics.incr("llm_hedges_fired")
+                    hedged.add(next_index)
+                    launch(next_index)
+                    next_index += 1
+                    continue
+
+                endpoint = candidates[index]
+                if kind == "error":
+                    endpoint.record_failure(self.failure_cooldown)
+                    attempts.pop(index, None)
+                    logger.warning(f"LLM endpoint {endpoint.name} failed: {payload}")
+                    if next_index < len(candidates):
+                        metrics.incr("llm_failovers")
+                        launch(next_index)
+                        next_index += 1
+                    elif not attempts:
+                        raise payload
+                    continue
+
+                # First token (or an empty but complete reply) decides the race
+                winner = index
+                first_token_ms = (time.monotonic() - started_at[index]) * 1000
+                endpoint.record_success(first_token_ms)
+                metrics.observe("llm_first_token_ms", first_token_ms, endpoint=endpoint.name)
+                if index in hedged:
+                    metrics.incr("llm_hedges_won")
+
+                for other, task in attempts.items():
+                    if other != winner:
+                        task.cancel()
+
+                if kind == "done":
+                    return
+                yield payload
+
+            while True:
+                index, kind, payload = await events.get()
+                if index != winner:
+                    continue
+                if kind == "done":
+                    return
+                if kind == "error":
+                    candidates[index].record_failure(self.failure_cooldown)
+                    raise payload
+                yield payload
+        finally:
+            for task in attempts.values():
+                task.cancel()
+
+    async def _pump(self, index: int, endpoint: LLMEndpoint, model: str, prompt: str,
+                    options: Optional[Dict[str, Any]], stats: Optional[Dict[str, Any]], events: asyncio.Queue):
+        try:
+            async for token in self._stream_endpoint(endpoint, endpoint.model or model, prompt, options, stats):
+                await events.put((index, "token", token))
+            await events.put((index, "done", None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await events.put((index, "error", e))
+
+    async def _stream_endpoint(self, endpoint: LLMEndpoint, model: str, prompt: str,
+                               options: Optional[Dict[str, Any]],
+                               stats: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        if endpoint.kind == "ollama":
+            url = f"{endpoint.url}/api/generate"
+            payload = {"model": model, "prompt": prompt, "stream": True}
+            if options:
+                options = dict(options)
+                # keep_alive is a request field in Ollama's API, not a model option
+                if "keep_alive" in options:
+                    payload["keep_alive"] = options.pop("keep_alive")
+                payload["options"] = options
+        else:
+            url = f"{endpoint.url}/v1/chat/completions"
+            payload = {"model": model, "messages": [{"role": "user", "content": prompt}], "stream": True}
+
+        async with self.http_client.stream("POST", url, json=payload) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"{endpoint.name} returned HTTP {response.status_code}")
+
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+
+                if endpoint.kind == "ollama":
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        chunk_log.warning(f"bad_chunk:{endpoint.name}", f"Invalid JSON chunk from {endpoint.name}: {line[:200]}")
+                        continue
+                    if "error" in data:
+                        raise RuntimeError(data["error"])
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done", False):
+                        if stats is not None and "prompt_eval_duration" in data:
+                            # Only the winning stream gets this far; hedges are cancelled earlier
+                            stats["prompt_tokens"] = data.get("prompt_eval_count")
+                            stats["prefill_ms"] = data["prompt_eval_duration"] / 1e6
+                        return
+                else:
+                    if not line.startswith("data:"):
+                        continue
+                    data_str = line[len("data:"):].strip()
+                    if data_str == "[DONE]":
+                        return
+                    delta = json.loads(data_str)["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        yield delta["content"]
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [endpoint.to_dict() for endpoint in self.endpoints]
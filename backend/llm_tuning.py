@@ -0,0 +1,204 @@
+"""
+LLM Tuning - Per-model Ollama option profiles and an offline autotuner
+Every generation request carries the options of a named profile (num_ctx,
+num_batch, num_thread, num_predict, keep_alive, ...). Built-in profiles
+apply to any model; `autotune` sweeps options against a running Ollama,
+measures prefill and decode throughput, and writes the best combination
+as the model's "tuned" profile, which then becomes its default:
+
+    python -m backend.llm_tuning autotune --model captaineris-nebula:latest
+    python -m backend.llm_tuning show
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from backend.context_window import optimal_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "backend/data/llm_profiles.json"
+
+# num_ctx is filled in per model from its optimal context, which the prompt is already sized to
+BUILTIN_PROFILES = {
+    "balanced": {"keep_alive": "30m"},
+    "fast": {"num_predict": 192, "keep_alive": "30m"},  # Caps reply length; spoken replies are short
+    "ollama": {},  # Server defaults, as before profiles existed
+}
+DEFAULT_PROFILE = "balanced"
+
+
+class LLMProfiles:
+    """Option profiles by model: tuned ones from the profiles file, then the built-ins"""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            self.models = {}
+            return
+        with open(self.path, "r") as f:
+            self.models = json.load(f)
+        logger.info(f"Loaded LLM option profiles for {len(self.models)} model(s) from {self.path}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.models, f, indent=2)
+
+    def names(self, model: str) -> List[str]:
+        return sorted({*self.models.get(model, {}).get("profiles", {}), *BUILTIN_PROFILES})
+
+    def default_name(self, model: str) -> str:
+        return self.models.get(model, {}).get("default", DEFAULT_PROFILE)
+
+    def options(self, model: str, profile: str = None) -> Dict[str, Any]:
+        """Options for a request; unknown profile names fall back to the model's default"""
+        tuned = self.models.get(model, {}).get("profiles", {})
+        name = profile or self.default_name(model)
+        if name not in tuned and name not in BUILTIN_PROFILES:
+            logger.warning(f"Unknown LLM profile '{name}' for {model}, using '{self.default_name(model)}'")
+            name = self.default_name(model)
+        if name in tuned:
+            return dict(tuned[name])
+        options = dict(BUILTIN_PROFILES.get(name, {}))
+        if name != "ollama":
+            options.setdefault("num_ctx", optimal_context(model))
+        return options
+
+    def set_tuned(self, model: str, options: Dict[str, Any], report: Dict[str, Any]):
+        entry = self.models.setdefault(model, {"profiles": {}})
+        entry["profiles"]["tuned"] = options
+        entry["default"] = "tuned"
+        entry["tuned_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        entry["autotune"] = report
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "builtin": sorted(BUILTIN_PROFILES),
+            "models": {
+                model: {"default": entry.get("default"), "profiles": entry.get("profiles", {}),
+                        "tuned_at": entry.get("tuned_at")}
+                for model, entry in self.models.items()
+            },
+        }
+
+
+# Filler in the shape of a conversation prompt; repeated to the size being measured
+FILLER = ("User: Can you remind me what we decided about the trip next month?\n"
+          "Assistant: We settled on the train on Friday morning and two nights near the old town.\n")
+
+
+def make_prompt(tokens: int) -> str:
+    # A unique first line defeats Ollama's prompt (KV) cache, so every run pays for its full prefill
+    body = FILLER * max(1, tokens * 4 // len(FILLER))
+    return f"Session {uuid.uuid4().hex}\n{body}User: Summarize that in one sentence.\nAssistant:"
+
+
+async def measure(http_client, url: str, model: str, options: Dict[str, Any], prompt: str) -> Dict[str, float]:
+    """One non-streamed generation; returns prefill/decode throughput from Ollama's own timings"""
+    options = dict(options)
+    payload = {"model": model, "prompt": prompt, "stream": False}
+    if "keep_alive" in options:
+        payload["keep_alive"] = options.pop("keep_alive")
+    payload["options"] = options
+    response = await http_client.post(f"{url}/api/generate", json=payload)
+    response.raise_for_status()
+    data = response.json()
+    prefill_s = data["prompt_eval_duration"] / 1e9
+    decode_s = data["eval_duration"] / 1e9
+    return {
+        "prompt_tokens": data.get("prompt_eval_count", 0),
+        "prefill_tps": data.get("prompt_eval_count", 0) / max(prefill_s, 1e-6),
+        "decode_tps": data.get("eval_count", 0) / max(decode_s, 1e-6),
+    }
+
+
+def candidate_grid(model: str, batches: List[int], threads: List[Optional[int]]) -> List[Dict[str, Any]]:
+    grid = []
+    for num_batch, num_thread in itertools.product(batches, threads):
+        options = {"num_ctx": optimal_context(model), "num_batch": num_batch, "num_predict": 64}
+        if num_thread:
+            options["num_thread"] = num_thread
+        grid.append(options)
+    return grid
+
+
+async def autotune(url: str, model: str, profiles: LLMProfiles, repeats: int = 3, reply_tokens: int = 60,
+                   batches: List[int] = None, threads: List[Optional[int]] = None) -> Dict[str, Any]:
+    """Sweep options, score each by the latency of a typical turn, and store the best as 'tuned'"""
+    import httpx
+
+    prompt_tokens = int(optimal_context(model) * 0.6)  # A well-filled prompt, as the compactor keeps it
+    cores = os.cpu_count() or 1
+    batches = batches or [128, 256, 512, 1024]
+    threads = threads or sorted({None, max(1, cores // 2), cores}, key=lambda n: n or 0)
+    results = []
+
+    async with httpx.AsyncClient(timeout=300.0) as http_client:
+        for options in candidate_grid(model, batches, threads):
+            # Changing num_ctx/num_batch reloads the model; keep that out of the measured runs
+            await measure(http_client, url, model, options, make_prompt(64))
+            runs = [await measure(http_client, url, model, options, make_prompt(prompt_tokens))
+                    for _ in range(repeats)]
+            prefill_tps = statistics.median(run["prefill_tps"] for run in runs)
+            decode_tps = statistics.median(run["decode_tps"] for run in runs)
+            measured_prompt = statistics.median(run["prompt_tokens"] for run in runs)
+            turn_ms = (measured_prompt / prefill_tps + reply_tokens / decode_tps) * 1000
+            results.append({"options": options, "prefill_tps": round(prefill_tps, 1),
+                            "decode_tps": round(decode_tps, 1), "turn_ms": round(turn_ms, 1)})
+            print(f"   {json.dumps(options):<75} prefill {prefill_tps:8.1f} tok/s  "
+                  f"decode {decode_tps:6.1f} tok/s  turn {turn_ms:7.0f}ms")
+
+    best = min(results, key=lambda result: result["turn_ms"])
+    # num_predict only bounded the measurement; replies keep their natural length
+    tuned = {key: value for key, value in best["options"].items() if key != "num_predict"}
+    tuned["keep_alive"] = "30m"
+    report = {"url": url, "prompt_tokens": prompt_tokens, "reply_tokens": reply_tokens,
+              "repeats": repeats, "best": best, "results": results}
+    profiles.set_tuned(model, tuned, report)
+    profiles.save()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama option profiles")
+    commands = parser.add_subparsers(dest="command", required=True)
+    tune = commands.add_parser("autotune", help="sweep options against a running Ollama and save the best")
+    tune.add_argument("--model", required=True)
+    tune.add_argument("--url", default="http://localhost:11434")
+    tune.add_argument("--profiles", default=DEFAULT_PATH)
+    tune.add_argument("--repeats", type=int, default=3)
+    tune.add_argument("--batches", type=int, nargs="+")
+    tune.add_argument("--threads", type=int, nargs="+", help="0 leaves num_thread to Ollama")
+    show = commands.add_parser("show", help="print the saved profiles")
+    show.add_argument("--profiles", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    profiles = LLMProfiles(args.profiles)
+    if args.command == "show":
+        print(json.dumps(profiles.status(), indent=2))
+        return
+
+    print(f"🔧 Autotuning {args.model} against {args.url}\n")
+    threads = [n or None for n in args.threads] if args.threads else None
+    report = asyncio.run(autotune(args.url, args.model, profiles, args.repeats, batches=args.batches, threads=threads))
+    best = report["best"]
+    print(f"\n✅ Best: {json.dumps(best['options'])} ({best['turn_ms']:.0f}ms per typical turn)")
+    print(f"   Saved as the 'tuned' profile of {args.model} in {args.profiles}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,103 +1,290 @@
-from fastapi import FastAPI, WebSocket, HTTPException, UploadFile, File
+from fastapi import FastAPI, WebSocket, HTTPException, UploadFile, File, Form, Header, Request
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
 import httpx
 import asyncio
+import base64
+import ipaddress
 import json
 import re
-from typing import Dict, Any
+import os
+import time
+import uuid
+from typing import Dict, Any, Optional
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from backend import lazy_imports
+from backend.context_window import ContextCompactor, estimate_tokens
+from backend.conversation_store import ConversationStore
+from backend.f5_tts_client import call_f5_tts, configure as configure_f5_client, unload_f5_model
+from backend.frame_sender import FrameSender
+from backend.gpu_arbiter import CallbackBackend, GPUArbiter, OllamaBackend, PinnedBackend
+from backend.llm_router import LLMRouter
+from backend.live_config import LiveConfig
+from backend.llm_tuning import LLMProfiles
+from backend.metrics import metrics
+from backend.response_cache import SharedCache, TTLCache, llm_cache_key, tts_cache_key
+from backend.replay_buffer import ReplayStore
+from backend.service_discovery import ServiceDiscovery
+from backend.shared_state import AdmissionLimiter, create_store
+from backend.startup import StartupOrchestrator
+from backend.static_assets import StaticAssets
+from backend.structured_logging import RateLimitedLogger, bind_log_context, configure_logging
+from backend.synthesis_profiles import DEFAULT_PROFILES, SynthesisProfileSelector
+from backend.tts_quality import DEFAULT_LEVELS, TTSQualityControl, audio_seconds, level_name
+from backend.tts_scheduler import TTSScheduler
+from backend.turn_traces import TraceBuffer, current_trace, trace_event
+from backend.voice_references import ReferenceLibrary
+from backend.whisper_worker import WhisperWorker
+
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Brain - Streaming Chat UI")
 
-# Configuration
-CONFIG = {
+# Read only while the app is built; changing them in the config file needs a restart
+RESTART_KEYS = [
+    "whisper_python", "whisper_model", "warmup_timeout", "warmup_retry_interval", "vad_backend", "vad_options",
+    "ffmpeg_path", "decoder_pool_size", "gpu_capacity_mb", "gpu_footprints_mb", "conversation_db",
+    "retrieval_index_dir", "embedding_model", "log_format", "workers", "shared_state_path",
+    "stitch_sample_rate", "reference_library_dir", "trace_max_turns", "trace_per_session",
+    "trace_max_sessions", "trace_max_events", "discovery_enabled", "discovery_ports", "discovery_cache_path",
+    "discovery_ttl", "discovery_interval", "config_watch_interval", "static_assets_enabled",
+]
+
+# Configuration: defaults here, overrides in backend/data/config.json (see /admin/config)
+CONFIG = LiveConfig({
     "ollama_base_url": "http://localhost:11434",
     "tts_webui_base_url": "http://localhost:8881",  # NEW port for new system
+    "f5_gradio_url": "http://localhost:7771",
+    "f5_openai_urls": ["http://localhost:7778", "http://localhost:8880"],
     "default_llm_model": "captaineris-nebula:latest",
     "default_tts_voice": "af_heart",
-    "default_tts_model": "kokoro"
-}
+    "default_tts_model": "kokoro",
+    "whisper_python": "/home/jenith/Voice/TTS-WebUI/installer_files/env/bin/python",
+    "whisper_model": "base",
+    "warmup_timeout": 120.0,
+    "warmup_retry_interval": 10.0,
+    "synthesis_profiles": DEFAULT_PROFILES,
+    # Quality ladder per primary engine, best first: (engine, synthesis profile) levels. A session
+    # steps down when this many sentences wait for TTS, or any wait and its real-time factor (seconds
+    # of synthesis per second of audio) is above tts_rtf_high; it steps back up after
+    # tts_quality_upgrade_after sentences with nothing waiting and a real-time factor below tts_rtf_low
+    "tts_quality_levels": DEFAULT_LEVELS,
+    "tts_backlog_threshold": 2,
+    "tts_rtf_high": 1.0,
+    "tts_rtf_low": 0.5,
+    "tts_quality_hold_sentences": 2,  # Sentences between two switches
+    "tts_quality_upgrade_after": 3,
+    "vad_backend": "energy",
+    "vad_options": {},
+    "ffmpeg_path": "ffmpeg",
+    "decoder_pool_size": 2,
+    "llm_cache_enabled": False,  # Opt-in: replay cached replies for repeated prompts
+    "llm_cache_max_entries": 256,
+    "llm_cache_ttl": 3600.0,
+    "llm_cache_replay_delay_ms": 15,
+    "tts_cache_max_entries": 512,
+    # Extra OpenAI/Ollama-compatible endpoints, e.g. {"url": "http://gpu2:11434", "kind": "ollama"};
+    # empty means just ollama_base_url
+    "llm_endpoints": [],
+    "llm_hedge_after_ms": 1500,  # Race a second endpoint if no first token by then
+    "llm_max_hedges": 1,
+    "llm_read_ahead_tokens": 32,  # Tokens read from the LLM stream ahead of a slow client
+    # Single shared GPU: approximate VRAM per component, corrected by measurement where possible.
+    # The defaults fit together in the capacity, with a little left for the CUDA contexts
+    "gpu_capacity_mb": 8192,
+    "gpu_footprints_mb": {"llm": 4700, "kokoro": 600, "f5-tts": 1600, "whisper": 1000},
+    "conversation_db": "backend/data/conversations.db",
+    # Retrieval of domain knowledge and long-term memory into the prompt
+    "retrieval_enabled": False,
+    "retrieval_index_dir": "backend/data/retrieval",
+    "embedding_model": "nomic-embed-text",
+    "retrieval_top_k": 5,
+    "retrieval_min_score": 0.3,
+    "retrieval_token_budget": 512,
+    "retrieval_index_conversations": True,
+    # History is kept within each model's optimal_context; older turns are summarized between turns
+    "summary_model": None,  # None summarizes with the turn's own model, which is already loaded
+    "summary_max_words": 150,
+    "context_reply_reserve": 512,  # Tokens of the window left for the reply
+    "ws_token_window_ms": 25,  # Tokens are coalesced into at most one frame per window
+    # Per-connection send queue; a slow client fills it instead of stalling the LLM stream.
+    # Overflow policy: "coalesce" merges tokens, "drop" drops token frames (the sentence frame
+    # carries their text), "pause" waits for the client. Audio and other frames always wait
+    "ws_send_queue_bytes": 2_000_000,
+    "ws_send_queue_frames": 256,
+    "ws_overflow_policy": "coalesce",
+    # Reply frames kept per session so a reconnecting client can resume where it left off
+    "ws_replay_bytes": 4_000_000,
+    "ws_replay_frames": 2000,
+    "ws_replay_retention_s": 120,
+    "ws_replay_sessions": 100,
+    "log_level": "INFO",
+    "log_format": "text",  # "json" for one structured object per line
+    # Several uvicorn workers share caches, voice settings and admission slots through one SQLite file
+    "workers": 1,
+    "shared_state_path": "backend/data/shared_state.db",
+    "max_concurrent_turns": 4,  # Across all workers
+    "admission_timeout": 10.0,
+    # Stitch each reply's sentences into one cross-faded PCM stream instead of one mp3 per sentence.
+    # 16-bit PCM at 24 kHz is 48 KB per second of speech, several times the mp3 size
+    "tts_stitch_audio": False,
+    "stitch_sample_rate": 24000,
+    "stitch_gap_ms": 120,  # Pause between sentences once their own leading/trailing silence is trimmed
+    "stitch_crossfade_ms": 30,
+    # F5 reference recordings and their transcripts, stored by content hash
+    "reference_library_dir": "backend/reference_audio/library",
+    # TTS jobs run by priority: first sentence, rest of the reply, previews, batch
+    "tts_concurrency": {"kokoro": 2, "f5-tts": 1},
+    "tts_aging_s": 2.0,  # Seconds of waiting that raise a job one priority level
+    # Previews and batch jobs may be cancelled and re-queued for reply audio. A cancelled F5 call
+    # keeps running on the Gradio server, so preempting it would only free our slot, not the GPU
+    "tts_preempt": {"kokoro": True, "f5-tts": False},
+    # Timelines of recent turns for /debug/turns; memory is bounded by these counts
+    "trace_max_turns": 200,
+    "trace_per_session": 10,
+    "trace_max_sessions": 50,
+    "trace_max_events": 100,
+    # Ollama option profiles (num_ctx, num_batch, num_thread, keep_alive, ...); write tuned ones with
+    # `python -m backend.llm_tuning autotune --model <name>`. None uses each model's default profile
+    "llm_profiles_path": "backend/data/llm_profiles.json",
+    "llm_profile": None,
+    # The URLs above are defaults: at startup every candidate port is probed concurrently and
+    # the services found there replace them. Results are cached on disk for discovery_ttl seconds
+    "discovery_enabled": True,
+    "discovery_ports": [11434, 8880, 8881, 7770, 7771, 7778, 5000, 8080],
+    "discovery_cache_path": "backend/data/services.json",
+    "discovery_ttl": 600.0,
+    "discovery_interval": 300.0,  # Re-check this often; a stale cache triggers a new probe
+    # Overrides are applied at runtime without a restart; uvicorn --reload only watches .py files
+    "config_watch_interval": 2.0,
+    "config_drain_s": 60.0,  # Replaced LLM connection pools close after this, once streams on them end
+    # When set, /admin/config needs it in the X-Admin-Token header; unset, only this machine may use it
+    "admin_token": None,
+    # Frontend files are fingerprinted and precompressed in memory at startup; turn off while
+    # editing them so changes show up on reload without restarting
+    "static_assets_enabled": True
+}, "backend/data/config.json", RESTART_KEYS)
+CONFIG.load_file()
+
+# Records are written by a background thread; the event loop only enqueues them
+configure_logging(CONFIG["log_level"], CONFIG["log_format"])
+configure_f5_client(CONFIG["f5_gradio_url"], CONFIG["f5_openai_urls"])
+sentence_log = RateLimitedLogger(logger, limit=5, interval=10.0)
 
 class ChatService:
     def __init__(self):
-        self.http_client = httpx.AsyncClient(timeout=60.0)
+        self.connect_llm()
+        if CONFIG["workers"] > 1:
+            self.llm_cache = SharedCache(shared_store, "llm", CONFIG["llm_cache_max_entries"], CONFIG["llm_cache_ttl"])
+            self.tts_cache = SharedCache(shared_store, "tts", CONFIG["tts_cache_max_entries"], CONFIG["llm_cache_ttl"])
+        else:
+            self.llm_cache = TTLCache(CONFIG["llm_cache_max_entries"], CONFIG["llm_cache_ttl"])
+            self.tts_cache = TTLCache(CONFIG["tts_cache_max_entries"], CONFIG["llm_cache_ttl"])
+        self.llm_profiles = LLMProfiles(CONFIG["llm_profiles_path"])
+    
+    def connect_llm(self, http_client: httpx.AsyncClient = None) -> Optional[httpx.AsyncClient]:
+        """(Re)build the LLM router from CONFIG, on a new connection pool if one is given
+        
+        Returns the previous pool. Streams already running keep the old router and
+        pool, so the caller closes it later.
+        """
+        previous = getattr(self, "http_client", None)
+        self.http_client = http_client or previous or httpx.AsyncClient(timeout=60.0)
+        self.llm_router = LLMRouter.from_config(
+            CONFIG["llm_endpoints"] or [{"url": CONFIG["ollama_base_url"], "kind": "ollama"}],
+            self.http_client,
+            hedge_after_ms=CONFIG["llm_hedge_after_ms"],
+            max_hedges=CONFIG["llm_max_hedges"],
+            read_ahead=CONFIG["llm_read_ahead_tokens"]
+        )
+        return previous
     
     def is_sentence_boundary(self, text: str) -> bool:
         """Check if text ends with sentence boundary"""
         return bool(re.search(r'[.!?]\s*$', text.strip()))
     
-    async def stream_llm_response(self, message: str, model: str = None):
-        """Stream response from Ollama"""
+    async def stream_llm_response(self, message: str, model: str = None, use_cache: bool = True, context: str = "",
+                                  stats: Dict[str, Any] = None, profile: str = None):
+        """Stream response from Ollama, replaying a cached stream for repeated prompts
+        
+        context is prepended to the message (retrieved knowledge, conversation prefix);
+        stats receives prefill timings of live (uncached) generations; profile names
+        the option profile sent with the request (the model's default if None)
+        """
         model = model or CONFIG["default_llm_model"]
+        prompt = f"{context}{message}"
+        options = self.llm_profiles.options(model, profile or CONFIG["llm_profile"])
         
-        payload = {
-            "model": model,
-            "prompt": message,
-            "stream": True
-        }
+        if not (CONFIG["llm_cache_enabled"] and use_cache):
+            async for chunk in self._stream_llm(prompt, model, stats, options):
+                yield chunk
+            return
+        
+        cache_key = llm_cache_key(model, message, context, options)
+        cached = await self.llm_cache.aget(cache_key)
+        if cached is not None:
+            metrics.incr("llm_cache", result="hit")
+            # Replay at a token pace so the client renders it like a live reply
+            delay = CONFIG["llm_cache_replay_delay_ms"] / 1000
+            for chunk in cached:
+                if delay and chunk["type"] == "token":
+                    await asyncio.sleep(delay)
+                yield chunk
+            return
         
+        metrics.incr("llm_cache", result="miss")
+        recorded = []
+        async for chunk in self._stream_llm(prompt, model, stats, options):
+            recorded.append(chunk)
+            # Only complete replies are cached; store before yielding since the consumer stops at done
+            if chunk["type"] == "done":
+                await self.llm_cache.aset(cache_key, recorded)
+            yield chunk
+    
+    async def _stream_llm(self, message: str, model: str, stats: Dict[str, Any] = None, options: Dict[str, Any] = None):
+        """Stream sentences and tokens from the LLM router"""
+        buffer = ""
         try:
-            async with self.http_client.stream(
-                "POST",
-                f"{CONFIG['ollama_base_url']}/api/generate",
-                json=payload
-            ) as response:
-                if response.status_code != 200:
-                    logger.error(f"Ollama error: {response.status_code}")
-                    return
-                
-                buffer = ""
-                async for chunk in response.aiter_text():
-                    if not chunk.strip():
-                        continue
+            async with gpu_arbiter.use("llm", model):
+                async for token in self.llm_router.stream(model, message, options, stats=stats):
+                    buffer += token
                     
-                    try:
-                        data = json.loads(chunk)
-                        if "response" in data:
-                            token = data["response"]
-                            buffer += token
-                            
-                            # Check for sentence boundary
-                            if self.is_sentence_boundary(buffer):
-                                yield {"type": "sentence", "text": buffer.strip()}
-                                buffer = ""
-                            else:
-                                yield {"type": "token", "text": token}
-                        
-                        if data.get("done", False):
-                            # Send any remaining buffer
-                            if buffer.strip():
-                                yield {"type": "sentence", "text": buffer.strip()}
-                            yield {"type": "done"}
-                            break
-                            
-                    except json.JSONDecodeError:
-                        logger.warning(f"Invalid JSON chunk: {chunk}")
-                        continue
+                    # Check for sentence boundary
+                    if self.is_sentence_boundary(buffer):
+                        yield {"type": "sentence", "text": buffer.strip()}
+                        buffer = ""
+                    else:
+                        yield {"type": "token", "text": token}
+            
+            # Send any remaining buffer
+            if buffer.strip():
+                yield {"type": "sentence", "text": buffer.strip()}
+            yield {"type": "done"}
                         
         except Exception as e:
-            logger.error(f"Error streaming from Ollama: {e}")
+            logger.error(f"Error streaming from LLM: {e}")
             yield {"type": "error", "message": str(e)}
     
-    async def generate_tts(self, text: str, voice: str = None, model: str = None, ref_audio_path: str = None, ref_text: str = None):
+    async def complete(self, model: str, prompt: str, options: Dict[str, Any] = None) -> str:
+        """Non-interactive generation (summaries), collected into one string"""
+        # Same num_ctx/keep_alive as the chat requests, so a summary doesn't make Ollama reload the model
+        options = {**self.llm_profiles.options(model, CONFIG["llm_profile"]), **(options or {})}
+        async with gpu_arbiter.use("llm", model):
+            return "".join([token async for token in self.llm_router.stream(model, prompt, options)])
+    
+    async def generate_tts(self, text: str, voice: str = None, model: str = None, ref_audio_path: str = None, ref_text: str = None,
+                           synthesis_params: Dict[str, Any] = None, response_format: str = "mp3"):
         """Generate TTS audio from text"""
         voice = voice or CONFIG["default_tts_voice"]
         model = model or CONFIG["default_tts_model"]
+        synthesis_params = synthesis_params or {}
         
         # Handle F5-TTS separately
         if model == "f5-tts":
-            logger.info("Using F5-TTS for voice generation")
+            logger.debug("Using F5-TTS for voice generation")
             try:
-                from backend.f5_tts_client import call_f5_tts
-                import tempfile
-                import os
-                
                 # Get or create default reference audio
                 if not ref_audio_path:
                     # Use a default reference audio if none provided
@@ -113,21 +300,30 @@ class ChatService:
                             with open(default_ref_text_file, "r") as f:
                                 ref_text = f.read().strip()
                     else:
-                        logger.warning("No reference audio for F5-TTS, falling back to Kokoro")
+                        sentence_log.warning("f5_no_reference", "No reference audio for F5-TTS, falling back to Kokoro")
+                        trace_event("tts_fallback", from_engine="f5-tts", engine="kokoro", reason="no reference audio")
                         model = "kokoro"
                         voice = "af_heart"
                 
                 if ref_audio_path:
-                    audio_data = await call_f5_tts(text, ref_audio_path, ref_text or "")
+                    if not ref_text:
+                        # Transcribed once per recording; an empty ref_text makes F5 run ASR every sentence
+                        ref_text = await reference_library.text_for_file(ref_audio_path)
+                    start = time.monotonic()
+                    audio_data = await call_f5_tts(text, ref_audio_path, ref_text or "", **synthesis_params)
+                    metrics.observe("f5_synthesis_ms", (time.monotonic() - start) * 1000,
+                                    ref_text="sent" if ref_text else "server_asr")
                     if audio_data:
                         return audio_data
                     else:
-                        logger.warning("F5-TTS failed, falling back to Kokoro")
+                        sentence_log.warning("f5_failed", "F5-TTS failed, falling back to Kokoro")
+                        trace_event("tts_fallback", from_engine="f5-tts", engine="kokoro", reason="no audio")
                         model = "kokoro"
                         voice = "af_heart"
                         
             except Exception as e:
                 logger.error(f"F5-TTS error: {e}, falling back to Kokoro")
+                trace_event("tts_fallback", from_engine="f5-tts", engine="kokoro", reason=str(e))
                 model = "kokoro"
                 voice = "af_heart"
         
@@ -136,8 +332,10 @@ class ChatService:
             "input": text,
             "voice": voice,
             "model": model,
-            "response_format": "mp3"
+            "response_format": response_format
         }
+        if "speed" in synthesis_params:
+            payload["speed"] = synthesis_params["speed"]
         
         try:
             response = await self.http_client.post(
@@ -156,15 +354,365 @@ class ChatService:
             logger.error(f"Error generating TTS: {e}")
             return None
 
+# Process memory with one worker, a shared SQLite file with several
+shared_store = create_store(CONFIG["shared_state_path"] if CONFIG["workers"] > 1 else None)
+turn_admission = AdmissionLimiter(shared_store, "turns", CONFIG["max_concurrent_turns"])
+
 # Global service instance
 chat_service = ChatService()
+turn_traces = TraceBuffer(CONFIG["trace_max_turns"], CONFIG["trace_per_session"], CONFIG["trace_max_sessions"],
+                          CONFIG["trace_max_events"])
+profile_selector = SynthesisProfileSelector(CONFIG["synthesis_profiles"])
+tts_quality = TTSQualityControl(
+    CONFIG["tts_quality_levels"], CONFIG["tts_backlog_threshold"], CONFIG["tts_rtf_high"], CONFIG["tts_rtf_low"],
+    CONFIG["tts_quality_hold_sentences"], CONFIG["tts_quality_upgrade_after"]
+)
+tts_scheduler = TTSScheduler(CONFIG["tts_concurrency"], aging_s=CONFIG["tts_aging_s"], preempt=CONFIG["tts_preempt"])
+
+async def synthesize(engine: str, job_class: str, text: str, voice: str = None, **options):
+    """generate_tts through the priority queue, holding the engine resident while it runs"""
+    async def job():
+        async with gpu_arbiter.use(engine):
+            return await chat_service.generate_tts(text, voice, engine, **options)
+    return await tts_scheduler.run(engine, job_class, job)
+whisper_worker = WhisperWorker(CONFIG["whisper_python"], CONFIG["whisper_model"])
+gpu_arbiter = GPUArbiter(CONFIG["gpu_capacity_mb"])
+footprints = CONFIG["gpu_footprints_mb"]
+ollama_backend = OllamaBackend(chat_service.http_client, CONFIG["ollama_base_url"], CONFIG["default_llm_model"],
+                               lambda model: chat_service.llm_profiles.options(model, CONFIG["llm_profile"]))
+gpu_arbiter.register("llm", ollama_backend, footprints["llm"])
+gpu_arbiter.register("kokoro", PinnedBackend(), footprints["kokoro"])  # Docker service, always loaded
+gpu_arbiter.register("f5-tts", CallbackBackend(unload=unload_f5_model), footprints["f5-tts"])  # Loads on first generation
+gpu_arbiter.register("whisper", CallbackBackend(whisper_worker.start, whisper_worker.stop), footprints["whisper"])
+# Another worker's writes would leave this worker's cached history stale, so only one worker caches
+conversation_store = ConversationStore(CONFIG["conversation_db"], cache_sessions=64 if CONFIG["workers"] == 1 else 0)
+
+async def summarize_history(model: str, prompt: str) -> str:
+    summary_model = CONFIG["summary_model"] or model
+    # ~1.4 tokens per word leaves room to finish the last sentence
+    return await chat_service.complete(summary_model, prompt, {"num_predict": int(CONFIG["summary_max_words"] * 1.4)})
+
+context_compactor = ContextCompactor(
+    conversation_store, summarize_history,
+    reply_reserve=CONFIG["context_reply_reserve"], summary_max_words=CONFIG["summary_max_words"]
+)
+frame_senders: Dict[str, FrameSender] = {}  # Open WebSocket connections by session
+streaming_senders: Dict[str, FrameSender] = {}  # Connections with a reply in progress, by session
+replay_store = ReplayStore(CONFIG["ws_replay_bytes"], CONFIG["ws_replay_frames"], CONFIG["ws_replay_retention_s"],
+                           CONFIG["ws_replay_sessions"])
+startup = StartupOrchestrator(CONFIG["warmup_timeout"], CONFIG["warmup_retry_interval"])
+
+async def warm_ollama():
+    """Probe Ollama and load the default model into memory"""
+    response = await chat_service.http_client.get(f"{CONFIG['ollama_base_url']}/api/tags")
+    response.raise_for_status()
+    await gpu_arbiter.ensure_resident("llm", CONFIG["default_llm_model"])
+
+async def warm_kokoro():
+    """Run a tiny Kokoro synthesis so the first reply skips its first-inference cost"""
+    audio_data = await synthesize("kokoro", "batch", "Ready.", CONFIG["default_tts_voice"])
+    if not audio_data:
+        raise RuntimeError("Kokoro synthesis returned no audio")
+
+async def warm_f5():
+    """Run a tiny F5-TTS synthesis if a chat reference voice is configured"""
+    ref_dir = "backend/reference_audio"
+    default_ref = os.path.join(ref_dir, "default_reference.wav")
+    if not os.path.exists(default_ref):
+        return "skipped"
+
+    default_ref_text_file = os.path.join(ref_dir, "default_reference.txt")
+    if os.path.exists(default_ref_text_file):
+        with open(default_ref_text_file, "r") as f:
+            ref_text = f.read().strip()
+    else:
+        # Transcribed here, at start-up, rather than on the first reply's first sentence
+        ref_text = await reference_library.text_for_file(default_ref)
+
+    async def job():
+        async with gpu_arbiter.use("f5-tts"):
+            return await call_f5_tts("Ready.", default_ref, ref_text)
+    audio_data = await tts_scheduler.run("f5-tts", "batch", job)
+    if not audio_data:
+        raise RuntimeError("F5-TTS synthesis returned no audio")
+
+async def warm_imports():
+    """Import heavy optional clients off the event loop before the first request needs them"""
+    modules = ["backend.audio_preprocess", "backend.retrieval", "gradio_client"]
+    if CONFIG["tts_stitch_audio"]:
+        modules.append("backend.audio_stitch")
+    await lazy_imports.preload(*modules)
+
+async def get_voice_settings(session_id: str) -> Dict[str, Any]:
+    """F5 reference voice chosen by a session, shared by every worker"""
+    raw = await asyncio.to_thread(shared_store.get, f"voice:{session_id}")
+    return json.loads(raw) if raw else {}
+
+async def transcribe_reference(audio: bytes) -> str:
+    return (await transcribe_speech(audio))["text"]
+
+reference_library = ReferenceLibrary(CONFIG["reference_library_dir"], transcribe_reference)
+
+async def save_voice_settings(session_id: str, ref_audio: bytes, ref_text: str = ""):
+    # Content-addressed, so sessions sharing a recording share the file, its transcript and its cached audio
+    settings = await reference_library.save(ref_audio, ref_text)
+    await asyncio.to_thread(shared_store.set, f"voice:{session_id}", json.dumps(settings).encode())
+    return settings
+
+_audio_decoder = None
+
+async def get_audio_decoder():
+    """Shared decoder for transcription and VAD, with its ffmpeg pool started on first use"""
+    global _audio_decoder
+    if _audio_decoder is None:
+        decoder_module = lazy_imports.load("backend.audio_decoder")
+        decoder = decoder_module.AudioDecoder(CONFIG["ffmpeg_path"], CONFIG["decoder_pool_size"])
+        await decoder.start()
+        _audio_decoder = decoder
+    return _audio_decoder
+
+async def warm_decoder():
+    await asyncio.to_thread(lazy_imports.load, "backend.audio_decoder")
+    await get_audio_decoder()
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
+_stitch_decoder = None
+
+def get_stitch_decoder():
+    """Decoder at the stitching rate; its ffmpeg process is only spawned for non-WAV audio"""
+    global _stitch_decoder
+    if _stitch_decoder is None:
+        decoder_module = lazy_imports.load("backend.audio_decoder")
+        _stitch_decoder = decoder_module.AudioDecoder(CONFIG["ffmpeg_path"], 1, CONFIG["stitch_sample_rate"])
+    return _stitch_decoder
+
+_vad = None
+
+def get_vad():
+    """VAD instance for transcription, created on first use since it needs NumPy"""
+    global _vad
+    if _vad is None:
+        preprocess = lazy_imports.load("backend.audio_preprocess")
+        _vad = preprocess.create_vad(CONFIG["vad_backend"], **CONFIG["vad_options"])
+    return _vad
+
+startup.register("ollama", warm_ollama)
+startup.register("kokoro", warm_kokoro)
+startup.register("f5_tts", warm_f5, critical=False)
+async def warm_whisper():
+    await gpu_arbiter.ensure_resident("whisper")
+
+startup.register("whisper", warm_whisper, critical=False)
+startup.register("imports", warm_imports, critical=False)
+startup.register("audio_decoder", warm_decoder, critical=False)
+
+_retriever = None
+
+def get_retriever():
+    """Knowledge retriever over the on-disk vector index, created on first use since it needs NumPy"""
+    global _retriever
+    if _retriever is None:
+        retrieval = lazy_imports.load("backend.retrieval")
+        index = retrieval.VectorIndex(CONFIG["retrieval_index_dir"])
+        embedder = retrieval.OllamaEmbedder(chat_service.http_client, CONFIG["ollama_base_url"], CONFIG["embedding_model"])
+        _retriever = retrieval.KnowledgeRetriever(
+            index, embedder, CONFIG["retrieval_top_k"], CONFIG["retrieval_min_score"]
+        )
+    return _retriever
+
+async def retrieve_context(message: str) -> str:
+    """Knowledge block for the prompt, kept within the retrieval token budget"""
+    if not CONFIG["retrieval_enabled"]:
+        return ""
+    try:
+        retriever = get_retriever()
+        start = time.monotonic()
+        hits = await retriever.retrieve(message)
+        metrics.observe("retrieval_ms", (time.monotonic() - start) * 1000)
+        return retriever.build_context(hits, CONFIG["retrieval_token_budget"])
+    except Exception as e:
+        logger.warning(f"Retrieval failed, answering without context: {e}")
+        return ""
+
+async def remember_turn(session_id: str, message: str, reply: str):
+    """Index a finished exchange as long-term memory"""
+    try:
+        await get_retriever().add_documents(
+            [f"User: {message}\nAssistant: {reply}"], source=f"session:{session_id}",
+            kind="memory", session_id=session_id
+        )
+    except Exception as e:
+        logger.warning(f"Could not index turn into memory: {e}")
+
+# What to rebuild when a setting changes at runtime; settings not listed here are read per use
+async def close_after(client: httpx.AsyncClient, delay: float):
+    await asyncio.sleep(delay)
+    await client.aclose()
+
+async def reconnect_llm(changed: Dict[str, Any]):
+    if not changed.keys() & {"ollama_base_url", "llm_endpoints"}:
+        chat_service.connect_llm()  # Same pool, new hedging settings
+        return
+    # Building a client loads the CA bundle (~50ms), so it happens off the event loop
+    previous = chat_service.connect_llm(await asyncio.to_thread(httpx.AsyncClient, timeout=60.0))
+    ollama_backend.http_client = chat_service.http_client
+    ollama_backend.base_url = CONFIG["ollama_base_url"]
+    if _retriever is not None:
+        _retriever.embedder.http_client = chat_service.http_client
+        _retriever.embedder.base_url = CONFIG["ollama_base_url"]
+    asyncio.create_task(close_after(previous, CONFIG["config_drain_s"]))
+
+def reload_llm_profiles(changed: Dict[str, Any]):
+    if "llm_profiles_path" in changed:
+        chat_service.llm_profiles = LLMProfiles(CONFIG["llm_profiles_path"])
+
+def resize_caches(changed: Dict[str, Any]):
+    # Entries stay: their keys already name the model, voice and options they were made with
+    chat_service.llm_cache.max_entries = CONFIG["llm_cache_max_entries"]
+    chat_service.llm_cache.ttl = chat_service.tts_cache.ttl = CONFIG["llm_cache_ttl"]
+    chat_service.tts_cache.max_entries = CONFIG["tts_cache_max_entries"]
+
+def resize_replay(changed: Dict[str, Any]):
+    # Sessions that already have a buffer keep its limits until it expires
+    replay_store.max_bytes = CONFIG["ws_replay_bytes"]
+    replay_store.max_frames = CONFIG["ws_replay_frames"]
+    replay_store.retention_s = CONFIG["ws_replay_retention_s"]
+    replay_store.max_sessions = CONFIG["ws_replay_sessions"]
+
+def retune_retrieval(changed: Dict[str, Any]):
+    if _retriever is not None:
+        _retriever.top_k = CONFIG["retrieval_top_k"]
+        _retriever.min_score = CONFIG["retrieval_min_score"]
+
+def retune_tts(changed: Dict[str, Any]):
+    configure_f5_client(CONFIG["f5_gradio_url"], CONFIG["f5_openai_urls"])
+    tts_scheduler.reconfigure(CONFIG["tts_concurrency"], CONFIG["tts_aging_s"], CONFIG["tts_preempt"])
+    profile_selector.profiles = CONFIG["synthesis_profiles"]
+    tts_quality.levels = CONFIG["tts_quality_levels"]
+    tts_quality.backlog_high = CONFIG["tts_backlog_threshold"]
+    tts_quality.rtf_high, tts_quality.rtf_low = CONFIG["tts_rtf_high"], CONFIG["tts_rtf_low"]
+    tts_quality.hold_sentences = CONFIG["tts_quality_hold_sentences"]
+    tts_quality.upgrade_after = CONFIG["tts_quality_upgrade_after"]
+
+def retune_turns(changed: Dict[str, Any]):
+    turn_admission.limit = CONFIG["max_concurrent_turns"]
+    context_compactor.reply_reserve = CONFIG["context_reply_reserve"]
+    context_compactor.summary_max_words = CONFIG["summary_max_words"]
+    logging.getLogger().setLevel(CONFIG["log_level"])
+
+CONFIG.on_change(["ollama_base_url", "llm_endpoints", "llm_hedge_after_ms", "llm_max_hedges", "llm_read_ahead_tokens"],
+                 reconnect_llm)
+CONFIG.on_change(["llm_profiles_path", "llm_profile"], reload_llm_profiles)
+CONFIG.on_change(["llm_cache_max_entries", "llm_cache_ttl", "tts_cache_max_entries"], resize_caches)
+CONFIG.on_change(["ws_replay_bytes", "ws_replay_frames", "ws_replay_retention_s", "ws_replay_sessions"],
+                 resize_replay)
+CONFIG.on_change(["retrieval_top_k", "retrieval_min_score"], retune_retrieval)
+CONFIG.on_change(["f5_gradio_url", "f5_openai_urls", "tts_concurrency", "tts_aging_s", "tts_preempt",
+                  "synthesis_profiles", "tts_quality_levels", "tts_backlog_threshold", "tts_rtf_high",
+                  "tts_rtf_low", "tts_quality_hold_sentences", "tts_quality_upgrade_after"], retune_tts)
+CONFIG.on_change(["max_concurrent_turns", "context_reply_reserve", "summary_max_words", "log_level"], retune_turns)
+_config_watch_task = None
+
+service_discovery = ServiceDiscovery(CONFIG["discovery_ports"], cache_path=CONFIG["discovery_cache_path"],
+                                     ttl=CONFIG["discovery_ttl"])
+_discovery_task = None
+
+def configured_services() -> Dict[str, Optional[str]]:
+    """Current URLs; discovery keeps them when they are among the ones found"""
+    return {"ollama": CONFIG["ollama_base_url"], "kokoro": CONFIG["tts_webui_base_url"],
+            "f5_gradio": CONFIG["f5_gradio_url"]}
+
+async def apply_services(result: Dict[str, Any]):
+    """Point CONFIG, and through its hooks the clients built from it, at the discovered services"""
+    found = result["services"]
+    changes = {}
+    if found["ollama"]:
+        changes["ollama_base_url"] = found["ollama"]
+    if found["kokoro"]:
+        changes["tts_webui_base_url"] = found["kokoro"]
+    if found["f5_gradio"]:
+        changes["f5_gradio_url"] = found["f5_gradio"]
+    kokoro_url = found["kokoro"] or CONFIG["tts_webui_base_url"]
+    f5_openai = [url for url in found["openai_speech"] if url != kokoro_url]
+    if f5_openai:
+        changes["f5_openai_urls"] = f5_openai
+    # Discovered, not chosen: kept out of the overrides file
+    await CONFIG.apply(changes, persist=False, source="discovery")
+
+    missing = [service for service in ("ollama", "kokoro", "f5_gradio") if not found[service]]
+    if missing:
+        logger.warning(f"Service discovery found no {', '.join(missing)}; keeping the configured URLs")
+
+async def discover_services():
+    """Apply the cached or freshly probed services, then keep re-checking in the background"""
+    global _discovery_task
+    if not CONFIG["discovery_enabled"]:
+        return
+    try:
+        result = await service_discovery.resolve(configured_services())
+        await apply_services(result)
+    except Exception as e:
+        logger.warning(f"Service discovery failed, using the configured URLs: {e}")
+    _discovery_task = asyncio.create_task(
+        service_discovery.run_periodic(CONFIG["discovery_interval"], apply_services, configured_services)
+    )
+
+def warn_per_worker_state():
+    """Name what each worker still keeps to itself when several run"""
+    if CONFIG["workers"] > 1:
+        logger.warning(
+            f"Running {CONFIG['workers']} workers: each one loads its own Whisper model and budgets the full "
+            f"gpu_capacity_mb ({CONFIG['gpu_capacity_mb']} MB) for itself, and a client that reconnects to "
+            f"another worker can't resume the reply it was receiving. Lower gpu_capacity_mb to this worker's "
+            f"share, or run one worker on a GPU host"
+        )
+
+@app.on_event("startup")
+async def on_startup():
+    warn_per_worker_state()
+    os.makedirs(os.path.dirname(CONFIG["conversation_db"]), exist_ok=True)
+    conversation_store.start()
+    if CONFIG["static_assets_enabled"]:
+        await asyncio.to_thread(static_assets.build)
+    # Warm-ups use the discovered URLs; dead ports fail on connect, so this is bounded
+    await discover_services()
+    startup.start()
+    global _config_watch_task
+    _config_watch_task = asyncio.create_task(CONFIG.watch(CONFIG["config_watch_interval"]))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await startup.stop()
+    for task in (_discovery_task, _config_watch_task):
+        if task is not None:
+            task.cancel()
+    await context_compactor.stop()
+    await conversation_store.stop()
+    await whisper_worker.stop()
+    if _audio_decoder is not None:
+        await _audio_decoder.stop()
+    if _stitch_decoder is not None:
+        await _stitch_decoder.stop()
+    shared_store.close()
+
+static_assets = StaticAssets("frontend/static", "frontend/index.html")
+
+if CONFIG["static_assets_enabled"]:
+    @app.get("/static/{name:path}")
+    async def get_static(name: str, request: Request):
+        """Serve a frontend file from memory, fingerprinted names with immutable caching"""
+        asset = static_assets.get(name)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return static_assets.response(request, asset)
+else:
+    # Read from disk on every request
+    app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
 
 @app.get("/", response_class=HTMLResponse)
-async def get_index():
+async def get_index(request: Request):
     """Serve the main chat interface"""
+    if static_assets.index is not None:
+        return static_assets.response(request, static_assets.index)
     return FileResponse("frontend/index.html")
 
 @app.get("/test-stt.html", response_class=HTMLResponse)
@@ -180,7 +728,147 @@ async def get_test_f5():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "config": CONFIG}
+    return {"status": "healthy", "config": public_config()}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once the critical path is warm, 503 until then"""
+    status = startup.status()
+    status["import_times_ms"] = lazy_imports.import_times()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Counters and timing summaries (synthesis profiles, latencies)"""
+    return metrics.snapshot()
+
+@app.get("/llm/endpoints")
+async def get_llm_endpoints():
+    """Health and first-token latency of each configured LLM endpoint"""
+    return {"endpoints": chat_service.llm_router.status()}
+
+@app.get("/llm/profiles")
+async def get_llm_profiles(model: str = None):
+    """Option profiles: built-in, tuned per model, and the options a model's profile resolves to"""
+    status = chat_service.llm_profiles.status()
+    if model:
+        status["resolved"] = {name: chat_service.llm_profiles.options(model, name)
+                              for name in chat_service.llm_profiles.names(model)}
+        status["default"] = chat_service.llm_profiles.default_name(model)
+    return status
+
+@app.get("/services")
+async def get_services(refresh: bool = False):
+    """Discovered service URLs and what answered on each port; refresh=true probes again"""
+    if refresh:
+        await apply_services(await service_discovery.discover(configured_services()))
+    return {"config": configured_services(), "discovery": service_discovery.result}
+
+@app.get("/gpu")
+async def get_gpu_status():
+    """Which models the GPU arbiter currently holds resident"""
+    return gpu_arbiter.status()
+
+@app.get("/debug/turns")
+async def get_debug_turns(session_id: str = None, engine: str = None, errors: bool = False,
+                          sort: str = "recent", limit: int = 20):
+    """Recent turn timelines; sort=slowest, errors=true (failed or cancelled) and engine narrow them down"""
+    return {
+        "buffer": turn_traces.status(),
+        "turns": turn_traces.query(session_id, engine, errors, sort, min(limit, 200)),
+    }
+
+@app.get("/debug/turns/export")
+async def export_debug_turns():
+    """Every retained turn timeline as a JSON file for offline analysis"""
+    return JSONResponse(
+        turn_traces.export(),
+        headers={"Content-Disposition": f"attachment; filename=turns-{int(time.time())}.json"}
+    )
+
+@app.get("/tts/quality")
+async def get_tts_quality():
+    """Each session's TTS quality level, measured real-time factors and recent switches"""
+    return tts_quality.status()
+
+@app.get("/tts/queue")
+async def get_tts_queue():
+    """Running and waiting TTS jobs per engine, and queue wait times per job class"""
+    return tts_scheduler.status()
+
+def public_config() -> Dict[str, Any]:
+    return {key: value for key, value in CONFIG.items() if key != "admin_token"}
+
+def is_loopback(host: Optional[str]) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+def check_admin(request: Request, token: Optional[str]):
+    if CONFIG["admin_token"]:
+        if token != CONFIG["admin_token"]:
+            raise HTTPException(status_code=403, detail="Admin token required")
+    elif not is_loopback(request.client.host if request.client else None):
+        # The server listens on every interface; without a token, settings only change from this machine
+        raise HTTPException(status_code=403, detail="Set admin_token to manage settings from another host")
+
+@app.get("/admin/config")
+async def get_admin_config(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Current settings, the overrides file and recent changes with their apply times"""
+    check_admin(request, x_admin_token)
+    return {**CONFIG.status(), "config": public_config()}
+
+@app.patch("/admin/config")
+async def patch_admin_config(changes: Dict[str, Any], request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Apply settings at runtime and save them to the overrides file; turns in progress keep the old ones"""
+    check_admin(request, x_admin_token)
+    try:
+        return await CONFIG.apply(changes, source="api")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/admission")
+async def get_admission():
+    """Turn slots in use across all workers, as seen from this worker"""
+    return {
+        "worker_pid": os.getpid(),
+        "workers": CONFIG["workers"],
+        "turns_in_use": await asyncio.to_thread(turn_admission.in_use),
+        "max_concurrent_turns": CONFIG["max_concurrent_turns"],
+    }
+
+@app.get("/ws/sessions")
+async def get_ws_sessions():
+    """Frame and byte rates, send queue and replay state of each open WebSocket connection"""
+    return {"sessions": [frames.stats() for frames in frame_senders.values()], "replay": replay_store.stats()}
+
+@app.get("/api/sessions/{session_id}/messages")
+async def get_session_messages(session_id: str, limit: int = 50, since: float = None):
+    """Persisted chat history of a session, oldest first"""
+    messages = await conversation_store.get_messages(session_id, limit, since)
+    return {"session_id": session_id, "messages": messages}
+
+@app.get("/api/sessions/{session_id}/turns")
+async def get_session_turns(session_id: str, limit: int = 50):
+    """Per-turn latency metrics of a session"""
+    turns = await conversation_store.get_turn_metrics(session_id, limit)
+    return {"session_id": session_id, "turns": turns}
+
+@app.get("/api/sessions/{session_id}/context")
+async def get_session_context(session_id: str):
+    """Rolling summary of a session and its per-turn prefill trend"""
+    return await context_compactor.status(session_id)
+
+@app.post("/api/knowledge")
+async def add_knowledge(payload: Dict[str, Any]):
+    """Add documents to the retrieval index: {"texts": [...], "source": "..."}"""
+    texts = payload.get("texts") or []
+    if not texts:
+        raise HTTPException(status_code=400, detail="No texts provided")
+    retriever = get_retriever()
+    chunks = await retriever.add_documents(texts, source=payload.get("source", "api"))
+    return {"success": True, "chunks_added": chunks, "total_chunks": retriever.index.count}
 
 @app.get("/models/ollama")
 async def get_ollama_models():
@@ -199,37 +887,21 @@ async def get_ollama_models():
         return {"models": [CONFIG["default_llm_model"]], "default": CONFIG["default_llm_model"]}
 
 @app.post("/api/upload-reference-audio")
-async def upload_reference_audio(file: UploadFile = File(...)):
-    """Upload reference audio for F5-TTS"""
+async def upload_reference_audio(file: UploadFile = File(...), ref_text: str = Form("")):
+    """Upload reference audio for F5-TTS, transcribing it unless ref_text is given"""
     try:
-        import tempfile
-        import os
-        import shutil
-        
         # Validate file type
         if not file.content_type.startswith('audio/'):
             return {"error": "File must be audio format"}
         
-        # Create TTS-WebUI reference directory if it doesn't exist
-        ref_dir = "/tmp/tts_references"
-        os.makedirs(ref_dir, exist_ok=True)
-        
-        # Save file with unique name
-        import uuid
-        ref_id = str(uuid.uuid4())
-        file_extension = os.path.splitext(file.filename)[1] or '.wav'
-        ref_path = os.path.join(ref_dir, f"{ref_id}{file_extension}")
-        
-        # Save uploaded file
-        with open(ref_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        logger.info(f"Reference audio saved: {ref_path}")
+        reference = await reference_library.save(await file.read(), ref_text)
+        logger.info(f"Reference audio saved: {reference['ref_audio_path']}")
         
         return {
             "success": True, 
-            "reference_id": ref_id,
-            "path": ref_path,
+            "reference_id": reference["ref_id"],
+            "path": reference["ref_audio_path"],
+            "ref_text": reference["ref_text"],
             "filename": file.filename
         }
         
@@ -244,7 +916,7 @@ async def generate_tts_endpoint(
     model: str = CONFIG["default_tts_model"]
 ):
     """Generate TTS for a text chunk"""
-    audio_data = await chat_service.generate_tts(text, voice, model)
+    audio_data = await synthesize(model, "batch", text, voice)
     if audio_data:
         return {"success": True, "audio_length": len(audio_data)}
     else:
@@ -253,74 +925,185 @@ async def generate_tts_endpoint(
 @app.post("/api/transcribe")
 async def transcribe_audio(file: UploadFile = File(...)):
     """Transcribe audio using Whisper via TTS-WebUI"""
-    import tempfile
-    import subprocess
-    import os
+    content = await file.read()
     
-    if not file.filename.endswith(('.wav', '.webm', '.ogg', '.mp3', '.flac')):
+    # Sniff the container instead of trusting the filename (Safari records mp4)
+    audio_format = lazy_imports.load("backend.audio_decoder").detect_format(content)
+    if audio_format == "unknown":
         raise HTTPException(status_code=400, detail="Unsupported audio format")
     
-    # Save uploaded audio to temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as temp_file:
-        content = await file.read()
-        temp_file.write(content)
-        temp_path = temp_file.name
-    
     try:
-        # Path to TTS-WebUI's Python environment
-        tts_webui_env = "/home/jenith/Voice/TTS-WebUI/installer_files/env/bin/python"
-        
-        # Create a simple transcription script
-        transcribe_script = f"""
-import whisper
-import sys
-
-try:
-    model = whisper.load_model('base')
-    result = model.transcribe('{temp_path}')
-    print(result['text'].strip())
-except Exception as e:
-    print(f"ERROR: {{e}}", file=sys.stderr)
-    sys.exit(1)
-"""
-        
-        # Write script to temp file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as script_file:
-            script_file.write(transcribe_script)
-            script_path = script_file.name
-        
-        # Run transcription
-        result = subprocess.run([
-            tts_webui_env, script_path
-        ], capture_output=True, text=True, timeout=30)
-        
-        # Clean up script
-        os.unlink(script_path)
-        
-        if result.returncode == 0:
-            transcribed_text = result.stdout.strip()
-            logger.info(f"Transcribed: {transcribed_text}")
-            return {"text": transcribed_text, "success": True}
-        else:
-            error_msg = result.stderr.strip()
-            logger.error(f"Whisper error: {error_msg}")
-            raise HTTPException(status_code=500, detail=f"Transcription failed: {error_msg}")
+        metrics.incr("stt_uploads", format=audio_format)
+        result = await transcribe_speech(content)
+        if result["speech_detected"]:
+            logger.info(f"Transcribed: {result['text']}")
+        return {"text": result["text"], "success": True, "speech_detected": result["speech_detected"]}
             
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         raise HTTPException(status_code=500, detail="Transcription timeout")
     except Exception as e:
         logger.error(f"Transcription error: {e}")
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
-    finally:
-        # Clean up audio file
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+
+async def transcribe_speech(content: bytes) -> Dict[str, Any]:
+    """Decode, trim silence and run Whisper; shared by uploads and reference transcripts"""
+    preprocess = lazy_imports.load("backend.audio_preprocess")
+    
+    # Decode once to 16 kHz mono and cut leading/trailing silence
+    decoder = await get_audio_decoder()
+    samples = await decoder.decode(content)
+    speech, stats = preprocess.trim_silence(samples, get_vad())
+    
+    metrics.observe("stt_upload_bytes", len(content))
+    metrics.observe("stt_trimmed_seconds", stats["trimmed_s"])
+    
+    if speech is None:
+        # Nothing to transcribe, so the model is never invoked
+        metrics.incr("stt_skipped_no_speech")
+        metrics.incr("stt_pcm_bytes_saved", samples.nbytes)
+        logger.info(f"No speech in {stats['original_s']:.1f}s recording, skipped transcription")
+        return {"text": "", "speech_detected": False}
+    
+    pcm = speech.tobytes()
+    metrics.incr("stt_pcm_bytes_saved", samples.nbytes - len(pcm))
+    
+    start = time.monotonic()
+    async with gpu_arbiter.use("whisper"):
+        transcribed_text = await whisper_worker.transcribe(pcm)
+    inference_ms = (time.monotonic() - start) * 1000
+    
+    # Inference cost scales with audio length, so trimmed seconds convert to saved time
+    speech_s = len(speech) / preprocess.SAMPLE_RATE
+    ms_per_audio_s = inference_ms / max(speech_s, 0.1)
+    metrics.observe("stt_inference_ms", inference_ms)
+    metrics.observe("stt_inference_ms_saved_est", stats["trimmed_s"] * ms_per_audio_s)
+    return {"text": transcribed_text, "speech_detected": True}
+
+async def speak_sentences(frames: FrameSender, sentence_queue: asyncio.Queue, voice: str, tts_model: str,
+                          use_cache: bool = True, voice_settings: Dict[str, Any] = None, stitch: bool = False):
+    """Synthesize queued sentences in order at the session's quality level, choosing a profile for each
+
+    With stitch, the reply goes out as one cross-faded PCM stream instead of a clip per sentence.
+    """
+    use_cache = use_cache and CONFIG["llm_cache_enabled"]
+    voice_settings = voice_settings or {}
+    quality = tts_quality.session(frames.session_id, tts_model)
+    # F5 clones the session's reference recording, so that is the voice the cache keys on;
+    # a session stepped down to Kokoro speaks with the voice the client picked
+    voices = {"f5-tts": f"ref:{voice_settings.get('ref_id', 'default')}", "kokoro": voice}
+    # WAV decodes in-process; mp3 would need ffmpeg and carries encoder padding at both ends
+    audio_format = "wav" if stitch else "mp3"
+    stitcher = clock = None
+    if stitch:
+        stitch_module = lazy_imports.load("backend.audio_stitch")
+        stitcher = stitch_module.AudioStitcher(
+            CONFIG["stitch_sample_rate"], CONFIG["stitch_gap_ms"], CONFIG["stitch_crossfade_ms"]
+        )
+        clock = stitch_module.StreamClock()
+    
+    async def send_pcm(samples, text: str, final: bool = False):
+        gap_s = clock.sent(len(samples) / CONFIG["stitch_sample_rate"])
+        if sentence_index > 1 and not final:
+            # Underrun: synthesis fell behind playback and the listener hears silence
+            metrics.observe("audio_stream_gap_ms", gap_s * 1000)
+        await frames.send_json({
+            "type": "audio_pcm",
+            "data": base64.b64encode(stitch_module.to_pcm16(samples)).decode(),
+            "sample_rate": CONFIG["stitch_sample_rate"],
+            "text": text,
+            "final": final
+        })
+    
+    trace = current_trace()
+    sentence_index = 0
+    while True:
+        text = await sentence_queue.get()
+        if text is None:
+            break
+        # Sentences still waiting behind this one mean TTS is behind the LLM
+        level = quality.select(sentence_queue.qsize())
+        engine = level["engine"]
+        engine_voice = voices.get(engine, voice)
+        bind_log_context(sentence_id=sentence_index, engine=engine)
+        
+        # Resolved before the lookup: a fast or brisk rendering mustn't be served for a quality one
+        profile, params = profile_selector.select(engine, sentence_index, level["profile"])
+        cache_key = tts_cache_key(engine, engine_voice, text, audio_format, params)
+        audio_data = await chat_service.tts_cache.aget(cache_key) if use_cache else None
+        if audio_data is not None:
+            metrics.incr("tts_cache", result="hit")
+            if trace:
+                trace.sentence(sentence_index, chars=len(text), engine=engine, profile=profile, cache="hit",
+                               audio_bytes=len(audio_data))
+        else:
+            start = time.monotonic()
+            # The first sentence decides when the listener hears anything, so it jumps the queue
+            audio_data = await synthesize(
+                engine, "first_sentence" if sentence_index == 0 else "reply", text, engine_voice,
+                ref_audio_path=voice_settings.get("ref_audio_path"), ref_text=voice_settings.get("ref_text"),
+                synthesis_params=params, response_format=audio_format
+            )
+            # Includes any wait behind other sessions' sentences (tts_queue_wait_ms on its own)
+            synthesis_ms = (time.monotonic() - start) * 1000
+            metrics.observe("tts_synthesis_ms", synthesis_ms, engine=engine, profile=profile)
+            if audio_data:
+                quality.record(f"{engine}/{profile}", synthesis_ms,
+                               audio_seconds(audio_data, text, params.get("speed", 1.0)))
+            sentence_log.info("tts_sentence", f"Synthesized {len(text)} chars",
+                              profile=profile, synthesis_ms=round(synthesis_ms))
+            if trace:
+                trace.sentence(sentence_index, chars=len(text), engine=engine, profile=profile,
+                               level=level_name(level), synthesis_ms=round(synthesis_ms, 1),
+                               audio_bytes=len(audio_data or b""))
+            if use_cache:
+                metrics.incr("tts_cache", result="miss")
+                if audio_data:
+                    await chat_service.tts_cache.aset(cache_key, audio_data)
+        sentence_index += 1
+        
+        if audio_data and stitcher is not None:
+            try:
+                samples = await get_stitch_decoder().decode(audio_data)
+            except Exception as e:
+                # End the stream cleanly and send this and later sentences as clips
+                sentence_log.warning("stitch_decode", f"Can't decode TTS audio for stitching ({e}), sending clips")
+                await send_pcm(stitcher.finish(), "", final=True)
+                stitcher = None
+            else:
+                ready, stats = stitcher.push(samples)
+                metrics.observe("tts_silence_trimmed_ms", stats["trimmed_ms"], engine=engine)
+                if "joint_silence_before_ms" in stats:
+                    metrics.observe("tts_joint_silence_ms", stats["joint_silence_before_ms"], mode="clips")
+                    metrics.observe("tts_joint_silence_ms", stats["joint_silence_after_ms"], mode="stitched")
+                await send_pcm(ready, text)
+                continue
+        
+        if audio_data:
+            # Send audio data (base64 encoded)
+            audio_b64 = base64.b64encode(audio_data).decode()
+            await frames.send_json({
+                "type": "audio",
+                "data": audio_b64,
+                "text": text
+            })
+    
+    if stitcher is not None:
+        await send_pcm(stitcher.finish(), "", final=True)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time chat"""
     await websocket.accept()
-    logger.info("WebSocket connection established")
+    # Clients reconnect with the id they were given so their history carries over
+    session_id = websocket.query_params.get("session_id") or uuid.uuid4().hex
+    bind_log_context(session_id=session_id)
+    frames = FrameSender(websocket, session_id, CONFIG["ws_token_window_ms"],
+                         max_queue_bytes=CONFIG["ws_send_queue_bytes"], max_queue_frames=CONFIG["ws_send_queue_frames"],
+                         overflow=CONFIG["ws_overflow_policy"], replay=replay_store.get(session_id))
+    frame_senders[session_id] = frames
+    # The epoch names this session's replay buffer, for the client to send back when it resumes
+    await frames.send_json({"type": "session", "session_id": session_id, "epoch": frames.replay.epoch})
+    logger.info(f"WebSocket connection established (session {session_id})")
     
     try:
         while True:
@@ -329,54 +1112,136 @@ async def websocket_endpoint(websocket: WebSocket):
             message_type = data.get("type")
             
             if message_type == "chat":
-                message = data.get("message", "")
-                model = data.get("model", CONFIG["default_llm_model"])
-                tts_voice = data.get("voice", CONFIG["default_tts_voice"])
-                primary_model = data.get("primary_model", "kokoro")  # Primary TTS model
-                
-                logger.info(f"Processing chat message with LLM: {model}, TTS: {primary_model}")
-                
-                # Stream response from LLM
-                async for chunk in chat_service.stream_llm_response(message, model):
-                    if chunk["type"] == "sentence":
-                        # Send text to client
-                        await websocket.send_json({
-                            "type": "text",
-                            "content": chunk["text"]
+                # This turn and its TTS tasks keep these settings even if they change mid-reply
+                config_token = CONFIG.pin()
+                # Everything taken from here on is given back in the finally, even if a setup step raises
+                trace = ticket = tts_task = None
+                turn_started = completed = False
+                reply_sentences = []
+                bytes_before = frames.bytes
+                try:
+                    message = data.get("message", "")
+                    model = data.get("model", CONFIG["default_llm_model"])
+                    tts_voice = data.get("voice", CONFIG["default_tts_voice"])
+                    primary_model = data.get("primary_model", "kokoro")  # Primary TTS model
+                    use_cache = data.get("cache", True)  # Clients can bypass the response cache per message
+                    stitch = data.get("stitch_audio", CONFIG["tts_stitch_audio"])
+                    llm_profile = data.get("llm_profile", CONFIG["llm_profile"])  # Option profile for this message
+                    
+                    turn_id = uuid.uuid4().hex
+                    bind_log_context(turn_id=turn_id)
+                    logger.info(f"Processing chat message with LLM: {model}, TTS: {primary_model}")
+                    turn_start = time.monotonic()
+                    # Current for this task and the TTS tasks it starts, so they can add events
+                    trace = turn_traces.start(session_id, turn_id, model, primary_model)
+                    trace.set(llm_profile=llm_profile or chat_service.llm_profiles.default_name(model))
+                    
+                    # Concurrent turns are capped across every worker sharing the state store
+                    ticket = await turn_admission.acquire(CONFIG["admission_timeout"])
+                    admission_wait_ms = (time.monotonic() - turn_start) * 1000
+                    metrics.observe("admission_wait_ms", admission_wait_ms)
+                    trace.set(admission_wait_ms=round(admission_wait_ms, 1))
+                    if ticket is None:
+                        metrics.incr("turns_rejected")
+                        trace.fail("rejected: no admission slot")
+                        await frames.send_json({
+                            "type": "error",
+                            "message": "Server is busy, please try again in a moment"
                         })
+                        continue
+                    
+                    gpu_arbiter.set_critical_path(["llm", primary_model])
+                    first_token_ms = None
+                    llm_stats = {}
+                    voice_settings = await get_voice_settings(session_id)
+                    
+                    # Background summarization yields the GPU until the turn ends
+                    context_compactor.begin_turn()
+                    turn_started = True
+                    # Sentences are synthesized by a separate task so TTS never stalls the LLM stream
+                    sentence_queue = asyncio.Queue()
+                    tts_task = asyncio.create_task(
+                        speak_sentences(frames, sentence_queue, tts_voice, primary_model, use_cache, voice_settings, stitch)
+                    )
+                    
+                    # A client that reconnects mid-reply takes this sender over (see "resume")
+                    streaming_senders[session_id] = frames
+                    knowledge = await retrieve_context(message)
+                    context = await context_compactor.build(session_id, model, message, knowledge)
+                    conversation_store.add_message(session_id, "user", message, turn_id)
+                    trace.set(message_chars=len(message), prompt_chars=len(context) + len(message),
+                              prompt_tokens_est=estimate_tokens(context) + estimate_tokens(message),
+                              knowledge_chars=len(knowledge))
+                    
+                    # Stream response from LLM
+                    async for chunk in chat_service.stream_llm_response(message, model, use_cache, context, llm_stats,
+                                                                     llm_profile):
+                        if first_token_ms is None and chunk["type"] in ("token", "sentence"):
+                            first_token_ms = (time.monotonic() - turn_start) * 1000
+                            trace.set(first_token_ms=round(first_token_ms, 1))
                         
-                        # Generate TTS for sentence
-                        audio_data = await chat_service.generate_tts(
-                            chunk["text"], tts_voice, primary_model
-                        )
-                        
-                        if audio_data:
-                            # Send audio data (base64 encoded)
-                            import base64
-                            audio_b64 = base64.b64encode(audio_data).decode()
-                            await websocket.send_json({
-                                "type": "audio",
-                                "data": audio_b64,
-                                "text": chunk["text"]
+                        if chunk["type"] == "sentence":
+                            # Send text to client
+                            await frames.send_json({
+                                "type": "text",
+                                "content": chunk["text"]
                             })
+                            await sentence_queue.put(chunk["text"])
+                            reply_sentences.append(chunk["text"])
+                            
+                        elif chunk["type"] == "token":
+                            # Coalesced with neighbouring tokens into one frame per display refresh
+                            await frames.send_token(chunk["text"])
                         
-                    elif chunk["type"] == "token":
-                        # Send individual token for real-time display
-                        await websocket.send_json({
-                            "type": "token",
-                            "content": chunk["text"]
-                        })
+                        elif chunk["type"] == "done":
+                            completed = True
+                            break
+                        
+                        elif chunk["type"] == "error":
+                            trace.fail(chunk["message"])
+                            await frames.send_json({
+                                "type": "error",
+                                "message": chunk["message"]
+                            })
+                            break
                     
-                    elif chunk["type"] == "done":
-                        await websocket.send_json({"type": "done"})
-                        break
+                    # Let the remaining sentences finish speaking before closing the turn
+                    await sentence_queue.put(None)
+                    await tts_task
+                    if completed:
+                        await frames.send_json({"type": "done"})
                     
-                    elif chunk["type"] == "error":
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": chunk["message"]
-                        })
-                        break
+                    # Queued for the background writer; never blocks the stream
+                    if reply_sentences:
+                        reply = " ".join(reply_sentences)
+                        conversation_store.add_message(session_id, "assistant", reply, turn_id)
+                        if CONFIG["retrieval_enabled"] and CONFIG["retrieval_index_conversations"]:
+                            asyncio.create_task(remember_turn(session_id, message, reply))
+                    conversation_store.add_turn_metrics(
+                        session_id, turn_id, model, primary_model, first_token_ms,
+                        (time.monotonic() - turn_start) * 1000, len(reply_sentences)
+                    )
+                    if "prefill_ms" in llm_stats:
+                        trace.set(prompt_tokens=llm_stats["prompt_tokens"], prefill_ms=round(llm_stats["prefill_ms"], 1))
+                        await context_compactor.record_prefill(
+                            session_id, llm_stats["prompt_tokens"], llm_stats["prefill_ms"]
+                        )
+                finally:
+                    if tts_task is not None and not tts_task.done():
+                        tts_task.cancel()
+                        trace.event("tts_cancelled", pending_sentences=sentence_queue.qsize())
+                    if trace is not None:
+                        # Not completed and no error reported: the client went away or the turn was cancelled
+                        trace.cancelled = not completed and trace.error is None
+                        trace.set(sentence_count=len(reply_sentences), bytes_sent=frames.bytes - bytes_before)
+                        turn_traces.finish(trace)
+                    if streaming_senders.get(session_id) is frames:
+                        del streaming_senders[session_id]
+                    if turn_started:
+                        context_compactor.end_turn(session_id, model)
+                    if ticket is not None:
+                        await turn_admission.release(ticket)
+                    CONFIG.unpin(config_token)
             
             elif message_type == "tts_test":
                 # Handle TTS test from voice settings
@@ -392,26 +1257,20 @@ async def websocket_endpoint(websocket: WebSocket):
                     ref_text = data.get("ref_text", "")
                     
                     if ref_audio_b64:
-                        import tempfile
-                        import base64
-                        
-                        # Save reference audio to temp file
-                        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-                            audio_data = base64.b64decode(ref_audio_b64)
-                            tmp_file.write(audio_data)
-                            ref_audio_path = tmp_file.name
-                        
                         try:
-                            # Call F5-TTS through TTS-WebUI
-                            from backend.f5_tts_client import call_f5_tts
+                            # Stored by content hash, so repeated tests with one clip are transcribed once
+                            reference = await reference_library.save(base64.b64decode(ref_audio_b64), ref_text)
                             
+                            # Call F5-TTS through TTS-WebUI; previews wait behind anyone's reply audio
                             logger.info(f"F5-TTS: Generating with reference audio")
-                            audio_data = await call_f5_tts(text, ref_audio_path, ref_text)
+                            async def preview():
+                                async with gpu_arbiter.use("f5-tts"):
+                                    return await call_f5_tts(text, reference["ref_audio_path"], reference["ref_text"])
+                            audio_data = await tts_scheduler.run("f5-tts", "preview", preview)
                             
                             if audio_data:
-                                import base64
                                 audio_b64 = base64.b64encode(audio_data).decode()
-                                await websocket.send_json({
+                                await frames.send_json({
                                     "type": "audio",
                                     "data": audio_b64,
                                     "text": text
@@ -420,46 +1279,40 @@ async def websocket_endpoint(websocket: WebSocket):
                             else:
                                 # Fallback to regular TTS
                                 logger.warning("F5-TTS failed, using fallback")
-                                audio_data = await chat_service.generate_tts(text, "af_aoede")
+                                audio_data = await synthesize("kokoro", "preview", text, "af_aoede")
                             
                             if audio_data:
-                                import base64
                                 audio_b64 = base64.b64encode(audio_data).decode()
-                                await websocket.send_json({
+                                await frames.send_json({
                                     "type": "audio",
                                     "data": audio_b64,
                                     "text": text
                                 })
                             
-                            # Clean up temp file
-                            import os
-                            os.unlink(ref_audio_path)
-                            
                         except Exception as e:
                             logger.error(f"F5-TTS error: {e}")
-                            await websocket.send_json({
+                            await frames.send_json({
                                 "type": "error",
                                 "message": f"F5-TTS generation failed: {str(e)}"
                             })
                     else:
-                        await websocket.send_json({
+                        await frames.send_json({
                             "type": "error",
                             "message": "F5-TTS requires reference audio"
                         })
                 else:
                     # Standard TTS test (Kokoro, etc.)
-                    audio_data = await chat_service.generate_tts(text, voice)
+                    audio_data = await synthesize(CONFIG["default_tts_model"], "preview", text, voice)
                     
                     if audio_data:
-                        import base64
                         audio_b64 = base64.b64encode(audio_data).decode()
-                        await websocket.send_json({
+                        await frames.send_json({
                             "type": "audio",
                             "data": audio_b64,
                             "text": text
                         })
                     else:
-                        await websocket.send_json({
+                        await frames.send_json({
                             "type": "error",
                             "message": "TTS generation failed"
                         })
@@ -470,44 +1323,58 @@ async def websocket_endpoint(websocket: WebSocket):
                 ref_text = data.get("ref_text", "")
                 
                 if ref_audio_b64:
-                    import tempfile
-                    import base64
-                    import os
-                    
-                    # Create reference audio directory if it doesn't exist
-                    ref_dir = "backend/reference_audio"
-                    os.makedirs(ref_dir, exist_ok=True)
-                    
-                    # Save as default reference
-                    default_ref_path = os.path.join(ref_dir, "default_reference.wav")
                     audio_data = base64.b64decode(ref_audio_b64)
-                    
-                    with open(default_ref_path, "wb") as f:
-                        f.write(audio_data)
-                    
-                    # Save reference text too
-                    if ref_text:
-                        with open(os.path.join(ref_dir, "default_reference.txt"), "w") as f:
-                            f.write(ref_text)
-                    
+                    settings = await save_voice_settings(session_id, audio_data, ref_text)
                     logger.info(f"F5-TTS reference audio saved for chat use")
-                    await websocket.send_json({
+                    await frames.send_json({
                         "type": "f5_reference_saved",
-                        "success": True
+                        "success": True,
+                        "ref_text": settings["ref_text"]
                     })
                 else:
-                    await websocket.send_json({
+                    await frames.send_json({
                         "type": "error",
                         "message": "No reference audio provided"
                     })
+            elif message_type == "playback_stats":
+                # Gaps the listener actually heard between audio chunks, measured by the browser
+                mode = "stitched" if data.get("mode") == "stream" else "clips"
+                for gap_ms in data.get("gaps_ms", [])[:100]:
+                    metrics.observe("playback_gap_ms", float(gap_ms), mode=mode)
+                metrics.incr("playback_chunks", int(data.get("chunks", 0)), mode=mode)
+
+            elif message_type == "resume":
+                # A reconnecting client sends the last sequence number it saw
+                turn_frames = streaming_senders.get(session_id)
+                if turn_frames is not None and turn_frames is not frames:
+                    # The reply is still generating for the old connection: carry it on over this one
+                    await frames.drain()
+                    await frames.close()
+                    frames = frame_senders[session_id] = turn_frames
+                    await frames.resume(data.get("last_seq"), websocket, data.get("epoch"))
+                else:
+                    await frames.resume(data.get("last_seq"), epoch=data.get("epoch"))
+                logger.info(f"Resumed session {session_id} after seq {data.get('last_seq')}")
+
             elif message_type == "ping":
-                await websocket.send_json({"type": "pong"})
+                await frames.send_json({"type": "pong"})
                 
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        logger.info("WebSocket connection closed")
+        # Unless a reconnected client took this sender over for a reply still generating
+        if frames.websocket is websocket:
+            await frames.close()
+            if frame_senders.get(session_id) is frames:
+                del frame_senders[session_id]
+        logger.info(f"WebSocket connection closed (session {session_id}): {frames.stats()}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=6060, reload=True)
\ No newline at end of file
+    # permessage-deflate is negotiated per connection; token and text frames compress well
+    if CONFIG["workers"] > 1:
+        # Workers import the app themselves, so it is passed by name; reload can't be combined with workers
+        uvicorn.run("backend.main:app", host="0.0.0.0", port=6060, workers=CONFIG["workers"],
+                    ws="websockets", ws_per_message_deflate=True)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=6060, reload=True, ws="websockets", ws_per_message_deflate=True)
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Metrics - In-process counters and timing samples
+Lightweight registry exposed on /metrics so tuning decisions (synthesis
+profiles, fallbacks, cache hits) can be read off a running server.
+"""
+
+from collections import deque
+from typing import Deque, Dict
+
+
+def _key(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{label_str}}}"
+
+
+class Metrics:
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.samples: Dict[str, Deque[float]] = {}
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """Increment a counter"""
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Record the current value of something that goes up and down"""
+        self.gauges[_key(name, labels)] = value
+
+    def clear_gauge(self, name: str, **labels):
+        """Forget a gauge whose subject is gone (a closed connection)"""
+        self.gauges.pop(_key(name, labels), None)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a sample (e.g. a duration); only the most recent samples are kept"""
+        key = _key(name, labels)
+        if key not in self.samples:
+            self.samples[key] = deque(maxlen=self.max_samples)
+        self.samples[key].append(value)
+
+    def summary(self, name: str, **labels) -> Dict[str, float]:
+        values = self.samples.get(_key(name, labels))
+        return self._summarize(values) if values else {"count": 0}
+
+    def snapshot(self) -> Dict:
+        return {
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "timings": {key: self._summarize(values) for key, values in self.samples.items()},
+        }
+
+    def _summarize(self, values: Deque[float]) -> Dict[str, float]:
+        ordered = sorted(values)
+        return {
+            "count": len(ordered),
+            "avg": round(sum(ordered) / len(ordered), 2),
+            "p50": round(ordered[len(ordered) // 2], 2),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+            "max": round(ordered[-1], 2),
+        }
+
+
+# Global registry shared by the app's modules
+metrics = Metrics()
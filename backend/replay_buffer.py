@@ -0,0 +1,102 @@
+"""
+Replay Buffer - Recent reply frames per session, for clients that reconnect
+Every reply frame (tokens, text, audio, done, errors) gets the next sequence
+number of its session and is kept here, bounded by bytes, frame count and
+age. A client that reconnects sends the last sequence number it saw and is
+sent only the frames after it, while the reply keeps generating. Each buffer
+has a random epoch; a client that saw frames of another one (before a server
+restart, or a buffer that was evicted) has nothing to catch up on here.
+"""
+
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, List, Optional, Tuple
+
+# Frames worth replaying; session, pong and resume acknowledgements are per connection
+REPLAY_TYPES = {"token", "text", "audio", "audio_pcm", "done", "error"}
+
+
+class ReplayBuffer:
+    """Numbered frames of one session; entries are FrameSender queue entries [type, message, text, size]"""
+
+    def __init__(self, max_bytes: int = 4_000_000, max_frames: int = 2000, retention_s: float = 120.0):
+        self.max_bytes = max_bytes
+        self.max_frames = max_frames
+        self.retention_s = retention_s
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.bytes = 0
+        self.last_used = time.monotonic()
+        self._frames: Deque[Tuple[int, float, List[Any]]] = deque()
+
+    def next_seq(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    def record(self, seq: int, entry: List[Any]):
+        now = time.monotonic()
+        self._frames.append((seq, now, entry))
+        self.bytes += entry[3]
+        self.last_used = now
+        self._prune()
+
+    def grow(self, size: int):
+        """Account for a recorded token frame that more tokens were merged into"""
+        self.bytes += size
+
+    def since(self, last_seq: Optional[int], epoch: str = None) -> Tuple[List[List[Any]], bool]:
+        """Frames after last_seq, and whether none in between have been evicted"""
+        self._prune()
+        self.last_used = time.monotonic()
+        if epoch is not None and epoch != self.epoch:
+            # Whatever the client missed went with the old buffer; it can only tell whether a reply was cut off
+            return [], True
+        if last_seq is None or last_seq >= self.seq:
+            return [], last_seq is None or last_seq == self.seq
+        missed = [entry for seq, _, entry in self._frames if seq > last_seq]
+        oldest = self._frames[0][0] if self._frames else self.seq + 1
+        return missed, oldest <= last_seq + 1
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.retention_s
+        while self._frames and (self.bytes > self.max_bytes or len(self._frames) > self.max_frames
+                                or self._frames[0][1] < cutoff):
+            _, _, entry = self._frames.popleft()
+            self.bytes -= entry[3]
+
+    def stats(self):
+        return {"epoch": self.epoch, "seq": self.seq, "frames": len(self._frames), "bytes": self.bytes,
+                "oldest_seq": self._frames[0][0] if self._frames else None}
+
+
+class ReplayStore:
+    """Replay buffers of the most recent max_sessions sessions"""
+
+    def __init__(self, max_bytes: int = 4_000_000, max_frames: int = 2000, retention_s: float = 120.0,
+                 max_sessions: int = 100):
+        self.max_bytes = max_bytes
+        self.max_frames = max_frames
+        self.retention_s = retention_s
+        self.max_sessions = max_sessions
+        self._buffers: "OrderedDict[str, ReplayBuffer]" = OrderedDict()
+
+    def get(self, session_id: str) -> ReplayBuffer:
+        buffer = self._buffers.pop(session_id, None)
+        if buffer is None:
+            buffer = ReplayBuffer(self.max_bytes, self.max_frames, self.retention_s)
+        self._buffers[session_id] = buffer
+        # Sessions idle past the retention have nothing left to replay
+        cutoff = time.monotonic() - self.retention_s
+        while self._buffers and (len(self._buffers) > self.max_sessions
+                                 or next(iter(self._buffers.values())).last_used < cutoff):
+            oldest_id, oldest = next(iter(self._buffers.items()))
+            if oldest is buffer:
+                break
+            del self._buffers[oldest_id]
+        return buffer
+
+    def stats(self):
+        return {"sessions": len(self._buffers), "bytes": sum(buffer.bytes for buffer in self._buffers.values()),
+                "limits": {"max_bytes": self.max_bytes, "max_frames": self.max_frames,
+                           "retention_s": self.retention_s, "max_sessions": self.max_sessions}}
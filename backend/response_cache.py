@@ -0,0 +1,117 @@
+"""
+Response Cache - TTL/LRU caches for repeated LLM prompts and synthesized audio
+Voice users repeat themselves ("say that again", setup test phrases); a hit
+replays the recorded stream instead of running a fresh Ollama generation.
+SharedCache offers the same interface over a shared_state store, so every
+worker of a multi-process deployment hits the same entries.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class TTLCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Same as get; SharedCache's version keeps SQLite off the event loop"""
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any):
+        self.set(key, value)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCache:
+    def __init__(self, store, namespace: str, max_entries: int = 256, ttl: float = 3600.0, prune_every: int = 64):
+        self.store = store
+        self.prefix = f"cache:{namespace}:"
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.store.get(self.prefix + key)
+        if raw is None:
+            return None
+        # Audio is stored as-is; recorded LLM streams as JSON
+        return raw[1:] if raw[:1] == b"B" else json.loads(raw[1:])
+
+    def set(self, key: str, value: Any):
+        raw = b"B" + value if isinstance(value, bytes) else b"J" + json.dumps(value).encode()
+        self.store.set(self.prefix + key, raw, self.ttl)
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.store.prune_prefix(self.prefix, self.max_entries)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get in a worker thread: a write from another worker can hold the database for busy_timeout"""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any):
+        await asyncio.to_thread(self.set, key, value)
+
+    def clear(self):
+        self.store.delete_prefix(self.prefix)
+
+    def __len__(self) -> int:
+        return self.store.count_prefix(self.prefix)
+
+
+def normalize_prompt(text: str) -> str:
+    """Case, punctuation and whitespace differences don't change the answer"""
+    text = re.sub(r"[^\w\s]", "", text.lower())
+    return " ".join(text.split())
+
+
+def llm_cache_key(model: str, prompt: str, context: str = "", options: Dict[str, Any] = None) -> str:
+    """Key on model, normalized prompt, conversation prefix and generation options"""
+    context_hash = hashlib.sha256(context.encode()).hexdigest()
+    options_str = json.dumps(options or {}, sort_keys=True)
+    raw = "\x00".join([model, normalize_prompt(prompt), context_hash, options_str])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def tts_cache_key(engine: str, voice: str, text: str, audio_format: str = "mp3",
+                  params: Dict[str, Any] = None) -> str:
+    """Key on everything that changes the audio, including the synthesis profile's parameters"""
+    parts = [engine, voice or "", text.strip()]
+    if audio_format != "mp3":
+        # mp3 keys are left as they were, so existing entries stay valid
+        parts.append(audio_format)
+    if params:
+        parts.append(json.dumps(params, sort_keys=True))
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()
@@ -0,0 +1,287 @@
+"""
+Retrieval - Vector index for domain knowledge and long-term memory (Layer 4)
+Embeddings live in a memory-mapped float32 matrix with JSONL metadata beside
+it. Rows are L2-normalized on insert, so cosine top-k is a matrix product
+plus argpartition; large indexes scan a 64-dim random-projection sketch
+first and rerank candidates exactly. Appends only grow the files.
+Imports NumPy, so load it through lazy_imports rather than at startup.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from backend.context_window import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """Append-only cosine index over a memory-mapped embedding matrix
+
+    Above exact_threshold rows, queries first scan a low-dimensional random
+    projection ("sketch") of every row, then rerank the best candidates on
+    the full vectors. The sketch is a fixed projection, so appends never
+    need retraining or a rebuild.
+
+    Several worker processes may share one directory: appends take a file
+    lock, and each process picks up rows others appended when the header
+    changes.
+    """
+
+    def __init__(self, directory: str, initial_capacity: int = 1024, sketch_dim: int = 64,
+                 exact_threshold: int = 20000, rerank: int = 256):
+        self.directory = directory
+        self.initial_capacity = initial_capacity
+        self.sketch_dim = sketch_dim
+        self.exact_threshold = exact_threshold
+        self.rerank = rerank
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.sketch_path = os.path.join(directory, "sketch.f32")
+        self.meta_path = os.path.join(directory, "meta.jsonl")
+        self.header_path = os.path.join(directory, "index.json")
+        self.lock_path = os.path.join(directory, "index.lock")
+        self.dim: Optional[int] = None
+        self.count = 0
+        self.capacity = 0
+        self.metadata: List[Dict[str, Any]] = []
+        self._matrix: Optional[np.memmap] = None
+        self._sketch: Optional[np.memmap] = None
+        self._projection: Optional[np.ndarray] = None
+        self._meta_end = 0  # Byte offset just past the metadata of the committed rows
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._refresh()
+        if self.count:
+            logger.info(f"Opened vector index with {self.count} chunks ({self.dim} dims)")
+
+    def _refresh(self):
+        """Catch up with rows appended by another process; the header is tiny, so reading it per call is cheap"""
+        try:
+            with open(self.header_path) as f:
+                header = json.load(f)
+        except FileNotFoundError:
+            return
+        if header["count"] == self.count:
+            return
+
+        if self.dim is None:
+            self.dim = header["dim"]
+            self.sketch_dim = header["sketch_dim"]
+            self._init_projection()
+        capacity = os.path.getsize(self.vectors_path) // (4 * self.dim)
+        if capacity != self.capacity:
+            self._map(capacity)
+
+        new_rows = header["count"] - self.count
+        if new_rows > 0:
+            with open(self.meta_path, "rb") as f:
+                f.seek(self._meta_end)
+                for _ in range(new_rows):
+                    line = f.readline()
+                    self.metadata.append(json.loads(line))
+                    self._meta_end += len(line)
+            self.count = header["count"]
+
+    def refresh(self) -> int:
+        """Pick up rows other workers appended; returns the row count"""
+        with self._lock:
+            self._refresh()
+            return self.count
+
+    def _init_projection(self):
+        # Seeded so the same projection is rebuilt on every open
+        rng = np.random.default_rng(0)
+        self._projection = rng.standard_normal((self.dim, self.sketch_dim)).astype(np.float32)
+
+    def _map(self, capacity: int):
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._sketch = np.memmap(self.sketch_path, dtype=np.float32, mode="r+", shape=(capacity, self.sketch_dim))
+        self.capacity = capacity
+
+    def _write_header(self):
+        tmp_path = self.header_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "sketch_dim": self.sketch_dim, "count": self.count}, f)
+        os.replace(tmp_path, self.header_path)
+
+    def _grow(self, needed: int):
+        """Double the backing files until `needed` rows fit; existing rows are untouched"""
+        new_capacity = max(self.capacity, self.initial_capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+        if new_capacity == self.capacity:
+            return
+
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._sketch.flush()
+            self._matrix = self._sketch = None
+        for path, width in ((self.vectors_path, self.dim), (self.sketch_path, self.sketch_dim)):
+            with open(path, "ab") as f:
+                f.truncate(new_capacity * width * 4)
+        self._map(new_capacity)
+
+    def append(self, vectors: np.ndarray, metadata: List[Dict[str, Any]]):
+        """Add rows without rebuilding; the header is written last so a crash never exposes partial rows"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(metadata):
+            raise ValueError("Expected an (n, dim) array and n metadata entries")
+
+        with self._lock, open(self.lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._init_projection()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index ({self.dim})")
+
+            self._grow(self.count + len(vectors))
+
+            rows = slice(self.count, self.count + len(vectors))
+            self._matrix[rows] = _normalize(vectors)
+            self._sketch[rows] = _normalize(vectors @ self._projection)
+            self._matrix.flush()
+            self._sketch.flush()
+
+            # Lines past _meta_end belong to an append that crashed before its header write
+            encoded = "".join(json.dumps(entry) + "\n" for entry in metadata).encode()
+            with open(self.meta_path, "ab") as f:
+                f.truncate(self._meta_end)
+                f.write(encoded)
+            self._meta_end += len(encoded)
+
+            self.metadata.extend(metadata)
+            self.count += len(vectors)
+            self._write_header()
+
+    def search(self, queries: np.ndarray, k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Cosine top-k for one (dim,) or a batch of (q, dim) queries"""
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        with self._lock:
+            self._refresh()
+            if self.count == 0:
+                return [[] for _ in queries]
+            k = min(k, self.count)
+
+            if self.count <= self.exact_threshold or self.rerank >= self.count:
+                candidates = None
+                scores = queries @ self._matrix[:self.count].T
+            else:
+                # Coarse pass over the sketch, exact rerank of the best candidates
+                coarse = (queries @ self._projection) @ self._sketch[:self.count].T
+                candidates = np.argpartition(-coarse, self.rerank - 1, axis=1)[:, :self.rerank]
+                scores = np.einsum("qd,qcd->qc", queries, self._matrix[candidates])
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            results = []
+            for row, positions in enumerate(top):
+                positions = positions[np.argsort(-scores[row, positions])]
+                ids = positions if candidates is None else candidates[row, positions]
+                results.append([
+                    {"score": float(scores[row, p]), **self.metadata[i]} for p, i in zip(positions, ids)
+                ])
+            return results
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama embedding model (e.g. nomic-embed-text)"""
+
+    def __init__(self, http_client: httpx.AsyncClient, base_url: str, model: str):
+        self.http_client = http_client
+        self.base_url = base_url
+        self.model = model
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        response = await self.http_client.post(
+            f"{self.base_url}/api/embed", json={"model": self.model, "input": texts}
+        )
+        response.raise_for_status()
+        return np.asarray(response.json()["embeddings"], dtype=np.float32)
+
+
+class SentenceTransformerEmbedder:
+    """In-process encoder; sentence_transformers is only imported when this is used"""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = await asyncio.to_thread(self.model.encode, texts, batch_size=32)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def chunk_text(text: str, max_chars: int = 800) -> List[str]:
+    """Split on paragraph boundaries, packing paragraphs up to max_chars per chunk"""
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+        while len(current) > max_chars:
+            chunks.append(current[:max_chars])
+            current = current[max_chars:]
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class KnowledgeRetriever:
+    def __init__(self, index: VectorIndex, embedder, top_k: int = 5, min_score: float = 0.3,
+                 embed_batch_size: int = 64):
+        self.index = index
+        self.embedder = embedder
+        self.top_k = top_k
+        self.min_score = min_score
+        self.embed_batch_size = embed_batch_size
+
+    async def add_documents(self, texts: List[str], source: str, kind: str = "knowledge", **extra) -> int:
+        """Chunk, embed in batches and append to the index; returns the number of chunks added"""
+        chunks = [chunk for text in texts for chunk in chunk_text(text)]
+        for start in range(0, len(chunks), self.embed_batch_size):
+            batch = chunks[start:start + self.embed_batch_size]
+            vectors = await self.embedder.embed(batch)
+            metadata = [{"text": chunk, "source": source, "kind": kind, **extra} for chunk in batch]
+            await asyncio.to_thread(self.index.append, vectors, metadata)
+        return len(chunks)
+
+    async def retrieve(self, query: str) -> List[Dict[str, Any]]:
+        # Another worker may have filled an index this one opened empty
+        if self.index.count == 0 and await asyncio.to_thread(self.index.refresh) == 0:
+            return []
+        vector = await self.embedder.embed([query])
+        hits = (await asyncio.to_thread(self.index.search, vector, self.top_k))[0]
+        return [hit for hit in hits if hit["score"] >= self.min_score]
+
+    def build_context(self, hits: List[Dict[str, Any]], token_budget: int) -> str:
+        """Best hits first, stopping before the block would exceed the token budget"""
+        header = "Relevant background:\n"
+        used = estimate_tokens(header)
+        parts = []
+        for hit in hits:
+            part = f"- {hit['text']}\n"
+            cost = estimate_tokens(part)
+            if used + cost > token_budget:
+                break
+            parts.append(part)
+            used += cost
+        return header + "".join(parts) + "\n" if parts else ""
@@ -0,0 +1,179 @@
+"""
+Service Discovery - Find Ollama, Kokoro and F5-TTS on local ports
+Every candidate port is probed at once with a short connect timeout, so a
+dead port costs a refused connection (or connect_timeout) rather than the
+5s per port the old scripts took. Live ports are identified by their API
+signature: Ollama's /api/tags, an OpenAI speech route, Kokoro's voice list,
+or a Gradio app's /info. Results are cached on disk with a TTL so restarts
+and the other workers reuse them instead of probing again.
+
+    python -m backend.service_discovery
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = [11434, 8880, 8881, 7770, 7771, 7778, 5000, 8080]
+
+SERVICES = ("ollama", "kokoro", "openai_speech", "f5_gradio")
+SINGLE_URL_SERVICES = ("ollama", "kokoro", "f5_gradio")  # openai_speech lists every server found
+
+
+async def _get_json(client: httpx.AsyncClient, url: str) -> Optional[Any]:
+    try:
+        response = await client.get(url)
+        return response.json() if response.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def _status(client: httpx.AsyncClient, url: str) -> Optional[int]:
+    try:
+        return (await client.get(url)).status_code
+    except httpx.HTTPError:
+        return None
+
+
+def _f5_endpoints(info: Any) -> List[str]:
+    if not isinstance(info, dict) or "named_endpoints" not in info:
+        return []
+    return [name for name in info["named_endpoints"] if "f5" in name.lower() or name == "/wrapper"]
+
+
+async def probe(client: httpx.AsyncClient, base_url: str) -> Optional[Dict[str, Any]]:
+    """The services a base URL speaks, or None if nothing listens there"""
+    try:
+        await client.get(f"{base_url}/")
+    except httpx.HTTPError:
+        return None  # Refused or timed out: skip the signature probes
+
+    tags, voices, speech_status, info, info5 = await asyncio.gather(
+        _get_json(client, f"{base_url}/api/tags"),
+        _get_json(client, f"{base_url}/v1/audio/voices"),
+        _status(client, f"{base_url}/v1/audio/speech"),
+        _get_json(client, f"{base_url}/info"),
+        _get_json(client, f"{base_url}/gradio_api/info"),  # Gradio 5 moved its API here
+    )
+    kinds = []
+    if isinstance(tags, dict) and "models" in tags:
+        kinds.append("ollama")
+    if isinstance(voices, dict) and "voices" in voices:
+        kinds.append("kokoro")
+    # A POST-only route answers GET with 405 (or 422); an absent one with 404
+    if speech_status in (405, 422):
+        kinds.append("openai_speech")
+    gradio = info if isinstance(info, dict) and "named_endpoints" in info else info5
+    f5_endpoints = _f5_endpoints(gradio)
+    if isinstance(gradio, dict) and "named_endpoints" in gradio:
+        kinds.append("gradio")
+    if f5_endpoints:
+        kinds.append("f5_gradio")
+    return {"url": base_url, "kinds": kinds, "f5_endpoints": f5_endpoints[:20]}
+
+
+def choose(ports: List[Dict[str, Any]], preferred: Dict[str, Optional[str]] = None) -> Dict[str, Any]:
+    """One URL per service, keeping the configured one when it was found; OpenAI speech lists all"""
+    preferred = preferred or {}
+    services: Dict[str, Any] = {"openai_speech": [p["url"] for p in ports if "openai_speech" in p["kinds"]]}
+    for kind in SINGLE_URL_SERVICES:
+        urls = [p["url"] for p in ports if kind in p["kinds"]]
+        services[kind] = preferred.get(kind) if preferred.get(kind) in urls else (urls[0] if urls else None)
+    return services
+
+
+class ServiceDiscovery:
+    def __init__(self, ports: List[int] = None, host: str = "localhost", cache_path: str = None,
+                 ttl: float = 3600.0, incomplete_ttl: float = 30.0, connect_timeout: float = 0.3,
+                 read_timeout: float = 2.0):
+        self.ports = ports or DEFAULT_PORTS
+        self.host = host
+        self.cache_path = cache_path
+        self.ttl = ttl
+        # A result missing a service is likely from a boot where it wasn't up yet: re-probe sooner
+        self.incomplete_ttl = incomplete_ttl
+        # Dead ports fail on connect; read_timeout only applies to something that answered
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.result: Optional[Dict[str, Any]] = None
+
+    def load_cache(self) -> Optional[Dict[str, Any]]:
+        """The cached result if it is younger than the TTL"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, "r") as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable discovery cache {self.cache_path}: {e}")
+            return None
+        complete = all(cached.get("services", {}).get(kind) for kind in SINGLE_URL_SERVICES)
+        if time.time() - cached.get("discovered_at", 0) > (self.ttl if complete else min(self.ttl, self.incomplete_ttl)):
+            return None
+        return cached
+
+    def _save_cache(self, result: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        # Written then renamed, so another worker never reads half a file
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(result, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    async def discover(self, preferred: Dict[str, Optional[str]] = None) -> Dict[str, Any]:
+        """Probe every port concurrently and cache what was found"""
+        start = time.monotonic()
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            probed = await asyncio.gather(*(probe(client, f"http://{self.host}:{port}") for port in self.ports))
+        ports = [p for p in probed if p is not None]
+        result = {
+            "discovered_at": time.time(),
+            "duration_ms": round((time.monotonic() - start) * 1000, 1),
+            "services": choose(ports, preferred),
+            "ports": ports,
+        }
+        logger.info(f"Service discovery: {result['services']} in {result['duration_ms']}ms")
+        if self.cache_path:
+            self._save_cache(result)
+        self.result = result
+        return result
+
+    async def resolve(self, preferred: Dict[str, Optional[str]] = None) -> Dict[str, Any]:
+        """The fresh cached result, or a new discovery"""
+        cached = self.load_cache()
+        if cached is not None:
+            self.result = cached
+            return cached
+        return await self.discover(preferred)
+
+    async def run_periodic(self, interval: float, on_result, preferred=None):
+        """Every interval seconds resolve again, probing once the cache is stale, and call
+        on_result(result) (sync or async) when the services changed. Workers sharing the
+        cache file probe once per TTL between them."""
+        while True:
+            await asyncio.sleep(interval)
+            previous = (self.result or {}).get("services")
+            try:
+                result = await self.resolve(preferred() if callable(preferred) else preferred)
+                if result["services"] != previous:
+                    outcome = on_result(result)
+                    if asyncio.iscoroutine(outcome):
+                        await outcome
+            except Exception as e:
+                logger.warning(f"Service re-discovery failed: {e}")
+
+if __name__ == "__main__":
+    discovery = ServiceDiscovery()
+    found = asyncio.run(discovery.discover())
+    print(f"🔍 Probed {len(discovery.ports)} ports in {found['duration_ms']}ms\n")
+    for port in found["ports"]:
+        print(f"   {port['url']:<26} {', '.join(port['kinds']) or 'unknown service'}")
+    print()
+    for service in SERVICES:
+        print(f"🎯 {service:<14} {found['services'][service] or '❌ not found'}")
@@ -0,0 +1,240 @@
+"""
+Shared State - Key-value storage and admission limits shared across workers
+With one worker everything lives in process memory (MemoryStore). With
+several uvicorn workers behind one port, SQLiteStore keeps caches, session
+voice settings and admission slots in one WAL-mode database file, so every
+worker sees the same state. Both stores have the same interface, so tests
+can use the in-memory stand-in.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_kv_updated ON kv(updated_at);
+
+CREATE TABLE IF NOT EXISTS slots (
+    name TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (name, holder)
+);
+"""
+
+
+class MemoryStore:
+    """Process-local store for single-worker mode and tests"""
+
+    def __init__(self):
+        self._values: Dict[str, tuple] = {}
+        self._slots: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.time():
+            self._values.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        # Re-insert so iteration order is least recently written first
+        self._values.pop(key, None)
+        self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key: str):
+        self._values.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        for key in [key for key in self._values if key.startswith(prefix)]:
+            del self._values[key]
+
+    def count_prefix(self, prefix: str) -> int:
+        return sum(1 for key in self._values if key.startswith(prefix))
+
+    def prune_prefix(self, prefix: str, max_entries: int):
+        keys = [key for key in self._values if key.startswith(prefix)]
+        for key in keys[:max(0, len(keys) - max_entries)]:
+            del self._values[key]
+
+    def try_acquire(self, name: str, holder: str, limit: int, lease: float) -> bool:
+        with self._lock:
+            now = time.time()
+            holders = self._slots.setdefault(name, {})
+            for other in [h for h, expires_at in holders.items() if expires_at < now]:
+                del holders[other]
+            if holder not in holders and len(holders) >= limit:
+                return False
+            holders[holder] = now + lease
+            return True
+
+    def release(self, name: str, holder: str):
+        with self._lock:
+            self._slots.get(name, {}).pop(holder, None)
+
+    def slots_in_use(self, name: str) -> int:
+        now = time.time()
+        return sum(1 for expires_at in self._slots.get(name, {}).values() if expires_at >= now)
+
+    def close(self):
+        pass
+
+
+def _prefix_range(prefix: str) -> tuple:
+    # Keys starting with prefix sort between it and prefix + the highest BMP character
+    return prefix, prefix + "\uffff"
+
+
+class SQLiteStore:
+    """Store in a WAL-mode SQLite file that every worker process opens"""
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def get(self, key: str) -> Optional[bytes]:
+        rows = self._execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)", (key, time.time())
+        )
+        return rows[0][0] if rows else None
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+            (key, sqlite3.Binary(value), now + ttl if ttl else None, now)
+        )
+
+    def delete(self, key: str):
+        self._execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str):
+        self._execute("DELETE FROM kv WHERE key >= ? AND key < ?", _prefix_range(prefix))
+
+    def count_prefix(self, prefix: str) -> int:
+        return self._execute("SELECT COUNT(*) FROM kv WHERE key >= ? AND key < ?", _prefix_range(prefix))[0][0]
+
+    def prune_prefix(self, prefix: str, max_entries: int):
+        """Drop expired entries, then the least recently written beyond max_entries"""
+        self._execute(
+            "DELETE FROM kv WHERE key >= ? AND key < ? AND expires_at < ?", (*_prefix_range(prefix), time.time())
+        )
+        self._execute(
+            "DELETE FROM kv WHERE key IN (SELECT key FROM kv WHERE key >= ? AND key < ? "
+            "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (*_prefix_range(prefix), max_entries)
+        )
+
+    def try_acquire(self, name: str, holder: str, limit: int, lease: float) -> bool:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so count-then-insert is atomic across processes
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DELETE FROM slots WHERE name = ? AND expires_at < ?", (name, now))
+                held = self._connection.execute(
+                    "SELECT holder FROM slots WHERE name = ?", (name,)
+                ).fetchall()
+                if (holder,) not in held and len(held) >= limit:
+                    self._connection.execute("COMMIT")
+                    return False
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO slots (name, holder, expires_at) VALUES (?, ?, ?)",
+                    (name, holder, now + lease)
+                )
+                self._connection.execute("COMMIT")
+                return True
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def release(self, name: str, holder: str):
+        self._execute("DELETE FROM slots WHERE name = ? AND holder = ?", (name, holder))
+
+    def slots_in_use(self, name: str) -> int:
+        return self._execute(
+            "SELECT COUNT(*) FROM slots WHERE name = ? AND expires_at >= ?", (name, time.time())
+        )[0][0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def create_store(path: Optional[str]):
+    """SQLite file store when a path is given, otherwise process memory"""
+    if path:
+        logger.info(f"Shared state in {path} (pid {os.getpid()})")
+        return SQLiteStore(path)
+    return MemoryStore()
+
+
+class AdmissionLimiter:
+    """At most `limit` holders of a named slot across every worker sharing the store
+
+    Slots are leases renewed while held, so a crashed worker's slots expire
+    instead of leaking.
+    """
+
+    def __init__(self, store, name: str, limit: int, lease: float = 30.0, poll_interval: float = 0.05):
+        self.store = store
+        self.name = name
+        self.limit = limit
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._renewals: Dict[str, asyncio.Task] = {}
+
+    async def acquire(self, timeout: float) -> Optional[str]:
+        """Wait up to timeout for a slot; returns a ticket for release(), or None if still full"""
+        ticket = f"{os.getpid()}:{uuid.uuid4().hex}"
+        deadline = time.monotonic() + timeout
+        while True:
+            if await asyncio.to_thread(self.store.try_acquire, self.name, ticket, self.limit, self.lease):
+                self._renewals[ticket] = asyncio.create_task(self._renew(ticket))
+                return ticket
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+    async def _renew(self, ticket: str):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await asyncio.to_thread(self.store.try_acquire, self.name, ticket, self.limit, self.lease)
+
+    async def release(self, ticket: Optional[str]):
+        if ticket is None:
+            return
+        renewal = self._renewals.pop(ticket, None)
+        if renewal is not None:
+            renewal.cancel()
+        await asyncio.to_thread(self.store.release, self.name, ticket)
+
+    def in_use(self) -> int:
+        return self.store.slots_in_use(self.name)
@@ -0,0 +1,110 @@
+"""
+Startup Orchestrator - Concurrent backend warm-up on boot
+Probes each configured backend, preloads models and tracks per-component
+readiness so /ready only flips once the critical path is warm.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupComponent:
+    def __init__(self, name: str, warmup: Callable[[], Awaitable[Optional[str]]], critical: bool = True):
+        self.name = name
+        self.warmup = warmup
+        self.critical = critical
+        self.status = "pending"
+        self.detail = None
+        self.duration_ms = None
+        self.attempts = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "status": self.status,
+            "critical": self.critical,
+            "duration_ms": self.duration_ms,
+            "attempts": self.attempts,
+            "detail": self.detail,
+        }
+
+
+class StartupOrchestrator:
+    def __init__(self, timeout: float = 120.0, retry_interval: float = 10.0):
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.components: Dict[str, WarmupComponent] = {}
+        self.started_at = None
+        self.ready_at = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, warmup: Callable[[], Awaitable[Optional[str]]], critical: bool = True):
+        """Register a warm-up coroutine; it may return "skipped" when not configured"""
+        self.components[name] = WarmupComponent(name, warmup, critical)
+
+    @property
+    def is_ready(self) -> bool:
+        return all(c.status in ("ready", "skipped") for c in self.components.values() if c.critical)
+
+    def start(self):
+        """Run the warm-up in the background so the server accepts connections immediately"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        """Warm every component concurrently, retrying failed critical ones until ready"""
+        self.started_at = time.monotonic()
+        pending = list(self.components.values())
+
+        while pending:
+            await asyncio.gather(*(self._warm(c) for c in pending))
+            self._check_ready()
+
+            pending = [c for c in self.components.values() if c.critical and c.status == "failed"]
+            if pending:
+                logger.warning(f"Warm-up incomplete, retrying in {self.retry_interval}s: "
+                               f"{[c.name for c in pending]}")
+                await asyncio.sleep(self.retry_interval)
+
+    async def _warm(self, component: WarmupComponent):
+        component.status = "warming"
+        component.attempts += 1
+        start = time.monotonic()
+
+        try:
+            result = await asyncio.wait_for(component.warmup(), self.timeout)
+            component.status = "skipped" if result == "skipped" else "ready"
+            component.detail = None
+        except Exception as e:
+            component.status = "failed"
+            component.detail = str(e) or type(e).__name__
+            logger.warning(f"Warm-up of {component.name} failed: {component.detail}")
+
+        component.duration_ms = round((time.monotonic() - start) * 1000, 1)
+        logger.info(f"Warm-up {component.name}: {component.status} in {component.duration_ms}ms")
+
+    def _check_ready(self):
+        if self.is_ready and self.ready_at is None:
+            self.ready_at = time.monotonic()
+            logger.info(f"Critical path warm after {self.ready_at - self.started_at:.2f}s")
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.is_ready,
+            "time_to_ready_ms": (
+                round((self.ready_at - self.started_at) * 1000, 1) if self.ready_at else None
+            ),
+            "components": {name: c.to_dict() for name, c in self.components.items()},
+        }
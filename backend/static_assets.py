@@ -0,0 +1,163 @@
+"""
+Static Assets - Fingerprinted, precompressed frontend files served from memory
+At startup every file under the static directory is read once, named after
+its content hash (app.js -> app.3f9c1a2b7d.js) and compressed with gzip
+and, when the brotli package is installed, brotli. index.html is kept in
+memory with its asset URLs rewritten to the hashed names. The page is
+revalidated on every load (a 304 when unchanged); the files it names are
+cached by the browser for a year and only fetched again when their content,
+and so their name, changes. Plain names still work, revalidated like the page.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import time
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from backend import lazy_imports
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+MIN_COMPRESS_BYTES = 512  # Smaller files gain less than the Content-Encoding header costs
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+ENCODING_PREFERENCE = ("br", "gzip")
+
+
+class Asset:
+    """One file's bytes in each encoding it is served in"""
+
+    def __init__(self, data: bytes, content_type: str, cache_control: str = REVALIDATE, brotli=None):
+        self.hash = hashlib.sha256(data).hexdigest()[:16]
+        self.fingerprint = self.hash[:10]
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.variants: Dict[str, bytes] = {"identity": data}
+        if len(data) >= MIN_COMPRESS_BYTES and content_type.startswith(COMPRESSIBLE):
+            # mtime=0 so the same content always compresses to the same bytes
+            self.variants["gzip"] = gzip.compress(data, 9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(data, quality=11)
+            for encoding in ENCODING_PREFERENCE:
+                if encoding in self.variants and len(self.variants[encoding]) >= len(data):
+                    del self.variants[encoding]
+
+    def alias(self, cache_control: str) -> "Asset":
+        """The same bytes under other cache headers"""
+        asset = object.__new__(Asset)
+        asset.__dict__.update(self.__dict__, cache_control=cache_control)
+        return asset
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Best encoding the client accepts (q > 0) among the available variants"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+class StaticAssets:
+    def __init__(self, directory: str, index_path: str, prefix: str = "/static"):
+        self.directory = directory
+        self.index_path = index_path
+        self.prefix = prefix.rstrip("/")
+        self.index: Optional[Asset] = None
+        self.urls: Dict[str, str] = {}  # Plain path -> fingerprinted URL
+        self.build_ms = 0.0
+        self._assets: Dict[str, Asset] = {}
+
+    def build(self):
+        """Read, fingerprint and compress every file; takes a few hundred ms with brotli, so run it in a thread"""
+        start = time.monotonic()
+        try:
+            brotli = lazy_imports.load("brotli")
+        except ImportError:
+            brotli = None
+            logger.info("brotli not installed, static assets are precompressed with gzip only")
+
+        assets, urls = {}, {}
+        for root, _, filenames in os.walk(self.directory):
+            for filename in sorted(filenames):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    data = f.read()
+                content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                if content_type.startswith("text/") or content_type == "application/javascript":
+                    content_type += "; charset=utf-8"
+                asset = Asset(data, content_type, IMMUTABLE, brotli)
+                stem, ext = os.path.splitext(name)
+                hashed = f"{stem}.{asset.fingerprint}{ext}"
+                assets[hashed] = asset
+                assets[name] = asset.alias(REVALIDATE)
+                urls[f"{self.prefix}/{name}"] = f"{self.prefix}/{hashed}"
+
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            html = f.read()
+        pattern = re.compile(r"""(["'])(%s/[^"'?#]+)\1""" % re.escape(self.prefix))
+        html = pattern.sub(lambda m: f"{m.group(1)}{urls.get(m.group(2), m.group(2))}{m.group(1)}", html)
+
+        self._assets, self.urls = assets, urls
+        self.index = Asset(html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE, brotli)
+        self.build_ms = round((time.monotonic() - start) * 1000, 1)
+        stats = self.stats()
+        logger.info(f"Built {stats['files']} static assets in {self.build_ms}ms, page load bytes {stats['bytes']}")
+
+    def get(self, name: str) -> Optional[Asset]:
+        return self._assets.get(name)
+
+    def response(self, request: Request, asset: Asset) -> Response:
+        """The asset in the best encoding the client takes, or a 304 if its copy is current"""
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""), asset.variants)
+        # Each encoding is a different representation, so each gets its own validator
+        etag = f'"{asset.hash}"' if encoding == "identity" else f'"{asset.hash}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+        if self._not_modified(request.headers.get("if-none-match", ""), asset):
+            metrics.incr("static_responses", status="304", encoding=encoding)
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        body = asset.variants[encoding]
+        metrics.incr("static_responses", status="200", encoding=encoding)
+        metrics.incr("static_bytes", len(body), encoding=encoding)
+        return Response(body, media_type=asset.content_type, headers=headers)
+
+    def _not_modified(self, if_none_match: str, asset: Asset) -> bool:
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            # Weak comparison; a copy in any encoding has the same content
+            if tag.removeprefix("W/").strip('"').split("-")[0] == asset.hash:
+                return True
+        return False
+
+    def stats(self):
+        hashed = [asset for asset in self._assets.values() if asset.cache_control == IMMUTABLE]
+        assets = hashed + ([self.index] if self.index else [])
+        encodings = [encoding for encoding in ("identity", *ENCODING_PREFERENCE)
+                     if any(encoding in asset.variants for asset in assets)]
+        # What a client taking each encoding downloads for the page and every file
+        totals = {encoding: sum(len(asset.variants.get(encoding, asset.variants["identity"])) for asset in assets)
+                  for encoding in encodings}
+        return {"files": len(hashed), "bytes": totals, "build_ms": self.build_ms, "urls": self.urls}
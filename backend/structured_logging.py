@@ -0,0 +1,140 @@
+"""
+Structured Logging - Off-loop log handling with per-turn context fields
+The root logger only enqueues records; a listener thread formats and writes
+them, so the event loop never waits on log I/O. session_id, turn_id,
+sentence_id and engine come from a context variable that asyncio tasks
+inherit, so every line of a turn carries them without threading ids
+through call signatures. Per-token and per-sentence events go through
+RateLimitedLogger so a fast stream can't flood the log.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"  # basicConfig's default, plus context fields
+
+_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def bind_log_context(**fields):
+    """Add fields to every record logged from the current task (and tasks it creates from now on)"""
+    _context.set({**_context.get(), **fields})
+
+
+@contextmanager
+def log_context(**fields):
+    """Fields for the records logged inside the block"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def _record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {**getattr(record, "context", {}), **getattr(record, "fields", {})}
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the listener thread; only capture what can change after this call
+        record.context = _context.get()
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _record_fields(record)
+        if fields:
+            line += " [" + " ".join(f"{key}={value}" for key, value in fields.items()) + "]"
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_record_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "text", stream=None):
+    """Route the root logger through a queue to a background writer thread"""
+    global _listener
+    stop_logging()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(log_queue)]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Drain the queue and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RateLimitedLogger:
+    """At most `limit` records per key per `interval` seconds
+
+    The first record after a suppressed stretch reports how many were dropped.
+    """
+
+    def __init__(self, logger: logging.Logger, limit: int = 1, interval: float = 1.0):
+        self.logger = logger
+        self.limit = limit
+        self.interval = interval
+        self._windows: Dict[str, List[float]] = {}  # key -> [window start, emitted, suppressed]
+
+    def log(self, level: int, key: str, msg: str, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            if window is not None and window[2]:
+                fields["suppressed"] = int(window[2])
+            window = self._windows[key] = [now, 0, 0]
+        if window[1] >= self.limit:
+            window[2] += 1
+            return
+        window[1] += 1
+        self.logger.log(level, msg, extra={"fields": fields})
+
+    def debug(self, key: str, msg: str, **fields):
+        self.log(logging.DEBUG, key, msg, **fields)
+
+    def info(self, key: str, msg: str, **fields):
+        self.log(logging.INFO, key, msg, **fields)
+
+    def warning(self, key: str, msg: str, **fields):
+        self.log(logging.WARNING, key, msg, **fields)
@@ -0,0 +1,47 @@
+"""
+Synthesis Profiles - Latency-tiered TTS settings per engine
+The first sentence of a reply uses the fast profile of its engine so the
+listener hears something sooner; the rest use the profile of the session's
+current quality level (see tts_quality), which steps down while TTS is
+behind the LLM.
+"""
+
+import logging
+from typing import Any, Dict, Tuple
+
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Knobs each engine exposes; engines without a latency/quality trade-off
+# only carry speed so the profile name is still recorded
+DEFAULT_PROFILES = {
+    "f5-tts": {
+        "fast": {"nfe_steps": 16, "speed": 1.0, "cross_fade": 0.1},
+        "quality": {"nfe_steps": 32, "speed": 1.0, "cross_fade": 0.15},
+    },
+    "kokoro": {
+        "fast": {"speed": 1.0},
+        "quality": {"speed": 1.0},
+        "brisk": {"speed": 1.15},  # Last quality level: shorter audio when even Kokoro is behind
+    },
+}
+
+
+class SynthesisProfileSelector:
+    def __init__(self, profiles: Dict[str, Dict[str, Dict[str, Any]]] = None):
+        self.profiles = profiles or DEFAULT_PROFILES
+
+    def select(self, engine: str, sentence_index: int, level_profile: str = "quality") -> Tuple[str, Dict[str, Any]]:
+        """Pick a profile for one sentence; returns (profile name, engine parameters)"""
+        engine_profiles = self.profiles.get(engine, {})
+        if sentence_index == 0 and level_profile == "quality" and "fast" in engine_profiles:
+            profile, reason = "fast", "first_chunk"
+        else:
+            profile, reason = level_profile, "level"
+
+        params = engine_profiles.get(profile) or engine_profiles.get("quality") or {}
+
+        metrics.incr("tts_profile_selected", engine=engine, profile=profile, reason=reason)
+        logger.debug(f"TTS profile {engine}/{profile} ({reason})")
+        return profile, dict(params)
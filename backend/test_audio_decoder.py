@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+In-process WAV decoding checks against hand-built files: the chunk lengths streaming
+writers leave behind, padded chunks, and WAVE_FORMAT_EXTENSIBLE headers
+"""
+
+import os
+import struct
+import sys
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.audio_decoder import SAMPLE_RATE, WAVE_FORMAT_EXTENSIBLE, WAVE_FORMAT_PCM, decode_wav
+
+SAMPLES = np.array([0, 8192, -16384, 32767, -32768, 100], dtype="<i2")
+PLACEHOLDER = 0xFFFFFFFF
+
+
+def chunk(chunk_id: bytes, body: bytes, size: int = None) -> bytes:
+    """A RIFF chunk, padded to an even length"""
+    return chunk_id + struct.pack("<I", len(body) if size is None else size) + body + b"\0" * (len(body) & 1)
+
+
+def fmt_chunk(channels: int = 1, bits: int = 16, sub_format: int = None) -> bytes:
+    block_align = channels * bits // 8
+    body = struct.pack("<HHIIHH", WAVE_FORMAT_PCM if sub_format is None else WAVE_FORMAT_EXTENSIBLE,
+                       channels, SAMPLE_RATE, SAMPLE_RATE * block_align, block_align, bits)
+    if sub_format is not None:
+        # cbSize, valid bits, channel mask, then the sub-format GUID
+        body += struct.pack("<HHI", 22, bits, 0) + struct.pack("<H", sub_format) + bytes(14)
+    return chunk(b"fmt ", body)
+
+
+def wav_file(chunks: bytes, riff_size: int = None) -> bytes:
+    return b"RIFF" + struct.pack("<I", len(chunks) + 4 if riff_size is None else riff_size) + b"WAVE" + chunks
+
+
+def expected(samples: np.ndarray) -> np.ndarray:
+    return samples.astype(np.float32) / 32768.0
+
+
+def test_streaming_placeholder_lengths_run_to_the_end():
+    samples = SAMPLES.tobytes()
+    for riff_size in (0, PLACEHOLDER):
+        for data_size in (PLACEHOLDER, len(samples) + 1000):
+            data = wav_file(fmt_chunk() + chunk(b"data", samples, data_size), riff_size)
+            assert np.array_equal(decode_wav(data), expected(SAMPLES)), (riff_size, data_size)
+
+
+def test_empty_data_chunk_is_not_a_placeholder():
+    data = wav_file(fmt_chunk() + chunk(b"data", b"", 0) + chunk(b"LIST", b"INFOISFT" + struct.pack("<I", 4) + b"x264"))
+    assert len(decode_wav(data)) == 0
+    # Also when the RIFF length was left as a placeholder
+    assert len(decode_wav(wav_file(data[12:], 0))) == 0
+
+
+def test_odd_sized_chunks_are_skipped_with_their_padding():
+    data = wav_file(chunk(b"junk", b"odd") + fmt_chunk() + chunk(b"LIST", b"INFOI") + chunk(b"data", SAMPLES.tobytes()))
+    assert np.array_equal(decode_wav(data), expected(SAMPLES))
+    # An 8-bit recording with an odd number of samples, padded before the chunk after it
+    data = wav_file(fmt_chunk(bits=8) + chunk(b"data", bytes([128, 255, 0])) + chunk(b"LIST", b"INFO"))
+    assert np.allclose(decode_wav(data), [0.0, 127 / 128, -1.0])
+
+
+def test_wave_format_extensible():
+    stereo = np.repeat(SAMPLES, 2)
+    data = wav_file(fmt_chunk(channels=2, sub_format=WAVE_FORMAT_PCM) + chunk(b"data", stereo.tobytes()))
+    assert np.array_equal(decode_wav(data), expected(SAMPLES))
+    ieee_float = wav_file(fmt_chunk(bits=32, sub_format=0x0003) + chunk(b"data", bytes(16)))
+    try:
+        decode_wav(ieee_float)
+        raise AssertionError("decoded float samples as integers")
+    except wave.Error:
+        pass
+
+
+if __name__ == "__main__":
+    for test in (test_streaming_placeholder_lengths_run_to_the_end, test_empty_data_chunk_is_not_a_placeholder,
+                 test_odd_sized_chunks_are_skipped_with_their_padding, test_wave_format_extensible):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Context compaction checks against a real conversation store and a fake summarizer
+Runs without Ollama.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.context_window import ContextCompactor, estimate_tokens, optimal_context
+from backend.conversation_store import ConversationStore
+
+MODEL = "captaineris-nebula:latest"
+
+
+async def chat(store, compactor, session_id, turns, start=0):
+    for turn in range(start, start + turns):
+        context = await compactor.build(session_id, MODEL, f"Question {turn}?")
+        compactor.begin_turn()
+        store.add_message(session_id, "user", f"Question {turn}? " + "Some detail. " * 20)
+        store.add_message(session_id, "assistant", f"Answer {turn}. " + "An explanation. " * 30)
+        compactor.end_turn(session_id, MODEL)
+        await asyncio.sleep(0)
+    return context
+
+
+def test_history_stays_within_budget_and_gets_summarized():
+    async def scenario():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConversationStore(os.path.join(tmp_dir, "chat.db"))
+            store.start()
+            prompts = []
+
+            async def summarize(model, prompt):
+                prompts.append(prompt)
+                return f"Summary #{len(prompts)}"
+
+            compactor = ContextCompactor(store, summarize, idle_delay=0.01)
+            await chat(store, compactor, "s1", 20)
+            await asyncio.sleep(0.1)
+
+            context = await compactor.build("s1", MODEL, "Next?")
+            assert prompts, "compaction never ran"
+            assert context.startswith("Summary of the earlier conversation:\nSummary #")
+            assert "Question 0?" not in context
+            assert estimate_tokens(context) <= optimal_context(MODEL)
+
+            # The summary outlives the in-memory cache
+            await store.flush()
+            reopened = ContextCompactor(store, summarize)
+            assert (await reopened.status("s1"))["summary"] == f"Summary #{len(prompts)}"
+
+            await compactor.stop()
+            await store.stop()
+
+    asyncio.run(scenario())
+
+
+def test_turn_preempts_running_summary():
+    async def scenario():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConversationStore(os.path.join(tmp_dir, "chat.db"))
+            store.start()
+            started = asyncio.Event()
+            calls = []
+
+            async def slow_summarize(model, prompt):
+                calls.append(prompt)
+                started.set()
+                await asyncio.sleep(0.2)
+                return "Summary"
+
+            compactor = ContextCompactor(store, slow_summarize, idle_delay=0.01)
+            await chat(store, compactor, "s1", 10)
+            await started.wait()
+
+            # A new turn cancels the in-flight summary; it is retried once idle again
+            preempted_at = len(calls)
+            compactor.begin_turn()
+            await asyncio.sleep(0.05)
+            assert (await compactor.status("s1"))["summary"] == ""
+            compactor.end_turn("s1", MODEL)
+            await asyncio.sleep(0.4)
+
+            assert len(calls) == preempted_at + 1
+            assert (await compactor.status("s1"))["summary"] == "Summary"
+            await compactor.stop()
+            await store.stop()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for test in (test_history_stays_within_budget_and_gets_summarized, test_turn_preempts_running_summary):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Conversation store checks: reads served from the cache or SQLite never wait
+for the writer thread, and still see rows it hasn't committed yet
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.conversation_store import ConversationStore
+
+
+def hold_write_lock(db_path):
+    """Another process holding the write lock, so nothing new gets committed until COMMIT"""
+    other = sqlite3.connect(db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    return other
+
+
+def test_history_reads_dont_wait_for_pending_writes():
+    async def scenario():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "chat.db")
+            store = ConversationStore(db_path)
+            store.start()
+            store.add_message("old", "user", "Asked before this session was cached")
+            await store.flush()
+            assert await store.get_messages("s1", limit=100) == []
+
+            other = hold_write_lock(db_path)
+            store.add_message("s1", "user", "First question")
+            store.add_message("old", "assistant", "Still pending")
+            # Served from the cache, which knows s1 has no older history
+            s1 = await asyncio.wait_for(store.get_messages("s1", limit=100), 0.5)
+            assert [message["content"] for message in s1] == ["First question"]
+            # Read from SQLite, with the uncommitted message merged in
+            old = await asyncio.wait_for(store.get_messages("old", limit=100), 0.5)
+            assert [message["content"] for message in old] == ["Asked before this session was cached", "Still pending"]
+
+            other.execute("COMMIT")
+            other.close()
+            await store.flush()
+            reopened = ConversationStore(db_path)
+            reopened.start()
+            assert len(await reopened.get_messages("old", limit=100)) == 2
+            await reopened.stop()
+            await store.stop()
+
+    asyncio.run(scenario())
+
+
+def test_uncached_store_reads_its_own_pending_rows():
+    async def scenario():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "chat.db")
+            # As with several workers: no cache, so everything is read from SQLite
+            store = ConversationStore(db_path, cache_sessions=0)
+            store.start()
+            store.add_message("s1", "user", "Committed question")
+            store.add_turn_metrics("s1", "t1", "llm", "kokoro", 120.0, 900.0, 2)
+            store.set_summary("s1", "First summary", 1.0)
+            await store.flush()
+
+            other = hold_write_lock(db_path)
+            store.add_message("s1", "assistant", "Pending answer")
+            store.add_turn_metrics("s1", "t2", "llm", "kokoro", 110.0, 800.0, 1)
+            store.set_summary("s1", "Second summary", 2.0)
+            messages = await asyncio.wait_for(store.get_messages("s1", limit=100), 0.5)
+            assert [message["content"] for message in messages] == ["Committed question", "Pending answer"]
+            turns = await asyncio.wait_for(store.get_turn_metrics("s1"), 0.5)
+            assert [turn["turn_id"] for turn in turns] == ["t1", "t2"]
+            assert await asyncio.wait_for(store.get_summary("s1"), 0.5) == {
+                "summary": "Second summary", "summarized_until": 2.0}
+
+            other.execute("COMMIT")
+            other.close()
+            await store.flush()
+            # Committed rows leave the pending set and aren't counted twice
+            assert not store._pending
+            assert len(await store.get_messages("s1", limit=100)) == 2
+            assert len(await store.get_turn_metrics("s1")) == 2
+            await store.stop()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for test in (test_history_reads_dont_wait_for_pending_writes, test_uncached_store_reads_its_own_pending_rows):
+        test()
+        print(f"✅ {test.__name__}")
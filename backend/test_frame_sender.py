@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Send queue checks against a client that stops reading: overflow policies and limits,
+and resuming a reply after the connection drops
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.frame_sender import FrameSender
+from backend.replay_buffer import ReplayBuffer
+
+
+class StalledWebSocket:
+    """Accepts frames only while open is set, like a client on a congested link"""
+    headers = {}
+
+    def __init__(self):
+        self.open = asyncio.Event()
+        self.sent = []
+
+    async def send_text(self, text):
+        await self.open.wait()
+        self.sent.append(json.loads(text))
+
+
+async def stream_reply(frames, sentences):
+    for sentence in sentences:
+        for word in sentence.split(" "):
+            await frames.send_token(f" {word}")
+            await frames.flush()  # One frame per token, as if the window had passed
+        await frames.send_json({"type": "text", "content": sentence})
+
+
+SENTENCES = ["The first sentence.", "Then a second one follows."]
+
+
+def test_coalesce_merges_tokens_while_the_client_is_stalled():
+    async def scenario():
+        websocket = StalledWebSocket()
+        frames = FrameSender(websocket, "s1", max_queue_frames=3, overflow="coalesce")
+        sender = asyncio.create_task(stream_reply(frames, SENTENCES[1:]))
+        await asyncio.sleep(0.05)
+        # Tokens kept flowing into one frame; the sentence frame waits for room
+        assert not sender.done() and frames.stats()["queued_frames"] == 3 and frames.coalesced > 0
+        websocket.open.set()
+        await sender
+        await frames.drain()
+        tokens = "".join(frame["content"] for frame in websocket.sent if frame["type"] == "token")
+        assert tokens == " Then a second one follows." and websocket.sent[-1]["type"] == "text"
+        assert frames.stats()["queued_bytes"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_drop_discards_partial_frames_the_sentence_supersedes():
+    async def scenario():
+        websocket = StalledWebSocket()
+        frames = FrameSender(websocket, "s1", max_queue_frames=2, overflow="drop")
+        sender = asyncio.create_task(stream_reply(frames, SENTENCES))
+        await asyncio.sleep(0.05)
+        websocket.open.set()
+        await sender
+        await frames.drain()
+        assert [frame["content"] for frame in websocket.sent if frame["type"] == "text"] == SENTENCES
+        assert frames.dropped > 0 and frames.stats()["queued_frames"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_pause_blocks_the_sender_within_the_byte_limit():
+    async def scenario():
+        websocket = StalledWebSocket()
+        frames = FrameSender(websocket, "s1", max_queue_bytes=1000, overflow="pause")
+        audio = {"type": "audio", "data": "x" * 600}
+        await frames.send_json(audio)  # Alone in the queue, so it goes even past the limit
+        blocked = asyncio.create_task(frames.send_json(audio))
+        await asyncio.sleep(0.05)
+        assert not blocked.done() and frames.peak_queued_bytes < 1000
+        websocket.open.set()
+        await blocked
+        await frames.drain()
+        assert len(websocket.sent) == 2 and frames.send_wait_ms > 0
+
+    asyncio.run(scenario())
+
+
+def test_closed_connection_fails_waiting_senders():
+    class DisconnectingWebSocket(StalledWebSocket):
+        async def send_text(self, text):
+            await self.open.wait()
+            raise ConnectionResetError("client went away")
+
+    async def scenario():
+        websocket = DisconnectingWebSocket()
+        frames = FrameSender(websocket, "s1", max_queue_frames=1, overflow="pause")
+        await frames.send_json({"type": "session"})
+        blocked = asyncio.create_task(frames.send_json({"type": "done"}))
+        await asyncio.sleep(0.01)
+        websocket.open.set()
+        try:
+            await blocked
+            raise AssertionError("send succeeded on a closed connection")
+        except ConnectionResetError:
+            pass
+        await frames.close()
+
+    asyncio.run(scenario())
+
+
+def test_reply_keeps_generating_and_resumes_on_a_new_connection():
+    class DroppingWebSocket(StalledWebSocket):
+        async def send_text(self, text):
+            if len(self.sent) == 3:
+                raise ConnectionResetError("link dropped")
+            self.sent.append(json.loads(text))
+
+    async def scenario():
+        old, new = DroppingWebSocket(), StalledWebSocket()
+        new.open.set()
+        frames = FrameSender(old, "s1", replay=ReplayBuffer())
+        await stream_reply(frames, SENTENCES[:1])
+        await frames.drain()
+        last_seq = old.sent[-1]["seq"]
+
+        # The turn doesn't notice the drop and finishes into the replay buffer
+        await stream_reply(frames, SENTENCES[1:])
+        await frames.send_json({"type": "done"})
+        assert frames.stats()["connected"] is False
+
+        await frames.resume(last_seq, new, frames.replay.epoch)
+        await frames.send_json({"type": "done"})  # Live frames follow the replayed ones
+        await frames.drain()
+        seqs = [frame.get("seq") for frame in new.sent]
+        assert seqs[0] == last_seq + 1 and seqs[:-2] == list(range(last_seq + 1, seqs[-3] + 1))
+        assert new.sent[-2] == {"type": "resumed", "replayed": len(new.sent) - 2, "complete": True,
+                                "last_seq": seqs[-3], "epoch": frames.replay.epoch}
+        assert new.sent[-1]["seq"] == seqs[-3] + 1
+        received = old.sent + new.sent
+        assert [frame["content"] for frame in received if frame["type"] == "text"] == SENTENCES
+
+    asyncio.run(scenario())
+
+
+def test_resume_wakes_a_turn_stuck_behind_a_half_open_socket():
+    async def scenario():
+        # The old socket never completes a send and never reports an error
+        old, new = StalledWebSocket(), StalledWebSocket()
+        new.open.set()
+        frames = FrameSender(old, "s1", max_queue_frames=2, overflow="pause", replay=ReplayBuffer())
+        turn = asyncio.create_task(stream_reply(frames, SENTENCES))
+        await asyncio.sleep(0.05)
+        assert not turn.done() and not old.sent
+
+        await asyncio.wait_for(frames.resume(0, new, frames.replay.epoch), 0.5)
+        await asyncio.wait_for(turn, 0.5)
+        await frames.send_json({"type": "done"})
+        await frames.drain()
+        resumed = next(index for index, frame in enumerate(new.sent) if frame["type"] == "resumed")
+        seqs = [frame["seq"] for frame in new.sent if frame["type"] != "resumed"]
+        assert seqs == list(range(1, len(seqs) + 1)) and new.sent[resumed]["replayed"] == resumed
+        assert [frame["content"] for frame in new.sent if frame["type"] == "text"] == SENTENCES
+
+    asyncio.run(scenario())
+
+
+def test_replay_buffer_bounds_and_reports_gaps():
+    buffer = ReplayBuffer(max_bytes=100, max_frames=3)
+    for _ in range(5):
+        seq = buffer.next_seq()
+        buffer.record(seq, ["token", {"seq": seq}, "", 20])
+    assert buffer.stats() == {"epoch": buffer.epoch, "seq": 5, "frames": 3, "bytes": 60, "oldest_seq": 3}
+    missed, complete = buffer.since(2)
+    assert [entry[1]["seq"] for entry in missed] == [3, 4, 5] and complete
+    assert buffer.since(1)[1] is False
+    assert buffer.since(5) == ([], True)
+    assert buffer.since(1, buffer.epoch)[1] is False
+    # A client that saw frames before a server restart has none of this buffer's to catch up on
+    assert buffer.since(40, "restarted") == ([], True)
+    assert ReplayBuffer().since(2, "restarted") == ([], True)
+
+
+if __name__ == "__main__":
+    for test in (test_coalesce_merges_tokens_while_the_client_is_stalled,
+                 test_drop_discards_partial_frames_the_sentence_supersedes,
+                 test_pause_blocks_the_sender_within_the_byte_limit, test_closed_connection_fails_waiting_senders,
+                 test_reply_keeps_generating_and_resumes_on_a_new_connection,
+                 test_resume_wakes_a_turn_stuck_behind_a_half_open_socket,
+                 test_replay_buffer_bounds_and_reports_gaps):
+        test()
+        print(f"✅ {test.__name__}")
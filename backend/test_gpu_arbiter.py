@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+GPU arbiter checks against fake backends that report memory usage
+Runs without a GPU or any of the model servers.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.gpu_arbiter import GPUArbiter, GPUBackend, PinnedBackend
+
+
+class FakeBackend(GPUBackend):
+    def __init__(self, name, log, measured_mb=None, unload_s=0.0):
+        self.name = name
+        self.log = log
+        self.measured_mb = measured_mb
+        self.unload_s = unload_s
+
+    async def load(self):
+        self.log.append(f"load {self.name}")
+        await asyncio.sleep(0.01)
+
+    async def unload(self):
+        self.log.append(f"unload {self.name}")
+        await asyncio.sleep(self.unload_s)
+
+    async def memory_used_mb(self):
+        return self.measured_mb
+
+
+def make_arbiter(log, capacity_mb=8000):
+    arbiter = GPUArbiter(capacity_mb, wait_timeout=0.5)
+    arbiter.register("llm", FakeBackend("llm", log), 5000)
+    arbiter.register("kokoro", PinnedBackend(), 500)
+    arbiter.register("f5-tts", FakeBackend("f5-tts", log), 1800)
+    arbiter.register("whisper", FakeBackend("whisper", log), 1000)
+    return arbiter
+
+
+def test_evicts_off_critical_path_first():
+    async def scenario():
+        log = []
+        arbiter = make_arbiter(log)
+        await arbiter.ensure_resident("whisper")
+        await arbiter.ensure_resident("llm")
+        arbiter.set_critical_path(["llm", "f5-tts"])
+
+        # 500 + 1000 + 5000 + 1800 > 8000: whisper is off the critical path, so it goes
+        await arbiter.ensure_resident("f5-tts")
+        assert "unload whisper" in log
+        assert arbiter.components["llm"].resident
+        assert arbiter.used_mb <= arbiter.capacity_mb
+
+    asyncio.run(scenario())
+
+
+def test_load_waits_for_in_use_component():
+    async def scenario():
+        log = []
+        arbiter = make_arbiter(log, capacity_mb=6000)
+        arbiter.set_critical_path(["llm"])
+
+        async def reply():
+            async with arbiter.use("llm"):
+                await asyncio.sleep(0.1)
+                log.append("reply done")
+
+        async def transcribe():
+            await asyncio.sleep(0.02)
+            async with arbiter.use("whisper"):
+                log.append("transcribed")
+
+        await asyncio.gather(reply(), transcribe())
+        # Whisper couldn't fit beside the in-use LLM, so it waited for the reply to finish
+        assert log.index("reply done") < log.index("unload llm") < log.index("transcribed")
+
+    asyncio.run(scenario())
+
+
+def test_waiting_load_leaves_others_free():
+    async def scenario():
+        log = []
+        arbiter = make_arbiter(log, capacity_mb=6000)
+        arbiter.register("vad", FakeBackend("vad", log), 300)
+
+        async def reply():
+            async with arbiter.use("llm"):
+                await asyncio.sleep(0.2)
+                log.append("reply done")
+
+        async def transcribe():
+            await asyncio.sleep(0.02)
+            async with arbiter.use("whisper"):
+                log.append("transcribed")
+
+        async def detect():
+            await asyncio.sleep(0.05)
+            async with arbiter.use("vad"):
+                log.append("detected")
+
+        await asyncio.gather(reply(), transcribe(), detect())
+        # vad fits beside the LLM, so it didn't queue behind whisper's wait
+        assert log.index("detected") < log.index("reply done") < log.index("transcribed")
+
+    asyncio.run(scenario())
+
+
+def test_nested_load_doesnt_wait_for_itself():
+    async def scenario():
+        log = []
+        arbiter = make_arbiter(log, capacity_mb=6000)
+        async with arbiter.use("llm"):
+            start = asyncio.get_running_loop().time()
+            async with arbiter.use("whisper"):
+                pass
+            # Only the caller's own LLM block is in the way, so it over-commits at once
+            assert asyncio.get_running_loop().time() - start < 0.1
+        assert "unload llm" not in log
+
+    asyncio.run(scenario())
+
+
+def test_use_waits_for_a_component_being_unloaded():
+    async def scenario():
+        log = []
+        arbiter = GPUArbiter(5500, wait_timeout=0.5)
+        arbiter.register("llm", FakeBackend("llm", log, unload_s=0.05), 5000)
+        arbiter.register("whisper", FakeBackend("whisper", log), 1000)
+        await arbiter.ensure_resident("llm")
+
+        async def generate():
+            await asyncio.sleep(0.01)  # While whisper's load is evicting the LLM
+            async with arbiter.use("llm"):
+                log.append("generating")
+
+        await asyncio.gather(arbiter.ensure_resident("whisper"), generate())
+        assert log == ["load llm", "unload llm", "load whisper", "unload whisper", "load llm", "generating"]
+
+    asyncio.run(scenario())
+
+
+def test_switches_models_once_the_old_one_is_free():
+    class ModelBackend(FakeBackend):
+        """Like Ollama: one component, whichever model was asked for last"""
+        async def load(self):
+            self.log.append(f"load {self.model}")
+
+        async def unload(self):
+            self.log.append(f"unload {self.model}")
+
+    async def scenario():
+        log = []
+        arbiter = GPUArbiter(8000, wait_timeout=0.5)
+        backend = ModelBackend("llm", log)
+        backend.model = "small"
+        arbiter.register("llm", backend, 5000)
+
+        async def reply(model, delay):
+            await asyncio.sleep(delay)
+            async with arbiter.use("llm", model):
+                log.append(f"generating with {model}")
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(reply("small", 0), reply("large", 0.01))
+        # The second turn's model was loaded, after the first turn was done with its own
+        assert log == ["load small", "generating with small", "unload small", "load large", "generating with large"]
+        assert arbiter.status()["components"]["llm"]["model"] == "large"
+        async with arbiter.use("llm"):
+            pass  # No model asked for: whichever is loaded will do
+        assert log[-1] == "generating with large"
+
+    asyncio.run(scenario())
+
+
+def test_measured_usage_replaces_estimate():
+    async def scenario():
+        log = []
+        arbiter = GPUArbiter(8000)
+        arbiter.register("llm", FakeBackend("llm", log, measured_mb=4200), 5000)
+        await arbiter.ensure_resident("llm")
+        assert arbiter.used_mb == 4200
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for test in (test_evicts_off_critical_path_first, test_load_waits_for_in_use_component,
+                 test_waiting_load_leaves_others_free, test_nested_load_doesnt_wait_for_itself,
+                 test_use_waits_for_a_component_being_unloaded, test_switches_models_once_the_old_one_is_free,
+                 test_measured_usage_replaces_estimate):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Live config checks: pinned turns, validation, hook rollback and file reloads
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.live_config import LiveConfig
+
+DEFAULTS = {"default_llm_model": "llama3", "ollama_base_url": "http://localhost:11434",
+            "max_concurrent_turns": 4, "summary_model": None, "workers": 1}
+
+
+def make_config(tmp):
+    return LiveConfig(DEFAULTS, os.path.join(tmp, "config.json"), restart_keys=["workers"])
+
+
+def test_pinned_turn_keeps_its_settings():
+    async def scenario():
+        with tempfile.TemporaryDirectory() as tmp:
+            config = make_config(tmp)
+            turn_started, changed = asyncio.Event(), asyncio.Event()
+
+            async def turn():
+                token = config.pin()
+                turn_started.set()
+                await changed.wait()
+                # Child tasks (TTS) inherit the pin too
+                seen = await asyncio.create_task(asyncio.sleep(0, config["default_llm_model"]))
+                config.unpin(token)
+                return seen, config["default_llm_model"]
+
+            task = asyncio.create_task(turn())
+            await turn_started.wait()
+            report = await config.apply({"default_llm_model": "qwen2"})
+            changed.set()
+            assert await task == ("llama3", "qwen2")
+            assert report["changed"] == ["default_llm_model"] and report["apply_ms"] >= 0
+
+            with open(config.path) as f:
+                assert json.load(f) == {"default_llm_model": "qwen2"}
+
+    asyncio.run(scenario())
+
+
+def test_invalid_changes_are_rejected_whole():
+    async def scenario():
+        with tempfile.TemporaryDirectory() as tmp:
+            config = make_config(tmp)
+            for changes in ({"no_such_key": 1}, {"max_concurrent_turns": "8"}, {"workers": 4},
+                            {"default_llm_model": "qwen2", "max_concurrent_turns": True}):
+                try:
+                    await config.apply(changes)
+                    raise AssertionError(f"accepted {changes}")
+                except ValueError:
+                    pass
+            assert dict(config) == DEFAULTS and not os.path.exists(config.path)
+            await config.apply({"summary_model": "phi3", "max_concurrent_turns": 6.0})
+
+    asyncio.run(scenario())
+
+
+def test_failed_hook_restores_previous_values():
+    async def scenario():
+        with tempfile.TemporaryDirectory() as tmp:
+            config = make_config(tmp)
+            built = []
+
+            def rebuild(changed):
+                if config["ollama_base_url"].endswith(":1"):
+                    raise RuntimeError("unreachable")
+                built.append(config["ollama_base_url"])
+
+            config.on_change(["ollama_base_url"], rebuild)
+            await config.apply({"ollama_base_url": "http://gpu2:11434"})
+            try:
+                await config.apply({"ollama_base_url": "http://gpu3:1"})
+            except RuntimeError:
+                pass
+            assert config["ollama_base_url"] == "http://gpu2:11434"
+            assert built == ["http://gpu2:11434", "http://gpu2:11434"] and config.version == 1
+
+    asyncio.run(scenario())
+
+
+def test_file_edits_are_applied_and_removals_revert():
+    async def scenario():
+        with tempfile.TemporaryDirectory() as tmp:
+            config = make_config(tmp)
+            watcher = asyncio.create_task(config.watch(0.01))
+            try:
+                with open(config.path, "w") as f:
+                    json.dump({"max_concurrent_turns": 2, "workers": 8}, f)
+                await asyncio.sleep(0.1)
+                # The restart-only key waits for a restart
+                assert config["max_concurrent_turns"] == 2 and config["workers"] == 1
+
+                with open(config.path, "w") as f:
+                    json.dump({}, f)
+                os.utime(config.path, (0, 0))  # Make sure the mtime differs on coarse filesystems
+                await asyncio.sleep(0.1)
+                assert config["max_concurrent_turns"] == 4
+            finally:
+                watcher.cancel()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for test in (test_pinned_turn_keeps_its_settings, test_invalid_changes_are_rejected_whole,
+                 test_failed_hook_restores_previous_values, test_file_edits_are_applied_and_removals_revert):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+LLM option profile checks, and an autotune run against a stand-in Ollama
+The stand-in is a local HTTP server whose throughput depends on num_batch
+and num_thread, so the sweep has a known best combination.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.context_window import optimal_context
+from backend.llm_tuning import LLMProfiles, autotune
+
+MODEL = "captaineris-nebula:latest"
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeOllama.requests.append(payload)
+        options = payload.get("options", {})
+        prompt_tokens = len(payload["prompt"]) // 4
+        # Prefill peaks at num_batch 512; decode prefers 2 threads
+        prefill_tps = 1000 - abs(options.get("num_batch", 512) - 512)
+        decode_tps = 40 if options.get("num_thread") == 2 else 25
+        body = json.dumps({
+            "response": "ok", "done": True,
+            "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prompt_tokens / prefill_tps * 1e9),
+            "eval_count": 64, "eval_duration": int(64 / decode_tps * 1e9),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_builtin_profiles_resolve_per_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        profiles = LLMProfiles(os.path.join(tmp, "profiles.json"))
+        assert profiles.default_name(MODEL) == "balanced"
+        assert profiles.options(MODEL) == {"keep_alive": "30m", "num_ctx": optimal_context(MODEL)}
+        assert profiles.options(MODEL, "fast")["num_predict"] == 192
+        assert profiles.options(MODEL, "ollama") == {}
+        assert profiles.options(MODEL, "no-such-profile") == profiles.options(MODEL)
+
+
+def test_autotune_picks_fastest_options_and_becomes_default():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profiles.json")
+            report = asyncio.run(autotune(f"http://127.0.0.1:{server.server_port}", MODEL, LLMProfiles(path),
+                                          repeats=1, batches=[128, 512, 1024], threads=[None, 2]))
+            assert len(report["results"]) == 6
+            assert report["best"]["options"]["num_batch"] == 512
+            assert report["best"]["options"]["num_thread"] == 2
+
+            reloaded = LLMProfiles(path)
+            assert reloaded.default_name(MODEL) == "tuned"
+            tuned = reloaded.options(MODEL)
+            assert tuned["num_batch"] == 512 and tuned["keep_alive"] == "30m" and "num_predict" not in tuned
+            assert reloaded.options("other-model:latest")["num_ctx"] == optimal_context("other-model:latest")
+    finally:
+        server.shutdown()
+
+    # Every measured prompt is unique, so Ollama's prompt cache can't flatter prefill
+    prompts = [request["prompt"].splitlines()[0] for request in FakeOllama.requests]
+    assert len(set(prompts)) == len(prompts)
+
+
+if __name__ == "__main__":
+    for test in (test_builtin_profiles_resolve_per_model, test_autotune_picks_fastest_options_and_becomes_default):
+        test()
+        print(f"✅ {test.__name__}")
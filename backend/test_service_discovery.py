@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Service discovery checks against stand-in servers on local ports
+Stand-ins answer like Ollama, Kokoro-FastAPI and TTS-WebUI's Gradio app;
+a closed port is mixed in to show it doesn't hold discovery up.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.service_discovery import ServiceDiscovery
+
+ROUTES = {
+    "ollama": {"/": (200, "Ollama is running"), "/api/tags": (200, {"models": []})},
+    "kokoro": {"/": (404, {}), "/v1/audio/voices": (200, {"voices": ["af_heart"]}),
+               "/v1/audio/speech": (405, {"detail": "Method Not Allowed"})},
+    "gradio": {"/": (200, "<html></html>"),
+               "/info": (200, {"named_endpoints": {"/wrapper": {}, "/f5_tts_model_unload_model": {}}})},
+}
+
+
+def serve(routes):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = routes.get(self.path, (404, {"detail": "Not Found"}))
+            body = (body if isinstance(body, str) else json.dumps(body)).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_identifies_services_by_signature_and_caches():
+    servers = {name: serve(routes) for name, routes in ROUTES.items()}
+    try:
+        ports = [closed_port(), *(server.server_port for server in servers.values())]
+        url = {name: f"http://127.0.0.1:{server.server_port}" for name, server in servers.items()}
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "services.json")
+            discovery = ServiceDiscovery(ports, host="127.0.0.1", cache_path=cache_path)
+
+            start = time.monotonic()
+            result = asyncio.run(discovery.resolve())
+            assert time.monotonic() - start < 2.0
+            assert result["services"] == {"ollama": url["ollama"], "kokoro": url["kokoro"],
+                                          "openai_speech": [url["kokoro"]], "f5_gradio": url["gradio"]}
+            assert len(result["ports"]) == 3
+
+            # A second worker (or restart) reuses the cache without probing
+            for server in servers.values():
+                server.shutdown()
+            again = ServiceDiscovery(ports, host="127.0.0.1", cache_path=cache_path)
+            assert asyncio.run(again.resolve())["services"] == result["services"]
+    finally:
+        for server in servers.values():
+            server.server_close()
+
+
+def test_incomplete_results_expire_sooner():
+    with tempfile.TemporaryDirectory() as tmp:
+        discovery = ServiceDiscovery([closed_port()], host="127.0.0.1",
+                                     cache_path=os.path.join(tmp, "services.json"), ttl=600, incomplete_ttl=0)
+        assert asyncio.run(discovery.resolve())["services"]["ollama"] is None
+        assert discovery.load_cache() is None
+
+
+if __name__ == "__main__":
+    for test in (test_identifies_services_by_signature_and_caches, test_incomplete_results_expire_sooner):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Shared state checks: cache round trips on the in-memory stand-in, and
+admission limits and vector index appends across real worker processes
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.response_cache import SharedCache
+from backend.shared_state import AdmissionLimiter, MemoryStore, SQLiteStore
+
+
+def test_shared_cache_round_trip():
+    cache = SharedCache(MemoryStore(), "tts", max_entries=2, prune_every=1)
+    cache.set("a", b"\x00audio")
+    cache.set("b", [{"type": "token", "text": "hi"}])
+    assert cache.get("a") == b"\x00audio"
+    assert cache.get("b") == [{"type": "token", "text": "hi"}]
+
+    cache.set("c", b"more")
+    assert len(cache) == 2 and cache.get("a") is None
+
+
+def test_cache_writes_wait_off_the_event_loop():
+    async def scenario(db_path):
+        cache = SharedCache(SQLiteStore(db_path), "tts")
+        # Another worker holds the write lock for a while
+        other = sqlite3.connect(db_path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        write = asyncio.create_task(cache.aset("a", b"audio"))
+        await asyncio.sleep(0.3)
+        other.execute("COMMIT")
+        await write
+        ticker.cancel()
+        assert ticks >= 10 and await cache.aget("a") == b"audio"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(scenario(os.path.join(tmp_dir, "shared.db")))
+
+
+def _hold_slot(db_path, results, hold_s):
+    async def run():
+        limiter = AdmissionLimiter(SQLiteStore(db_path), "turns", limit=2)
+        ticket = await limiter.acquire(timeout=0)
+        results.append(ticket is not None)
+        if ticket:
+            await asyncio.sleep(hold_s)
+            await limiter.release(ticket)
+
+    asyncio.run(run())
+
+
+def test_admission_limit_holds_across_processes():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "shared.db")
+        SQLiteStore(db_path).close()
+
+        with multiprocessing.Manager() as manager:
+            results = manager.list()
+            workers = [multiprocessing.Process(target=_hold_slot, args=(db_path, results, 1.0)) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            assert sorted(results) == [False, False, True, True]
+
+        # Released slots are free again
+        assert SQLiteStore(db_path).slots_in_use("turns") == 0
+
+
+def _append_rows(directory, worker, rows):
+    import numpy as np
+    from backend.retrieval import VectorIndex
+
+    index = VectorIndex(directory, initial_capacity=4)
+    rng = np.random.default_rng(worker)
+    for row in range(rows):
+        index.append(rng.standard_normal((1, 8), dtype=np.float32), [{"text": f"{worker}-{row}"}])
+        time.sleep(0.001)
+
+
+def test_vector_index_appends_from_several_processes():
+    from backend.retrieval import VectorIndex
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workers = [multiprocessing.Process(target=_append_rows, args=(tmp_dir, w, 25)) for w in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        index = VectorIndex(tmp_dir)
+        assert index.count == 75
+        texts = sorted(entry["text"] for entry in index.metadata)
+        assert texts == sorted(f"{w}-{r}" for w in range(3) for r in range(25))
+        # Every row is still its own nearest neighbour, so vectors and metadata line up
+        for row in (0, 37, 74):
+            assert index.search(index._matrix[row], 1)[0][0]["text"] == index.metadata[row]["text"]
+
+
+def test_retriever_sees_rows_another_worker_appended():
+    import numpy as np
+    from backend.retrieval import KnowledgeRetriever, VectorIndex
+
+    class FixedEmbedder:
+        async def embed(self, texts):
+            return np.ones((len(texts), 8), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        retriever = KnowledgeRetriever(VectorIndex(tmp_dir), FixedEmbedder())
+        assert asyncio.run(retriever.retrieve("anything")) == []
+        # Another worker's index adds the first rows after this one opened
+        VectorIndex(tmp_dir).append(np.ones((1, 8), dtype=np.float32), [{"text": "from another worker"}])
+        hits = asyncio.run(retriever.retrieve("anything"))
+        assert [hit["text"] for hit in hits] == ["from another worker"]
+
+
+if __name__ == "__main__":
+    for test in (test_shared_cache_round_trip, test_cache_writes_wait_off_the_event_loop, test_admission_limit_holds_across_processes,
+                 test_vector_index_appends_from_several_processes, test_retriever_sees_rows_another_worker_appended):
+        test()
+        print(f"✅ {test.__name__}")
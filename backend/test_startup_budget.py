@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for the Brain backend
+Imports backend.main in a fresh interpreter with -X importtime, reports the
+slowest modules and fails if the import exceeds the budget or pulls in a
+dependency that should only load lazily.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Override with STARTUP_BUDGET_MS on slower machines
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "1500"))
+
+# Heavy optional dependencies that must stay out of the startup import graph
+LAZY_MODULES = ["gradio_client", "numpy", "whisper", "torch"]
+
+CHECK_SCRIPT = """
+import sys
+import backend.main
+print(",".join(m for m in {lazy} if m in sys.modules))
+"""
+
+
+def measure_cold_start():
+    """Import backend.main in a fresh process and return (wall ms, per-module ms, lazy leaks)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHECK_SCRIPT.format(lazy=LAZY_MODULES)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative) / 1000
+
+    leaked = [m for m in result.stdout.strip().split(",") if m]
+    return wall_ms, modules, leaked
+
+
+def test_cold_start_within_budget():
+    wall_ms, modules, leaked = measure_cold_start()
+
+    assert not leaked, f"Lazy modules imported at startup: {leaked}"
+    assert modules["backend.main"] <= STARTUP_BUDGET_MS, (
+        f"backend.main import took {modules['backend.main']:.0f}ms, budget {STARTUP_BUDGET_MS:.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    wall_ms, modules, leaked = measure_cold_start()
+
+    print(f"⏱️  Process cold start: {wall_ms:.0f}ms")
+    print(f"⏱️  backend.main import: {modules['backend.main']:.0f}ms (budget {STARTUP_BUDGET_MS:.0f}ms)")
+    print("\n🐢 Slowest top-level imports:")
+    top_level = {name: ms for name, ms in modules.items() if "." not in name or name.startswith("backend.")}
+    for name, ms in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"   {ms:8.1f}ms  {name}")
+
+    if leaked:
+        print(f"\n❌ Lazy modules imported at startup: {leaked}")
+    if leaked or modules["backend.main"] > STARTUP_BUDGET_MS:
+        print("❌ Cold start budget exceeded")
+        sys.exit(1)
+    print("\n✅ Cold start within budget")
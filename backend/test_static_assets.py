@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Static asset checks: fingerprinted URLs in the page, encoding negotiation and 304s
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from backend.static_assets import IMMUTABLE, StaticAssets, choose_encoding
+
+SCRIPT = "const greeting = 'hello';\n" * 100
+
+
+def make_client(tmp):
+    os.makedirs(os.path.join(tmp, "static"))
+    with open(os.path.join(tmp, "static", "app.js"), "w") as f:
+        f.write(SCRIPT)
+    with open(os.path.join(tmp, "index.html"), "w") as f:
+        f.write('<html><script src="/static/app.js"></script><a href="/static/missing.css"></a></html>')
+    assets = StaticAssets(os.path.join(tmp, "static"), os.path.join(tmp, "index.html"))
+    assets.build()
+
+    app = FastAPI()
+
+    @app.get("/static/{name:path}")
+    async def static(name: str, request: Request):
+        asset = assets.get(name)
+        if asset is None:
+            raise HTTPException(status_code=404)
+        return assets.response(request, asset)
+
+    @app.get("/")
+    async def index(request: Request):
+        return assets.response(request, assets.index)
+
+    return TestClient(app), assets
+
+
+def test_page_names_fingerprinted_files_cached_for_good():
+    with tempfile.TemporaryDirectory() as tmp:
+        client, assets = make_client(tmp)
+        page = client.get("/")
+        url = assets.urls["/static/app.js"]
+        assert f'src="{url}"' in page.text and 'href="/static/missing.css"' in page.text
+        assert page.headers["cache-control"] == "no-cache"
+
+        response = client.get(url, headers={"accept-encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip" and response.headers["cache-control"] == IMMUTABLE
+        assert response.text == SCRIPT
+        assert int(response.headers["content-length"]) < len(SCRIPT) / 10
+
+        plain = client.get("/static/app.js", headers={"accept-encoding": "identity"})
+        assert "content-encoding" not in plain.headers and plain.headers["cache-control"] == "no-cache"
+
+
+def test_current_copies_get_304s():
+    with tempfile.TemporaryDirectory() as tmp:
+        client, _ = make_client(tmp)
+        first = client.get("/", headers={"accept-encoding": "gzip"})
+        again = client.get("/", headers={"accept-encoding": "gzip", "if-none-match": first.headers["etag"]})
+        assert again.status_code == 304 and again.content == b""
+        # The validator covers the content, whichever encoding the copy came in
+        other = client.get("/", headers={"accept-encoding": "identity", "if-none-match": first.headers["etag"]})
+        assert other.status_code == 304
+        assert client.get("/", headers={"if-none-match": '"0000"'}).status_code == 200
+
+
+def test_encoding_follows_client_preferences():
+    available = {"identity": b"", "gzip": b"", "br": b""}
+    assert choose_encoding("gzip, deflate, br", available) == "br"
+    assert choose_encoding("br;q=0, gzip", available) == "gzip"
+    assert choose_encoding("", available) == "identity"
+    assert choose_encoding("br", {"identity": b"", "gzip": b""}) == "identity"
+
+
+if __name__ == "__main__":
+    for test in (test_page_names_fingerprinted_files_cached_for_good, test_current_copies_get_304s,
+                 test_encoding_follows_client_preferences):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+TTS quality ladder checks: stepping down on backlog and real-time factor, back up on headroom
+"""
+
+import io
+import os
+import sys
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.response_cache import tts_cache_key
+from backend.synthesis_profiles import DEFAULT_PROFILES, SynthesisProfileSelector
+from backend.tts_quality import TTSQualityControl, audio_seconds, level_name
+
+
+def speak(quality, backlog, rtf):
+    """One sentence: pick a level, then record a synthesis at the given real-time factor"""
+    level = level_name(quality.select(backlog))
+    quality.record(level, rtf * 1000, 1.0)
+    return level
+
+
+def test_backlog_walks_f5_down_to_kokoro():
+    control = TTSQualityControl(hold_sentences=1)
+    quality = control.session("s1", "f5-tts")
+    levels = [speak(quality, backlog=3, rtf=2.0) for _ in range(7)]
+    # One sentence held at each level before the next step
+    assert levels == ["f5-tts/quality", "f5-tts/fast", "f5-tts/fast", "kokoro/quality",
+                      "kokoro/quality", "kokoro/brisk", "kokoro/brisk"]
+    status = control.status()
+    assert status["degraded_sessions"] == 1 and status["switches"] == {"down": 3, "up": 0}
+    assert [switch["reason"] for switch in quality.history] == ["backlog"] * 3
+
+
+def test_slow_synthesis_steps_down_only_with_a_wait():
+    control = TTSQualityControl(hold_sentences=0)
+    quality = control.session("s1", "kokoro")
+    # Slow but nothing queued: the listener isn't waiting yet
+    assert [speak(quality, backlog=0, rtf=1.5) for _ in range(3)] == ["kokoro/quality"] * 3
+    assert speak(quality, backlog=1, rtf=1.5) == "kokoro/brisk"
+    assert quality.history[-1]["reason"] == "rtf"
+
+
+def test_headroom_steps_up_and_failed_upgrades_back_off():
+    control = TTSQualityControl(hold_sentences=0, upgrade_after=2)
+    quality = control.session("s1", "kokoro")
+    assert speak(quality, backlog=2, rtf=0.2) == "kokoro/brisk"
+
+    # Two quiet, fast sentences at the lower level earn the climb
+    assert [speak(quality, backlog=0, rtf=0.2) for _ in range(2)] == ["kokoro/brisk", "kokoro/quality"]
+    # Falling straight back down doubles the wait before the next try
+    assert speak(quality, backlog=2, rtf=0.2) == "kokoro/brisk"
+    levels = [speak(quality, backlog=0, rtf=0.2) for _ in range(4)]
+    assert levels == ["kokoro/brisk"] * 3 + ["kokoro/quality"]
+    assert quality.switches == {"down": 2, "up": 2}
+
+
+def test_new_primary_engine_starts_a_fresh_ladder():
+    control = TTSQualityControl(hold_sentences=0)
+    quality = control.session("s1", "f5-tts")
+    speak(quality, backlog=5, rtf=1.0)
+    assert level_name(quality.current()) == "f5-tts/fast"
+    assert control.session("s1", "f5-tts") is quality
+    assert level_name(control.session("s1", "kokoro").current()) == "kokoro/quality"
+
+
+def test_audio_seconds_reads_wav_and_estimates_otherwise():
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(24000)
+        wav.writeframes(b"\x00\x00" * 36000)
+    assert abs(audio_seconds(buffer.getvalue(), "ignored") - 1.5) < 1e-6
+    assert abs(audio_seconds(b"\xff\xfb mp3", "x" * 28, speed=2.0) - 1.0) < 1e-6
+
+
+def test_cache_keys_differ_per_level():
+    selector = SynthesisProfileSelector(DEFAULT_PROFILES)
+
+    def key(engine, sentence_index, profile):
+        _, params = selector.select(engine, sentence_index, profile)
+        return tts_cache_key(engine, "voice", "Same sentence.", "mp3", params)
+
+    # The first sentence's fast rendering is never served to a later one at full quality
+    assert key("f5-tts", 0, "quality") != key("f5-tts", 1, "quality") == key("f5-tts", 2, "quality")
+    assert key("kokoro", 1, "brisk") != key("kokoro", 1, "quality")
+
+if __name__ == "__main__":
+    for test in (test_backlog_walks_f5_down_to_kokoro, test_slow_synthesis_steps_down_only_with_a_wait,
+                 test_headroom_steps_up_and_failed_upgrades_back_off, test_new_primary_engine_starts_a_fresh_ladder,
+                 test_audio_seconds_reads_wav_and_estimates_otherwise, test_cache_keys_differ_per_level):
+        test()
+        print(f"✅ {test.__name__}")
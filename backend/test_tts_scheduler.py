@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+TTS scheduler checks with fake synthesis jobs
+Runs without any TTS engine.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.tts_scheduler import TTSScheduler
+
+
+def make_job(log, name, duration=0.02):
+    async def job():
+        log.append(f"start {name}")
+        await asyncio.sleep(duration)
+        log.append(f"end {name}")
+        return name
+    return job
+
+
+def test_runs_waiting_jobs_by_priority():
+    async def scenario():
+        log = []
+        scheduler = TTSScheduler({"kokoro": 1})
+        blocker = asyncio.create_task(scheduler.run("kokoro", "reply", make_job(log, "blocker")))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(scheduler.run("kokoro", job_class, make_job(log, job_class)))
+            for job_class in ("batch", "preview", "reply", "first_sentence")
+        ]
+        await asyncio.gather(blocker, *queued)
+        starts = [entry.split()[1] for entry in log if entry.startswith("start")]
+        assert starts == ["blocker", "first_sentence", "reply", "preview", "batch"], starts
+
+    asyncio.run(scenario())
+
+
+def test_aging_lets_old_jobs_overtake():
+    async def scenario():
+        log = []
+        # One priority level per 10ms of waiting: the batch job has aged past a fresh reply
+        scheduler = TTSScheduler({"kokoro": 1}, aging_s=0.01)
+        blocker = asyncio.create_task(scheduler.run("kokoro", "reply", make_job(log, "blocker", 0.1)))
+        await asyncio.sleep(0)
+        batch = asyncio.create_task(scheduler.run("kokoro", "batch", make_job(log, "batch")))
+        await asyncio.sleep(0.08)
+        reply = asyncio.create_task(scheduler.run("kokoro", "reply", make_job(log, "reply")))
+        await asyncio.gather(blocker, batch, reply)
+        assert log.index("start batch") < log.index("start reply"), log
+
+    asyncio.run(scenario())
+
+
+def test_preempted_preview_reruns_after_reply():
+    async def scenario():
+        log = []
+        scheduler = TTSScheduler({"kokoro": 1}, preempt={"kokoro": True})
+        preview = asyncio.create_task(scheduler.run("kokoro", "preview", make_job(log, "preview", 0.1)))
+        await asyncio.sleep(0.01)
+        first = await scheduler.run("kokoro", "first_sentence", make_job(log, "first"))
+        assert first == "first"
+        assert await preview == "preview"
+        assert log == ["start preview", "start first", "end first", "start preview", "end preview"], log
+
+    asyncio.run(scenario())
+
+
+def test_reply_audio_is_never_preempted():
+    async def scenario():
+        log = []
+        scheduler = TTSScheduler({"kokoro": 1}, preempt={"kokoro": True})
+        reply = asyncio.create_task(scheduler.run("kokoro", "reply", make_job(log, "reply", 0.05)))
+        await asyncio.sleep(0.01)
+        await scheduler.run("kokoro", "first_sentence", make_job(log, "first"))
+        await reply
+        assert log == ["start reply", "end reply", "start first", "end first"], log
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_frees_the_engine():
+    async def scenario():
+        log = []
+        scheduler = TTSScheduler({"f5-tts": 1})
+        stale = asyncio.create_task(scheduler.run("f5-tts", "reply", make_job(log, "stale", 1.0)))
+        await asyncio.sleep(0.01)
+        stale.cancel()
+        result = await asyncio.wait_for(scheduler.run("f5-tts", "reply", make_job(log, "next")), 0.5)
+        assert result == "next"
+        assert "end stale" not in log
+        assert scheduler.status()["engines"]["f5-tts"]["running"] == []
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for test in (test_runs_waiting_jobs_by_priority, test_aging_lets_old_jobs_overtake,
+                 test_preempted_preview_reruns_after_reply, test_reply_audio_is_never_preempted,
+                 test_cancelled_caller_frees_the_engine):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Turn trace checks: events from child tasks, filters, and bounded retention
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.turn_traces import TraceBuffer, current_trace, trace_event
+
+
+def test_child_tasks_record_on_the_turn_trace():
+    async def scenario():
+        buffer = TraceBuffer()
+        trace = buffer.start("s1", "t1", "llm", "f5-tts")
+
+        async def speak():
+            trace_event("tts_fallback", from_engine="f5-tts", engine="kokoro", reason="no audio")
+            current_trace().sentence(0, chars=12, engine="kokoro")
+
+        await asyncio.create_task(speak())
+        buffer.finish(trace)
+        trace_event("after_finish")  # No current trace any more: ignored
+
+        turn = buffer.query(engine="kokoro")[0]
+        assert turn["engines"] == ["f5-tts", "kokoro"]
+        assert [e["event"] for e in turn["events"]] == ["tts_fallback"]
+        assert turn["sentences"][0]["engine"] == "kokoro" and not turn["in_progress"]
+
+    asyncio.run(scenario())
+
+
+def test_filters_and_slowest_first():
+    buffer = TraceBuffer()
+    for turn, (total_ms, error) in enumerate([(100, None), (900, "LLM timeout"), (400, None)]):
+        trace = buffer.start("s1", f"t{turn}", "llm", "kokoro")
+        if error:
+            trace.fail(error)
+        buffer.finish(trace)
+        trace.total_ms = total_ms
+
+    assert [t["turn_id"] for t in buffer.query(sort="slowest")] == ["t1", "t2", "t0"]
+    assert [t["turn_id"] for t in buffer.query(errors=True)] == ["t1"]
+    assert buffer.query(engine="f5-tts") == []
+    assert len(buffer.export()["traces"]) == 3
+
+
+def test_retention_and_trace_size_are_bounded():
+    buffer = TraceBuffer(max_turns=5, per_session=2, max_sessions=3, max_events=10)
+    for turn in range(100):
+        trace = buffer.start(f"s{turn % 7}", f"t{turn}", "llm", "kokoro")
+        for i in range(50):
+            trace.event("token_burst", text="x" * 1000)
+            trace.sentence(i, chars=1000)
+        buffer.finish(trace)
+
+    status = buffer.status()
+    assert status["retained"] <= 5 + 3 * 2
+    latest = buffer.query(limit=1)[0]
+    assert len(latest["events"]) == 10 and latest["dropped_events"] == 40
+    assert len(latest["sentences"]) == 10
+    assert len(latest["events"][0]["text"]) <= 201
+
+
+if __name__ == "__main__":
+    for test in (test_child_tasks_record_on_the_turn_trace, test_filters_and_slowest_first,
+                 test_retention_and_trace_size_are_bounded):
+        test()
+        print(f"✅ {test.__name__}")
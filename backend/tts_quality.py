@@ -0,0 +1,178 @@
+"""
+TTS Quality - Per-session quality ladder driven by real-time factor and backlog
+When synthesis can't keep up with the LLM, audio drifts further behind the
+text with every sentence. Each session walks down a configured ladder of
+(engine, profile) levels - fewer F5 steps, then Kokoro, then a faster Kokoro
+voice - while sentences pile up or its real-time factor (synthesis time per
+second of audio) says it is falling behind, and climbs back once there is
+headroom. Every switch is logged, counted and kept in the session's history.
+"""
+
+import io
+import logging
+import wave
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from backend.metrics import metrics
+from backend.turn_traces import trace_event
+
+logger = logging.getLogger(__name__)
+
+# Best first; a session starts at the top of its primary engine's ladder
+DEFAULT_LEVELS = {
+    "f5-tts": [
+        {"engine": "f5-tts", "profile": "quality"},
+        {"engine": "f5-tts", "profile": "fast"},
+        {"engine": "kokoro", "profile": "quality"},
+        {"engine": "kokoro", "profile": "brisk"},
+    ],
+    "kokoro": [
+        {"engine": "kokoro", "profile": "quality"},
+        {"engine": "kokoro", "profile": "brisk"},
+    ],
+}
+
+CHARS_PER_SECOND = 14.0  # Speech rate at speed 1.0, for audio whose length can't be read
+
+
+def audio_seconds(audio: bytes, text: str, speed: float = 1.0) -> float:
+    """Length of synthesized speech: from the header for WAV, estimated from the text otherwise"""
+    if audio[:4] == b"RIFF":
+        try:
+            with wave.open(io.BytesIO(audio)) as wav:
+                # Streamed WAVs can carry a placeholder frame count, so go by the data size
+                frame_bytes = wav.getnchannels() * wav.getsampwidth()
+                return max(len(audio) - 44, 0) / frame_bytes / wav.getframerate()
+        except (wave.Error, EOFError, ZeroDivisionError):
+            pass
+    return len(text) / CHARS_PER_SECOND / max(speed, 0.1)
+
+
+def level_name(level: Dict[str, str]) -> str:
+    return f"{level['engine']}/{level['profile']}"
+
+
+class SessionQuality:
+    """One session's position on its ladder and the real-time factors it has measured"""
+
+    def __init__(self, control: "TTSQualityControl", session_id: str, primary: str):
+        self.control = control
+        self.session_id = session_id
+        self.primary = primary
+        self.level = 0
+        self.rtf: Dict[str, float] = {}  # EWMA by engine/profile
+        self.since_switch = 0
+        self.headroom = 0  # Consecutive sentences with no backlog and a low real-time factor
+        self.failed_upgrades: Dict[str, int] = {}
+        self.switches = {"down": 0, "up": 0}
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    @property
+    def levels(self) -> List[Dict[str, str]]:
+        return self.control.levels.get(self.primary) or [{"engine": self.primary, "profile": "quality"}]
+
+    def current(self) -> Dict[str, str]:
+        return self.levels[min(self.level, len(self.levels) - 1)]
+
+    def select(self, backlog: int) -> Dict[str, str]:
+        """The level for the next sentence; backlog is the number of sentences waiting behind it"""
+        control = self.control
+        self.since_switch += 1
+        current = level_name(self.current())
+        rtf = self.rtf.get(current)
+
+        if self.since_switch > control.hold_sentences:
+            behind = backlog >= control.backlog_high or (backlog > 0 and rtf is not None and rtf > control.rtf_high)
+            if behind and self.level < len(self.levels) - 1:
+                self._switch(self.level + 1, "backlog" if backlog >= control.backlog_high else "rtf", rtf, backlog)
+            elif self.level > 0 and backlog == 0 and rtf is not None and rtf < control.rtf_low:
+                self.headroom += 1
+                # An upper level that already pushed us back down has to earn its way back longer
+                upper = level_name(self.levels[self.level - 1])
+                if self.headroom >= control.upgrade_after * 2 ** self.failed_upgrades.get(upper, 0):
+                    self._switch(self.level - 1, "headroom", rtf, backlog)
+            else:
+                self.headroom = 0
+        return self.current()
+
+    def record(self, profile_name: str, synthesis_ms: float, audio_s: float):
+        """Fold one synthesized sentence into the real-time factor of the engine/profile that made it"""
+        if audio_s <= 0:
+            return
+        rtf = synthesis_ms / 1000 / audio_s
+        previous = self.rtf.get(profile_name)
+        self.rtf[profile_name] = rtf if previous is None else previous + 0.3 * (rtf - previous)
+        metrics.observe("tts_rtf", rtf, level=profile_name)
+
+    def _switch(self, level: int, reason: str, rtf: Optional[float], backlog: int):
+        direction = "down" if level > self.level else "up"
+        old, new = level_name(self.current()), level_name(self.levels[level])
+        last = self.history[-1] if self.history else None
+        if direction == "down" and last and last["direction"] == "up" and last["to"] == old \
+                and self.since_switch <= self.control.hold_sentences + self.control.upgrade_after:
+            # Straight back down after climbing here: the next climb waits twice as long
+            self.failed_upgrades[old] = min(self.failed_upgrades.get(old, 0) + 1, 4)
+        self.level = level
+        self.since_switch = 0
+        self.headroom = 0
+        self.switches[direction] += 1
+        rtf = round(rtf, 2) if rtf is not None else None
+        self.history.append({"direction": direction, "from": old, "to": new, "reason": reason,
+                             "rtf": rtf, "backlog": backlog})
+        metrics.incr("tts_quality_switches", direction=direction, to=new)
+        trace_event("tts_quality", direction=direction, from_level=old, to_level=new, reason=reason,
+                    rtf=rtf, backlog=backlog, engine=self.levels[level]["engine"])
+        logger.info(f"TTS quality {direction}: {old} -> {new} ({reason}, rtf={rtf}, backlog={backlog})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "primary": self.primary,
+            "level": level_name(self.current()),
+            "rtf": {name: round(value, 3) for name, value in self.rtf.items()},
+            "switches": self.switches,
+            "history": list(self.history),
+        }
+
+
+class TTSQualityControl:
+    """Ladders and thresholds, plus the state of the most recent max_sessions sessions
+
+    A session steps down when backlog_high sentences are waiting, or when any
+    are waiting and its real-time factor is above rtf_high. It steps back up
+    after upgrade_after sentences with nothing waiting and a real-time factor
+    below rtf_low. hold_sentences must pass between switches.
+    """
+
+    def __init__(self, levels: Dict[str, List[Dict[str, str]]] = None, backlog_high: int = 2,
+                 rtf_high: float = 1.0, rtf_low: float = 0.5, hold_sentences: int = 2, upgrade_after: int = 3,
+                 max_sessions: int = 256):
+        self.levels = levels or DEFAULT_LEVELS
+        self.backlog_high = backlog_high
+        self.rtf_high = rtf_high
+        self.rtf_low = rtf_low
+        self.hold_sentences = hold_sentences
+        self.upgrade_after = upgrade_after
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, SessionQuality]" = OrderedDict()
+
+    def session(self, session_id: str, primary: str) -> SessionQuality:
+        """The session's controller; switching primary engine starts a fresh ladder"""
+        quality = self._sessions.pop(session_id, None)
+        if quality is None or quality.primary != primary:
+            quality = SessionQuality(self, session_id, primary)
+        self._sessions[session_id] = quality
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return quality
+
+    def status(self) -> Dict[str, Any]:
+        sessions = {session_id: quality.to_dict() for session_id, quality in self._sessions.items()}
+        return {
+            "degraded_sessions": sum(1 for quality in self._sessions.values() if quality.level > 0),
+            "switches": {direction: sum(q.switches[direction] for q in self._sessions.values())
+                         for direction in ("down", "up")},
+            "thresholds": {"backlog_high": self.backlog_high, "rtf_high": self.rtf_high, "rtf_low": self.rtf_low,
+                           "hold_sentences": self.hold_sentences, "upgrade_after": self.upgrade_after},
+            "sessions": sessions,
+        }
@@ -0,0 +1,167 @@
+"""
+TTS Scheduler - Priority queue in front of the TTS engines
+Each engine runs a limited number of jobs at once. Waiting jobs are started
+in priority order: a reply's first sentence, then the rest of the reply,
+then voice-settings previews, then batch work (warm-ups, the /tts/generate
+endpoint). Waiting ages a job upwards so nothing starves, and when an engine
+is saturated a new high-priority job can preempt a running preview or batch
+job, which is re-queued and run again later.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+from backend.metrics import metrics
+from backend.turn_traces import trace_event
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+JOB_CLASSES = {
+    "first_sentence": 0,
+    "reply": 1,
+    "preview": 2,
+    "batch": 3,
+}
+
+# Only work nobody is listening to yet may be cancelled mid-synthesis
+PREEMPTIBLE = {"preview", "batch"}
+
+
+class _Job:
+    def __init__(self, engine: str, job_class: str, fn: Callable[[], Awaitable[Any]]):
+        self.engine = engine
+        self.job_class = job_class
+        self.priority = JOB_CLASSES[job_class]
+        self.fn = fn
+        self.enqueued_at = time.monotonic()  # Aging counts from here, across re-queues
+        self.queued_at = self.enqueued_at
+        self.future = asyncio.get_running_loop().create_future()
+        # Jobs run in their submitter's context (log fields, turn trace), not the dispatcher's
+        self.context = contextvars.copy_context()
+        self.task = None
+        self.preempted = False
+        self.preemptions = 0
+
+
+class TTSScheduler:
+    """Per-engine concurrency limits with priority, aging and optional preemption
+
+    aging_s is how long a job has to wait to gain one priority level. Engines
+    listed in preempt may have preemptible jobs cancelled; a job is preempted
+    at most max_preemptions times, after which it runs to completion.
+    """
+
+    def __init__(self, concurrency: Dict[str, int], default_concurrency: int = 1, aging_s: float = 2.0,
+                 preempt: Dict[str, bool] = None, max_preemptions: int = 2):
+        self.concurrency = concurrency
+        self.default_concurrency = default_concurrency
+        self.aging_s = aging_s
+        self.preempt = preempt or {}
+        self.max_preemptions = max_preemptions
+        self._waiting: Dict[str, List[_Job]] = defaultdict(list)
+        self._running: Dict[str, Set[_Job]] = defaultdict(set)
+
+    def reconfigure(self, concurrency: Dict[str, int], aging_s: float, preempt: Dict[str, bool]):
+        """New limits apply from the next dispatch; running jobs finish where they are"""
+        self.concurrency = concurrency
+        self.aging_s = aging_s
+        self.preempt = preempt or {}
+        for engine in list(self._waiting):
+            self._dispatch(engine)
+
+    def _limit(self, engine: str) -> int:
+        return self.concurrency.get(engine, self.default_concurrency)
+
+    async def run(self, engine: str, job_class: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Queue fn() on an engine and return its result; fn may be called again if preempted"""
+        job = _Job(engine, job_class, fn)
+        self._waiting[engine].append(job)
+        self._maybe_preempt(job)
+        self._dispatch(engine)
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. the turn ended); don't leave its work queued or running
+            if job in self._waiting[engine]:
+                self._waiting[engine].remove(job)
+            elif job.task is not None:
+                job.task.cancel()
+            raise
+
+    def _rank(self, job: _Job, now: float) -> float:
+        return job.priority - (now - job.enqueued_at) / self.aging_s
+
+    def _dispatch(self, engine: str):
+        waiting = self._waiting[engine]
+        while waiting and len(self._running[engine]) < self._limit(engine):
+            now = time.monotonic()
+            job = min(waiting, key=lambda j: (self._rank(j, now), j.enqueued_at))
+            waiting.remove(job)
+            self._start(job, now)
+        metrics.set_gauge("tts_queue_depth", len(waiting), engine=engine)
+
+    def _start(self, job: _Job, now: float):
+        wait_ms = (now - job.queued_at) * 1000
+        metrics.observe("tts_queue_wait_ms", wait_ms, job_class=job.job_class)
+        job.context.run(trace_event, "tts_started", engine=job.engine, job_class=job.job_class,
+                        queue_wait_ms=round(wait_ms, 1))
+        self._running[job.engine].add(job)
+        job.task = asyncio.create_task(job.fn(), context=job.context.copy())
+        job.task.add_done_callback(lambda task: self._finished(job, task))
+
+    def _maybe_preempt(self, incoming: _Job):
+        engine = incoming.engine
+        if not self.preempt.get(engine) or len(self._running[engine]) < self._limit(engine):
+            return
+        victims = [
+            job for job in self._running[engine]
+            if job.job_class in PREEMPTIBLE and job.priority > incoming.priority
+            and job.preemptions < self.max_preemptions and not job.preempted
+        ]
+        if not victims:
+            return
+        victim = max(victims, key=lambda job: (job.priority, job.queued_at))
+        victim.preempted = True
+        victim.preemptions += 1
+        victim.task.cancel()
+        metrics.incr("tts_preemptions", job_class=victim.job_class, engine=engine)
+        logger.debug(f"Preempted a {victim.job_class} job on {engine} for a {incoming.job_class} job")
+
+    def _finished(self, job: _Job, task: asyncio.Task):
+        self._running[job.engine].discard(job)
+        if job.future.done():
+            pass  # The caller stopped waiting
+        elif task.cancelled():
+            if job.preempted:
+                job.preempted = False
+                job.queued_at = time.monotonic()
+                self._waiting[job.engine].append(job)
+            else:
+                job.future.cancel()
+        elif task.exception() is not None:
+            job.future.set_exception(task.exception())
+        else:
+            job.future.set_result(task.result())
+        self._dispatch(job.engine)
+
+    def status(self) -> Dict:
+        """Queue depth and running jobs per engine, and queue wait times per class"""
+        return {
+            "engines": {
+                engine: {
+                    "limit": self._limit(engine),
+                    "running": sorted(job.job_class for job in self._running[engine]),
+                    "waiting": sorted(job.job_class for job in self._waiting[engine]),
+                }
+                for engine in sorted(set(self._waiting) | set(self._running))
+            },
+            "wait_ms": {
+                job_class: metrics.summary("tts_queue_wait_ms", job_class=job_class)
+                for job_class in JOB_CLASSES
+            },
+        }
@@ -0,0 +1,180 @@
+"""
+Turn Traces - Bounded in-memory timeline of recent chat turns
+Each turn records its model, prompt size, first-token time, every sentence
+with its TTS engine and timings, fallbacks taken, bytes sent and whether it
+was cancelled. The current trace lives in a context variable that asyncio
+tasks inherit, so code deep in the TTS path can add events without
+threading a trace object through its signatures. Finished traces are kept
+in fixed-size ring buffers, globally and per session, for /debug/turns.
+"""
+
+import json
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+_current: ContextVar[Optional["TurnTrace"]] = ContextVar("turn_trace", default=None)
+
+MAX_FIELD_CHARS = 200  # Strings in events are cut to this, so one trace can't grow with reply text
+
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_FIELD_CHARS:
+        return value[:MAX_FIELD_CHARS] + "…"
+    return value
+
+
+class TurnTrace:
+    def __init__(self, session_id: str, turn_id: str, model: str, tts_engine: str, max_events: int = 100):
+        self.session_id = session_id
+        self.turn_id = turn_id
+        self.model = model
+        self.tts_engine = tts_engine
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self.max_events = max_events
+        self.fields: Dict[str, Any] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.dropped_events = 0
+        self.sentences: List[Dict[str, Any]] = []
+        self.engines = {tts_engine}
+        self.error: Optional[str] = None
+        self.cancelled = False
+        self.total_ms: Optional[float] = None
+
+    def elapsed_ms(self) -> float:
+        return round((time.monotonic() - self._start) * 1000, 1)
+
+    def set(self, **fields):
+        """Turn-level facts (prompt size, first token time, bytes sent, ...)"""
+        self.fields.update({key: _clip(value) for key, value in fields.items()})
+
+    def event(self, name: str, **fields):
+        """A timestamped step; past max_events only the count of dropped events grows"""
+        if fields.get("engine"):
+            self.engines.add(fields["engine"])
+        if len(self.events) >= self.max_events:
+            self.dropped_events += 1
+            return
+        self.events.append({"t_ms": self.elapsed_ms(), "event": name,
+                            **{key: _clip(value) for key, value in fields.items()}})
+
+    def sentence(self, index: int, **fields):
+        if len(self.sentences) < self.max_events:
+            self.sentences.append({"index": index, "t_ms": self.elapsed_ms(),
+                                   **{key: _clip(value) for key, value in fields.items()}})
+        if fields.get("engine"):
+            self.engines.add(fields["engine"])
+
+    def fail(self, message: str):
+        self.error = _clip(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "turn_id": self.turn_id,
+            "model": self.model,
+            "tts_engine": self.tts_engine,
+            "engines": sorted(self.engines),
+            "started_at": round(self.started_at, 3),
+            "total_ms": self.total_ms if self.total_ms is not None else self.elapsed_ms(),
+            "in_progress": self.total_ms is None,
+            "error": self.error,
+            "cancelled": self.cancelled,
+            **self.fields,
+            "sentences": self.sentences,
+            "events": self.events,
+            "dropped_events": self.dropped_events,
+        }
+
+
+def current_trace() -> Optional[TurnTrace]:
+    return _current.get()
+
+
+def trace_event(name: str, **fields):
+    """Record an event on the current turn's trace, if there is one"""
+    trace = _current.get()
+    if trace is not None:
+        trace.event(name, **fields)
+
+
+class TraceBuffer:
+    """The last max_turns turns overall and the last per_session turns of max_sessions sessions
+
+    Every trace is capped at max_events events and sentences with clipped
+    strings, so memory is bounded by (max_turns + max_sessions * per_session)
+    traces whatever the traffic.
+    """
+
+    def __init__(self, max_turns: int = 200, per_session: int = 10, max_sessions: int = 50, max_events: int = 100):
+        self.max_events = max_events
+        self.per_session = per_session
+        self.max_sessions = max_sessions
+        self._recent: Deque[TurnTrace] = deque(maxlen=max_turns)
+        self._sessions: "OrderedDict[str, Deque[TurnTrace]]" = OrderedDict()
+        self._active: Dict[str, TurnTrace] = {}
+
+    def start(self, session_id: str, turn_id: str, model: str, tts_engine: str) -> TurnTrace:
+        """Begin a trace and make it current for this task and the tasks it creates"""
+        trace = TurnTrace(session_id, turn_id, model, tts_engine, self.max_events)
+        self._active[turn_id] = trace
+        _current.set(trace)
+        return trace
+
+    def finish(self, trace: TurnTrace):
+        trace.total_ms = trace.elapsed_ms()
+        self._active.pop(trace.turn_id, None)
+        _current.set(None)
+        self._recent.append(trace)
+        session = self._sessions.pop(trace.session_id, None) or deque(maxlen=self.per_session)
+        session.append(trace)
+        self._sessions[trace.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def _all(self) -> List[TurnTrace]:
+        seen, traces = set(), []
+        for trace in [*self._active.values(), *self._recent,
+                      *(trace for session in self._sessions.values() for trace in session)]:
+            if id(trace) not in seen:
+                seen.add(id(trace))
+                traces.append(trace)
+        return traces
+
+    def query(self, session_id: str = None, engine: str = None, errors: bool = False,
+              sort: str = "recent", limit: int = 20) -> List[Dict[str, Any]]:
+        """Matching traces, newest first or slowest first"""
+        if session_id is not None:
+            traces = [*(t for t in self._active.values() if t.session_id == session_id),
+                      *self._sessions.get(session_id, ())]
+        else:
+            traces = self._all()
+        if engine is not None:
+            traces = [t for t in traces if engine in t.engines]
+        if errors:
+            traces = [t for t in traces if t.error or t.cancelled]
+
+        if sort == "slowest":
+            traces.sort(key=lambda t: t.total_ms if t.total_ms is not None else t.elapsed_ms(), reverse=True)
+        else:
+            traces.sort(key=lambda t: t.started_at, reverse=True)
+        return [trace.to_dict() for trace in traces[:limit]]
+
+    def export(self) -> Dict[str, Any]:
+        """Every retained trace, oldest first, for offline analysis"""
+        traces = sorted(self._all(), key=lambda t: t.started_at)
+        return {"exported_at": round(time.time(), 3), "traces": [trace.to_dict() for trace in traces]}
+
+    def status(self) -> Dict[str, Any]:
+        retained = self._all()
+        return {
+            "active": len(self._active),
+            "recent": len(self._recent),
+            "sessions": len(self._sessions),
+            "retained": len(retained),
+            "json_bytes": sum(len(json.dumps(trace.to_dict(), default=str)) for trace in retained),
+            "limits": {"max_turns": self._recent.maxlen, "per_session": self.per_session,
+                       "max_sessions": self.max_sessions, "max_events": self.max_events},
+        }
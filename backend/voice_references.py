@@ -0,0 +1,123 @@
+"""
+Voice References - F5-TTS reference recordings and their transcripts by content hash
+F5 needs the words spoken in its reference clip. Given an empty ref_text,
+the TTS server runs its own ASR on the clip for every sentence it
+generates. Here each recording is transcribed once, with our own
+transcription path, and the text is stored next to the audio as
+{ref_id}.wav / {ref_id}.txt, so every request can send it.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def reference_id(audio: bytes) -> str:
+    return hashlib.sha256(audio).hexdigest()[:16]
+
+
+class ReferenceLibrary:
+    """Content-addressed reference recordings with transcripts made on first use
+
+    transcribe(audio bytes) returns the spoken text. A failure leaves the
+    transcript empty, so F5 falls back to its own ASR, and is retried after
+    retry_after seconds rather than on every sentence.
+    """
+
+    def __init__(self, directory: str, transcribe: Callable[[bytes], Awaitable[str]], retry_after: float = 300.0):
+        self.directory = directory
+        self.transcribe = transcribe
+        self.retry_after = retry_after
+        self._texts: Dict[str, str] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._file_ids: Dict[Tuple[str, float], str] = {}
+
+    def _paths(self, ref_id: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, ref_id)
+        return f"{base}.wav", f"{base}.txt"
+
+    async def save(self, audio: bytes, ref_text: str = "") -> Dict[str, str]:
+        """Store a recording; its transcript is the given text, a stored one, or a new transcription"""
+        ref_id = reference_id(audio)
+        audio_path, text_path = self._paths(ref_id)
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(audio_path):
+            with open(audio_path, "wb") as f:
+                f.write(audio)
+
+        ref_text = ref_text.strip()
+        if ref_text:
+            # Text typed by the user beats a transcription
+            self._store_text(ref_id, ref_text)
+        else:
+            ref_text = await self.text(ref_id, audio)
+        return {"ref_id": ref_id, "ref_audio_path": audio_path, "ref_text": ref_text}
+
+    async def text(self, ref_id: str, audio: bytes = None) -> str:
+        """Transcript of a stored recording, transcribing it once if there is none yet"""
+        if ref_id in self._texts:
+            return self._texts[ref_id]
+
+        audio_path, text_path = self._paths(ref_id)
+        if os.path.exists(text_path):
+            with open(text_path, "r") as f:
+                self._texts[ref_id] = f.read().strip()
+            return self._texts[ref_id]
+
+        if time.monotonic() - self._failed_at.get(ref_id, -self.retry_after) < self.retry_after:
+            return ""
+
+        # Concurrent sentences for the same new voice share one transcription
+        task = self._pending.get(ref_id)
+        if task is None:
+            if audio is None:
+                with open(audio_path, "rb") as f:
+                    audio = f.read()
+            task = asyncio.create_task(self._transcribe(ref_id, audio))
+            self._pending[ref_id] = task
+            task.add_done_callback(lambda _: self._pending.pop(ref_id, None))
+        return await asyncio.shield(task)
+
+    async def text_for_file(self, path: str) -> str:
+        """Transcript for a recording outside the library, such as the legacy default reference"""
+        key = (path, os.path.getmtime(path))
+        ref_id = self._file_ids.get(key)
+        if ref_id is None:
+            with open(path, "rb") as f:
+                audio = f.read()
+            ref_id = reference_id(audio)
+            self._file_ids[key] = ref_id
+            # Keep a copy so the transcript has its audio next to it
+            return (await self.save(audio))["ref_text"]
+        return await self.text(ref_id)
+
+    async def _transcribe(self, ref_id: str, audio: bytes) -> str:
+        start = time.monotonic()
+        try:
+            text = (await self.transcribe(audio)).strip()
+        except Exception as e:
+            logger.warning(f"Reference {ref_id} transcription failed ({e}); F5 will transcribe it itself")
+            self._failed_at[ref_id] = time.monotonic()
+            return ""
+        metrics.observe("reference_transcribe_ms", (time.monotonic() - start) * 1000)
+        if text:
+            self._store_text(ref_id, text)
+            logger.info(f"Transcribed reference {ref_id}: '{text[:50]}'")
+        else:
+            # No speech found; transcribing the same clip again won't change that
+            self._failed_at[ref_id] = time.monotonic()
+        return text
+
+    def _store_text(self, ref_id: str, text: str):
+        _, text_path = self._paths(ref_id)
+        with open(text_path, "w") as f:
+            f.write(text)
+        self._texts[ref_id] = text
@@ -0,0 +1,105 @@
+"""
+Whisper Worker - Persistent speech-to-text process
+Keeps a Whisper model loaded in TTS-WebUI's Python environment so each
+transcription only pays for inference, not interpreter start and model load.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Runs inside TTS-WebUI's environment. Each request is a JSON header line
+# followed by pcm_bytes of 16 kHz mono float32 samples; each reply is one
+# JSON line on stdout.
+WORKER_SCRIPT = """
+import json
+import sys
+
+import numpy as np
+import whisper
+
+model = whisper.load_model(sys.argv[1])
+stdin = sys.stdin.buffer
+print(json.dumps({"ready": True}), flush=True)
+
+while True:
+    line = stdin.readline()
+    if not line:
+        break
+    try:
+        request = json.loads(line)
+        audio = np.frombuffer(stdin.read(request["pcm_bytes"]), dtype=np.float32)
+        result = model.transcribe(audio)
+        reply = {"text": result["text"].strip()}
+    except Exception as e:
+        reply = {"error": str(e)}
+    print(json.dumps(reply), flush=True)
+"""
+
+
+class WhisperWorker:
+    def __init__(self, python_path: str, model_name: str = "base", timeout: float = 30.0):
+        self.python_path = python_path
+        self.model_name = model_name
+        self.timeout = timeout
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        """Spawn the worker and wait until the model is loaded"""
+        if self.is_running:
+            return
+
+        self.process = await asyncio.create_subprocess_exec(
+            self.python_path, "-c", WORKER_SCRIPT, self.model_name,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+        line = await self.process.stdout.readline()
+        if not line or not json.loads(line).get("ready"):
+            await self.stop()
+            raise RuntimeError("Whisper worker failed to load model")
+
+        logger.info(f"Whisper worker ready (model: {self.model_name})")
+
+    async def stop(self):
+        """Terminate the worker process"""
+        if self.is_running:
+            self.process.kill()
+            await self.process.wait()
+        self.process = None
+
+    async def transcribe(self, pcm: bytes) -> str:
+        """Transcribe 16 kHz mono float32 PCM, restarting the worker if it died"""
+        async with self._lock:
+            if not self.is_running:
+                await self.start()
+
+            header = json.dumps({"pcm_bytes": len(pcm)}) + "\n"
+            self.process.stdin.write(header.encode() + pcm)
+            await self.process.stdin.drain()
+
+            try:
+                line = await asyncio.wait_for(self.process.stdout.readline(), self.timeout)
+            except asyncio.TimeoutError:
+                # The worker is stuck mid-inference; a fresh one is cheaper than waiting
+                await self.stop()
+                raise
+
+            if not line:
+                await self.stop()
+                raise RuntimeError("Whisper worker exited unexpectedly")
+
+            reply = json.loads(line)
+            if "error" in reply:
+                raise RuntimeError(reply["error"])
+            return reply["text"]
@@ -33,7 +33,23 @@ class BrainChat {
         this.analyser = null;
         this.isDetectingVoice = false;
         
+        // Stitched replies arrive as PCM chunks scheduled back to back on their own context
+        this.playbackContext = null;
+        this.streamPlayhead = 0;
+        this.streamSources = 0;
+        this.streamInReply = false;
+        // Gaps heard between audio chunks, reported to the server once playback settles
+        this.playbackGaps = [];
+        this.playbackChunks = 0;
+        this.playbackMode = 'clips';
+        this.lastClipEndedAt = null;
+        
         this.currentMessage = null;
+        this.sentenceText = '';
+        this.lastSeq = null;  // Sequence number of the last reply frame received, for resuming
+        this.replayEpoch = null;  // Which server-side replay buffer lastSeq counts in
+        this.resumeEpoch = null;  // The epoch a pending resume was sent with
+        this.replyOpen = false;  // A reply has started arriving and hasn't finished
         this.isFirstMessage = true;
         
         this.initializeElements();
@@ -228,9 +244,19 @@ class BrainChat {
         
         // Audio player with TTS state tracking
         this.audioPlayer.addEventListener('ended', () => {
+            this.lastClipEndedAt = performance.now();
             this.onTTSEnded();
             this.playNextAudio();
         });
+        this.audioPlayer.addEventListener('playing', () => {
+            // Includes per-clip decode and start-up, not just queueing
+            if (this.lastClipEndedAt !== null) {
+                this.playbackGaps.push(Math.round(performance.now() - this.lastClipEndedAt));
+                this.lastClipEndedAt = null;
+            }
+            this.playbackMode = 'clips';
+            this.playbackChunks++;
+        });
         this.audioPlayer.addEventListener('error', () => {
             this.onTTSEnded(); 
             this.playNextAudio();
@@ -591,7 +617,10 @@ class BrainChat {
     
     connectWebSocket() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws`;
+        // Reconnect into the same session so the server keeps our history
+        const sessionId = localStorage.getItem('brainSessionId');
+        const query = sessionId ? `?session_id=${encodeURIComponent(sessionId)}` : '';
+        const wsUrl = `${protocol}//${window.location.host}/ws${query}`;
         
         this.updateConnectionStatus('connecting');
         this.websocket = new WebSocket(wsUrl);
@@ -599,6 +628,11 @@ class BrainChat {
         this.websocket.onopen = () => {
             console.log('Connected to Brain');
             this.updateConnectionStatus('connected');
+            // Back after a drop: ask for the reply frames we missed; generation carried on meanwhile
+            if (this.lastSeq !== null) {
+                this.resumeEpoch = this.replayEpoch;
+                this.websocket.send(JSON.stringify({type: 'resume', last_seq: this.lastSeq, epoch: this.replayEpoch}));
+            }
         };
         
         this.websocket.onclose = () => {
@@ -613,6 +647,13 @@ class BrainChat {
         
         this.websocket.onmessage = (event) => {
             const data = JSON.parse(event.data);
+            if (data.seq !== undefined) {
+                if (data.seq <= this.lastSeq) {
+                    return;  // Already shown before the reconnect
+                }
+                this.lastSeq = data.seq;
+                this.replyOpen = data.type !== 'done' && data.type !== 'error';
+            }
             this.handleResponse(data);
         };
     }
@@ -668,6 +709,7 @@ class BrainChat {
         this.messageInput.style.height = 'auto';
                 // Prepare for response
         this.currentMessage = this.addMessage('assistant', '', true);
+        this.sentenceText = '';
         
         // Send to backend
         this.websocket.send(JSON.stringify({
@@ -716,9 +758,30 @@ class BrainChat {
     
     handleRegularResponse(data) {
         switch (data.type) {
+            case 'session':
+                localStorage.setItem('brainSessionId', data.session_id);
+                this.replayEpoch = data.epoch;
+                break;
+                
+            case 'resumed': {
+                // Another epoch means the server restarted or dropped the session's buffer: nothing is
+                // missing unless a reply was cut off. Also resets the count, which starts from zero there
+                const bufferLost = data.epoch !== this.resumeEpoch;
+                if (!data.complete || (bufferLost && this.replyOpen)) {
+                    this.showMessage('system', 'Part of the reply was lost while disconnected');
+                }
+                if (bufferLost) {
+                    this.replyOpen = false;
+                }
+                this.lastSeq = data.last_seq;
+                this.replayEpoch = data.epoch;
+                break;
+            }
+                
             case 'token':
                 if (this.currentMessage) {
                     this.currentMessage.textContent += data.content;
+                    this.sentenceText += data.content;
                     this.scrollToBottom();
                     
                     // Update live text if in voice mode
@@ -728,17 +791,40 @@ class BrainChat {
                 }
                 break;
                 
+            case 'text':
+                // The whole sentence: adds its final token, and any token frames a backed-up connection dropped
+                if (this.currentMessage) {
+                    const shown = this.sentenceText.trim();
+                    let rest = data.content.startsWith(shown) ? data.content.slice(shown.length) : data.content;
+                    if (!shown && this.currentMessage.textContent) {
+                        rest = ' ' + rest;
+                    }
+                    this.currentMessage.textContent += rest;
+                    this.sentenceText = '';
+                    this.scrollToBottom();
+                    if (this.voiceViz.style.display === 'flex') {
+                        this.assistantLiveText.textContent = this.currentMessage.textContent;
+                    }
+                }
+                break;
+                
             case 'audio':
                 if (this.isAudioEnabled && data.data) {
                     console.log('Queueing audio chunk');
                     this.audioQueue.push(data.data);
                     // Only start playing if audio player is paused and this is the first chunk
-                    if (this.audioPlayer.paused && this.audioQueue.length === 1) {
+                    if (this.audioPlayer.paused && this.audioQueue.length === 1 && this.streamSources === 0) {
                         this.playNextAudio();
                     }
                 }
                 break;
                 
+            case 'audio_pcm':
+                if (this.isAudioEnabled) {
+                    this.playPcmChunk(data);
+                }
+                break;
+                
             case 'complete':
                 this.currentMessage = null;
                 this.sendBtn.disabled = false;
@@ -793,6 +879,80 @@ class BrainChat {
         }
     }
     
+    playPcmChunk(data) {
+        if (!this.playbackContext) {
+            this.playbackContext = new (window.AudioContext || window.webkitAudioContext)();
+        }
+        const ctx = this.playbackContext;
+        if (ctx.state === 'suspended') {
+            ctx.resume();
+        }
+        
+        const bytes = Uint8Array.from(atob(data.data || ''), c => c.charCodeAt(0));
+        const pcm = new Int16Array(bytes.buffer, 0, bytes.length >> 1);
+        if (pcm.length > 0) {
+            const buffer = ctx.createBuffer(1, pcm.length, data.sample_rate);
+            const channel = buffer.getChannelData(0);
+            for (let i = 0; i < pcm.length; i++) {
+                channel[i] = pcm[i] / 32768;
+            }
+            
+            // A chunk arriving after the scheduled audio ran out is an audible gap (underrun)
+            const now = ctx.currentTime;
+            if (this.streamInReply && now > this.streamPlayhead) {
+                this.playbackGaps.push(Math.round((now - this.streamPlayhead) * 1000));
+            }
+            const startAt = Math.max(now + 0.02, this.streamPlayhead);
+            
+            const source = ctx.createBufferSource();
+            source.buffer = buffer;
+            source.connect(ctx.destination);
+            source.onended = () => {
+                this.streamSources--;
+                if (this.streamSources === 0) {
+                    this.onTTSEnded();
+                    this.playNextAudio();
+                }
+            };
+            source.start(startAt);
+            this.streamPlayhead = startAt + buffer.duration;
+            this.streamInReply = true;
+            this.playbackMode = 'stream';
+            this.playbackChunks++;
+            if (this.streamSources++ === 0) {
+                this.onTTSStarted();
+            }
+        }
+        
+        if (data.final) {
+            this.streamInReply = false;
+        }
+    }
+    
+    stopPcmStream() {
+        if (this.playbackContext) {
+            this.playbackContext.close();
+            this.playbackContext = null;
+        }
+        this.streamPlayhead = 0;
+        this.streamSources = 0;
+        this.streamInReply = false;
+    }
+    
+    reportPlaybackStats() {
+        if (this.playbackChunks > 0 && this.websocket && this.websocket.readyState === WebSocket.OPEN) {
+            this.websocket.send(JSON.stringify({
+                type: 'playback_stats',
+                mode: this.playbackMode,
+                chunks: this.playbackChunks,
+                gaps_ms: this.playbackGaps
+            }));
+        }
+        this.playbackGaps = [];
+        this.playbackChunks = 0;
+        this.lastClipEndedAt = null;
+    }
+    
     // Method for testing TTS from voice settings
     async testTTS(text) {
         try {
@@ -841,6 +1001,7 @@ class BrainChat {
             // Stop current audio
             this.audioPlayer.pause();
             this.audioQueue = [];
+            this.stopPcmStream();
         }
     }
     
@@ -875,7 +1036,7 @@ class BrainChat {
         }
         
         // Check if more audio is queued OR if we're still expecting more chunks
-        if (this.audioQueue.length > 0) {
+        if (this.audioQueue.length > 0 || this.streamSources > 0) {
             console.log('📢 More TTS audio queued - keeping VAD paused');
             return; // Don't resume yet, more TTS coming
         }
@@ -891,12 +1052,13 @@ class BrainChat {
         // Resume VAD after delay (allows TTS echo to settle)
         this.ttsResumeTimer = setTimeout(() => {
             // Double-check again before resuming - sometimes audio arrives late
-            if (this.audioQueue.length > 0) {
+            if (this.audioQueue.length > 0 || this.streamSources > 0) {
                 console.log('🔄 Late audio detected - canceling VAD resume');
                 return;
             }
             
             this.ttsPlaying = false;
+            this.reportPlaybackStats();
             
             // Release first response hold if applicable
             if (this.waitingForFirstResponse) {
@@ -948,6 +1110,7 @@ class BrainChat {
         this.isFirstMessage = true;
         this.currentMessage = null;
         this.audioQueue = [];
+        this.stopPcmStream();
     }
     
     setupVoiceActivityDetection() {
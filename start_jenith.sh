@@ -21,16 +21,34 @@ source installer_files/env/bin/activate
 GRADIO_SERVER_PORT=7771 OPENAI_API_PORT=8881 REACT_UI_PORT=3031 python server.py --share-gradio --gradio-port 7771 --openai-api-port 8881 2>&1 &
 TTS_PID=$!
 
+# Wait until a service answers instead of sleeping for a fixed time
+wait_for() {
+    local name=$1 url=$2 timeout=$3
+    local deadline=$((SECONDS + timeout))
+    until curl -sf -o /dev/null "$url"; do
+        if [ $SECONDS -ge $deadline ]; then
+            echo "⚠️  $name not up after ${timeout}s, continuing anyway"
+            return 1
+        fi
+        sleep 0.5
+    done
+    echo "✅ $name is up"
+}
+
 echo "Waiting for TTS-WebUI to initialize..."
-sleep 15
+wait_for "TTS-WebUI" "http://localhost:7771/" 120
 
 # Start Brain UI
 echo "Starting Brain UI..."
 cd /home/jenith/jgit/brain
 source venv/bin/activate
-uvicorn backend.main:app --reload --host 0.0.0.0 --port 6061 &
+uvicorn backend.main:app --reload --host 0.0.0.0 --port 6061 --ws websockets --ws-per-message-deflate true &
 BRAIN_PID=$!
 
+# Brain warms Ollama, Kokoro, F5-TTS and Whisper in the background; /ready flips when the critical path is warm
+echo "Waiting for Brain warm-up..."
+wait_for "Brain" "http://localhost:6061/ready" 180
+
 # Display status
 echo ""
 echo "========================================="